@@ -0,0 +1,144 @@
+"""
+Memory of stored analyses: plain response dicts vs slotted AnalysisRecord
+
+Run from the backend directory:
+    python benchmarks/bench_analysis_memory.py
+"""
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.results import AnalysisRecord
+from utils.carbon_calculator import CarbonCalculator
+from utils.location_service import LocationService
+
+ANALYSES = 100_000
+# Full responses are ~10x larger; measure a sample and scale up
+FULL_RESPONSE_SAMPLE = 10_000
+TEMPLATES = 200
+
+
+def make_templates(n: int, seed: int = 0) -> list:
+    """Realistic /analyze responses (JSON text) from the real calculator"""
+
+    rng = np.random.default_rng(seed)
+    calculator = CarbonCalculator()
+    states = list(LocationService.REGIONAL_BASELINE)
+    templates = []
+
+    for i in range(n):
+        vision = {
+            "vegetation_type": str(rng.choice(list(CarbonCalculator.BASE_SEQUESTRATION_RATES))),
+            "vegetation_density": str(rng.choice(list(CarbonCalculator.DENSITY_MULTIPLIERS))),
+            "density_percentage": round(float(rng.uniform(0, 100)), 1),
+            "estimated_tree_count": int(rng.integers(0, 200)),
+            "land_condition": str(rng.choice(list(CarbonCalculator.CONDITION_MULTIPLIERS))),
+            "visible_features": ["scattered trees", "crop rows", "irrigation channel"],
+            "confidence": "medium",
+            "reasoning": "Rows of crops with scattered trees along the boundary",
+            "image_quality": "good",
+            "image_quality_score": round(float(rng.uniform(0.5, 1)), 3),
+            "vegetation_indices": None,
+            "api_usage": {"prompt_tokens": 1200, "completion_tokens": 180, "total_tokens": 1380}
+        }
+        state = str(rng.choice(states))
+        location = {
+            "location": {"city": f"City {i % 50}", "state": state, "climate_zone": "tropical"},
+            "climate_multiplier": round(float(rng.uniform(0.7, 1.3)), 2),
+            "baseline_multiplier": 1.0,
+            "weather_data": None,
+            "adjustments": ["Using regional baseline (weather data unavailable)"],
+            "explanation": f"Location: {state.title()}"
+        }
+        metadata = {"processed_width": 1280, "processed_height": 960, "processed_dimensions": "1280x960"}
+        carbon_analysis = calculator.calculate_complete_analysis(vision, metadata, location)
+        carbon_est = carbon_analysis["carbon_estimate"]
+
+        response = {
+            "analysis_id": f"{i:08d}-0000-0000-0000-000000000000",
+            "status": "success",
+            "timestamp": "2025-10-01T12:00:00",
+            "image_metadata": metadata,
+            "location_data": location,
+            "vision_analysis": vision,
+            "carbon_analysis": carbon_analysis,
+            "similarity_match": None,
+            "summary": {
+                "vegetation_type": vision["vegetation_type"],
+                "land_condition": vision["land_condition"],
+                "location": f"{location['location']['city']}, {state}",
+                "estimated_annual_revenue_inr": carbon_est["potential_revenue_inr"]["1_year"],
+                "estimated_land_area_hectares": carbon_est["estimated_land_area_hectares"],
+                "annual_co2_sequestration_tons": carbon_est["annual_sequestration_tons"],
+                "confidence": carbon_est["confidence_level"]
+            }
+        }
+        templates.append(json.dumps(response))
+
+    return templates
+
+
+def measure(build, n: int) -> int:
+    """Bytes allocated to keep n built objects alive"""
+
+    gc.collect()
+    tracemalloc.start()
+    kept = [build(i) for i in range(n)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    gc.collect()
+    return size
+
+
+def main():
+    templates = make_templates(TEMPLATES)
+
+    def full_response(i):
+        return json.loads(templates[i % TEMPLATES])
+
+    def compact_view(i):
+        return json.loads(view_templates[i % TEMPLATES])
+
+    def record(i):
+        return AnalysisRecord.from_response(json.loads(templates[i % TEMPLATES]))
+
+    records = [AnalysisRecord.from_response(json.loads(t)) for t in templates]
+    view_templates = [json.dumps(r.to_dict()) for r in records]
+
+    full_bytes = measure(full_response, FULL_RESPONSE_SAMPLE)
+    full_bytes = full_bytes / FULL_RESPONSE_SAMPLE * ANALYSES
+    view_bytes = measure(compact_view, ANALYSES)
+    record_bytes = measure(record, ANALYSES)
+
+    parsed = [json.loads(t) for t in templates]
+    from_response_us = min(
+        _time(lambda: [AnalysisRecord.from_response(r) for r in parsed]) for _ in range(5)
+    ) / len(parsed) * 1e6
+    to_dict_us = min(
+        _time(lambda: [r.to_dict() for r in records]) for _ in range(5)
+    ) / len(records) * 1e6
+
+    print(f"{ANALYSES:,} stored analyses:")
+    print(f"  full response dicts (scaled from {FULL_RESPONSE_SAMPLE:,})  {full_bytes / 2**20:9.1f} MiB  {full_bytes / ANALYSES:8.0f} B/analysis")
+    print(f"  same fields as plain dicts               {view_bytes / 2**20:9.1f} MiB  {view_bytes / ANALYSES:8.0f} B/analysis")
+    print(f"  AnalysisRecord (slots + arrays)          {record_bytes / 2**20:9.1f} MiB  {record_bytes / ANALYSES:8.0f} B/analysis")
+    print(f"  from_response                            {from_response_us:9.1f} us/analysis")
+    print(f"  to_dict                                  {to_dict_us:9.1f} us/analysis")
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
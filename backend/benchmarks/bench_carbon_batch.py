@@ -0,0 +1,109 @@
+"""
+Benchmark CarbonCalculator.calculate_batch against the scalar path
+
+Run from the backend directory:
+    python benchmarks/bench_carbon_batch.py
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.carbon_calculator import CarbonCalculator
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SCALAR_SAMPLE = 10_000
+
+
+def make_parcels(n: int, seed: int = 0) -> dict:
+    """Random parcels covering every category value"""
+    rng = np.random.default_rng(seed)
+    return {
+        "vegetation_types": rng.choice(list(CarbonCalculator.BASE_SEQUESTRATION_RATES), n),
+        "vegetation_densities": rng.choice(list(CarbonCalculator.DENSITY_MULTIPLIERS), n),
+        "land_conditions": rng.choice(list(CarbonCalculator.CONDITION_MULTIPLIERS), n),
+        "density_percentages": np.round(rng.uniform(0, 100, n), 1),
+        "areas": np.round(rng.uniform(0.1, 5.0, n), 2),
+        "climate_multipliers": np.round(rng.uniform(0.6, 1.4, n), 2),
+    }
+
+
+def run_scalar(calculator: CarbonCalculator, parcels: dict, n: int) -> list:
+    """Per-parcel results via the existing scalar methods"""
+    results = []
+    for i in range(n):
+        vision = {
+            "vegetation_type": str(parcels["vegetation_types"][i]),
+            "vegetation_density": str(parcels["vegetation_densities"][i]),
+            "land_condition": str(parcels["land_conditions"][i]),
+            "density_percentage": float(parcels["density_percentages"][i]),
+        }
+        location = {"climate_multiplier": float(parcels["climate_multipliers"][i])}
+        sequestration = calculator.calculate_sequestration(vision, float(parcels["areas"][i]), location)
+        revenue = calculator.calculate_credits_and_revenue(sequestration["annual_co2_tons"])
+        results.append((sequestration, revenue))
+    return results
+
+
+def check_exact(batch: dict, scalar: list) -> int:
+    """Count parcels whose batch values differ from the scalar path"""
+    mismatches = 0
+    for i, (sequestration, revenue) in enumerate(scalar):
+        same = (
+            batch["annual_co2_tons"][i] == sequestration["annual_co2_tons"]
+            and batch["effective_rate_per_hectare"][i] == sequestration["effective_rate_per_hectare"]
+            and batch["annual_credits"][i] == revenue["annual_credits"]
+            and all(
+                batch["revenue_projections_inr"][period][band][i] == values[band]
+                for period, values in revenue["revenue_projections_inr"].items()
+                for band in ("min", "mid", "max")
+            )
+        )
+        mismatches += not same
+    return mismatches
+
+
+def main():
+    calculator = CarbonCalculator()
+
+    tables = calculator.rate_tables
+
+    print(f"{'parcels':>10} {'batch ms':>10} {'coded ms':>10} {'us/parcel':>10} {'scalar us/parcel':>17} {'speedup':>8}")
+
+    for n in SIZES:
+        parcels = make_parcels(n)
+
+        start = time.perf_counter()
+        batch = calculator.calculate_batch(**parcels)
+        batch_seconds = time.perf_counter() - start
+
+        # Same parcels with categories pre-encoded as integer codes
+        coded = dict(parcels)
+        coded["vegetation_types"] = tables.vegetation.encode(parcels["vegetation_types"])
+        coded["vegetation_densities"] = tables.density.encode(parcels["vegetation_densities"])
+        coded["land_conditions"] = tables.condition.encode(parcels["land_conditions"])
+        start = time.perf_counter()
+        calculator.calculate_batch(**coded)
+        coded_seconds = time.perf_counter() - start
+
+        sample = min(n, SCALAR_SAMPLE)
+        start = time.perf_counter()
+        scalar = run_scalar(calculator, parcels, sample)
+        scalar_per_parcel = (time.perf_counter() - start) / sample
+
+        mismatches = check_exact(batch, scalar)
+        if mismatches:
+            print(f"WARNING: {mismatches} of {sample} parcels differ from the scalar path")
+
+        batch_per_parcel = batch_seconds / n
+        print(
+            f"{n:>10,} {batch_seconds * 1000:>10.1f} {coded_seconds * 1000:>10.1f} {batch_per_parcel * 1e6:>10.3f} "
+            f"{scalar_per_parcel * 1e6:>17.2f} {scalar_per_parcel / batch_per_parcel:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Knowledge base retrieval: index build time and per-query latency
+
+Run from the backend directory:
+    python benchmarks/bench_knowledge_index.py
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.knowledge_index import KnowledgeIndex
+
+QUESTIONS = [
+    "What are carbon credits and how do they work?",
+    "How do I get started with carbon credit programs in India?",
+    "What's the difference between Verra and CAMPA?",
+    "What are the latest carbon credit prices in India?",
+    "How long does the verification process typically take?",
+    "How much does verification cost for a small farm?",
+    "Can regenerative agriculture increase my credits?",
+    "What happens if my trees die?",
+    "What documents do I need to join a project?",
+    "Is the Green Credit Programme the same as carbon credits?",
+]
+ROUNDS = 2000
+
+
+def main():
+    index = KnowledgeIndex()
+
+    builds = []
+    for _ in range(5):
+        started = time.perf_counter()
+        index.rebuild()
+        builds.append((time.perf_counter() - started) * 1000)
+
+    latencies = []
+    for _ in range(ROUNDS):
+        for question in QUESTIONS:
+            started = time.perf_counter()
+            index.search(question)
+            latencies.append((time.perf_counter() - started) * 1e6)
+    latencies = np.array(latencies)
+
+    answered = sum(
+        bool(p) and p[0]["score"] >= KnowledgeIndex.CONFIDENT_SCORE
+        for p in (index.search(q) for q in QUESTIONS)
+    )
+    stats = index.get_stats()
+
+    print(f"{stats['passages']} passages, {stats['terms']} terms, {stats['postings']} postings ({stats['index_bytes'] / 1024:.1f} KiB arrays)")
+    print(f"  build                       {min(builds):8.1f} ms")
+    print(f"  query p50                   {np.percentile(latencies, 50):8.1f} us")
+    print(f"  query p99                   {np.percentile(latencies, 99):8.1f} us")
+    print(f"  answered without web search {answered}/{len(QUESTIONS)} sample questions")
+
+
+if __name__ == "__main__":
+    main()
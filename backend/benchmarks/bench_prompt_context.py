@@ -0,0 +1,73 @@
+"""
+Prompt-build cost per chat turn / report call: rebuilt every time vs cached
+
+Run from the backend directory:
+    python benchmarks/bench_prompt_context.py
+"""
+
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_analysis_memory import make_templates
+from utils.chatbot_service import ChatbotService
+from utils.prompt_context import PromptContextCache
+from utils.report_generator import ReportGenerator
+
+ANALYSES = 50
+TURNS_PER_ANALYSIS = 20
+
+
+def per_turn_us(build, analyses: list) -> float:
+    """Best-of-5 microseconds per prompt build, TURNS_PER_ANALYSIS turns each"""
+
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for analysis in analyses:
+            for _ in range(TURNS_PER_ANALYSIS):
+                build(analysis)
+        best = min(best, time.perf_counter() - start)
+    return best / (len(analyses) * TURNS_PER_ANALYSIS) * 1e6
+
+
+def main():
+    analyses = [json.loads(t) for t in make_templates(ANALYSES)]
+    # Chat sessions and the analysis store fingerprint each analysis once
+    fingerprints = {id(a): PromptContextCache.fingerprint(a) for a in analyses}
+
+    chatbot = ChatbotService()
+    reports = ReportGenerator()
+
+    def uncached_chat(analysis):
+        return chatbot.BASE_KNOWLEDGE + "\n\n" + chatbot._extract_full_report_context(analysis)
+
+    def session_chat(analysis):
+        return chatbot._create_system_prompt(analysis, fingerprints[id(analysis)])
+
+    def session_report(analysis):
+        return reports._prepare_analysis_context(analysis, fingerprints[id(analysis)])
+
+    rows = [
+        ("chat system prompt, rebuilt", per_turn_us(uncached_chat, analyses)),
+        ("chat system prompt, cached (session fingerprint)", per_turn_us(session_chat, analyses)),
+        ("chat system prompt, cached (hashed every turn)", per_turn_us(chatbot._create_system_prompt, analyses)),
+        ("report context, rebuilt", per_turn_us(reports._render_analysis_context, analyses)),
+        ("report context, cached (fingerprint known)", per_turn_us(session_report, analyses)),
+        ("fingerprint only", per_turn_us(PromptContextCache.fingerprint, analyses)),
+    ]
+
+    print(f"{ANALYSES} analyses x {TURNS_PER_ANALYSIS} turns:")
+    for label, us in rows:
+        print(f"  {label:<52} {us:8.2f} us/turn")
+    print(f"  chat cache: {chatbot.prompt_cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Micro-benchmark of per-call cost for the calculator and location lookups
+
+Run from the backend directory:
+    python benchmarks/bench_rate_lookup.py
+"""
+
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.carbon_calculator import CarbonCalculator
+from utils.location_service import LocationService
+
+CALLS = 200_000
+BATCH_SIZE = 1_000_000
+
+
+def per_call_ns(statement, number: int = CALLS) -> float:
+    return min(timeit.repeat(statement, number=number, repeat=3)) / number * 1e9
+
+
+def main():
+    calculator = CarbonCalculator()
+    location_service = LocationService()
+    tables = calculator.rate_tables
+
+    vision = {
+        "vegetation_type": "mixed",
+        "vegetation_density": "moderate",
+        "density_percentage": 55.0,
+        "land_condition": "good",
+        "estimated_tree_count": 12,
+        "visible_features": ["scattered trees", "crop rows", "irrigation channel"],
+    }
+    metadata = {"processed_dimensions": "1280x960", "processed_width": 1280, "processed_height": 960}
+    location = {"climate_multiplier": 1.1, "explanation": ""}
+
+    print("Per call:")
+    print(f"  rate_tables.encode                {per_call_ns(lambda: tables.encode('mixed', 'moderate', 'good')):8.0f} ns")
+    print(f"  estimate_land_area                {per_call_ns(lambda: calculator.estimate_land_area(metadata, vision)):8.0f} ns")
+    print(f"  calculate_sequestration           {per_call_ns(lambda: calculator.calculate_sequestration(vision, 1.5, location)):8.0f} ns")
+    print(f"  get_baseline_multiplier           {per_call_ns(lambda: location_service.get_baseline_multiplier('Tamil Nadu')):8.0f} ns")
+
+    rng = np.random.default_rng(0)
+    names = rng.choice(tables.vegetation.names, BATCH_SIZE)
+    codes = tables.vegetation.encode(names)
+    states = rng.choice(list(LocationService.REGIONAL_BASELINE), BATCH_SIZE)
+
+    print(f"Batch of {BATCH_SIZE:,}:")
+    print(f"  encode vegetation strings         {per_call_ns(lambda: tables.vegetation.encode(names), 5) / BATCH_SIZE:8.2f} ns/item")
+    print(f"  lookup by code                    {per_call_ns(lambda: tables.vegetation.values[codes], 5) / BATCH_SIZE:8.2f} ns/item")
+    print(f"  baseline_multipliers (strings)    {per_call_ns(lambda: location_service.baseline_multipliers(states), 5) / BATCH_SIZE:8.2f} ns/item")
+
+
+if __name__ == "__main__":
+    main()
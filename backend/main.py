@@ -1,8 +1,15 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Body
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Body, Header, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+import asyncio
 import os
+import json
+import secrets
 from dotenv import load_dotenv
 import uuid
+import time
+from contextlib import asynccontextmanager, aclosing
 from datetime import datetime
 from typing import Optional, List, Dict
 
@@ -12,17 +19,65 @@ from utils.ai_client import AIClient
 from utils.carbon_calculator import CarbonCalculator
 from utils.report_generator import ReportGenerator
 from utils.location_service import LocationService
+from utils.weather_warmer import WeatherWarmer
 from utils.chatbot_service import ChatbotService
+from utils.prompt_context import PromptContextCache
+from utils.token_counter import TokenCounter
+from utils.knowledge_index import KnowledgeIndex
+from utils.answer_cache import AnswerCache
+from utils.chat_intents import ChatIntentRouter
+from utils.image_similarity import ImageSimilarityIndex
+from utils.image_quality import ImageQualityGate
+from utils.projection import ProjectionEngine
+from utils.analysis_store import AnalysisStore
+from utils.chat_sessions import ChatSessionStore
+from utils.scenario_sweep import ScenarioSweep
+from utils.portfolio import PortfolioAggregator, aggregate_portfolio
 from models.schemas import UploadResponse, VisionAnalysis
+from models.results import AnalysisRecord
 
 # Load environment variables
 load_dotenv()
 
+# Startup and shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("=" * 60)
+    print("Carbon Credit Analyzer API")
+    print("=" * 60)
+    print("FastAPI server initialized")
+    print("All services initialized")
+    
+    # Check API keys
+    keys = {
+        "OpenRouter (Llama Vision + Mistral Chat)": os.getenv("OPENROUTER_API_KEY"),
+        "OpenAI (Reports)": os.getenv("OPENAI_API_KEY"),
+        "OpenWeather (Location)": os.getenv("OPENWEATHER_API_KEY"),
+        "SerpApi (Web Search)": os.getenv("SERPAPI_KEY")
+    }
+    
+    for service, key in keys.items():
+        status = "OK" if key else "MISSING"
+        print(f"{service}: {status}")
+    
+    if weather_warmer.start():
+        print(f"Weather warming: top {weather_warmer.warm_locations} locations")
+    
+    print("=" * 60)
+    print("Visit http://localhost:8000/docs")
+    print("=" * 60)
+    
+    yield
+    
+    await weather_warmer.stop()
+    similarity_index.save()
+
 # Create FastAPI app
 app = FastAPI(
     title="Carbon Credit Analyzer API",
     description="AI-powered analysis of farmland for carbon credit potential",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -37,9 +92,35 @@ app.add_middleware(
 # Initialize services
 ai_client = AIClient()
 carbon_calculator = CarbonCalculator()
-report_generator = ReportGenerator()
+prompt_cache = PromptContextCache()
+report_generator = ReportGenerator(prompt_cache=prompt_cache)
 location_service = LocationService()
-chatbot_service = ChatbotService()
+weather_warmer = WeatherWarmer(
+    location_service,
+    warm_locations=int(os.getenv("WEATHER_WARM_LOCATIONS", WeatherWarmer.WARM_LOCATIONS))
+)
+knowledge_index = KnowledgeIndex(os.getenv("KNOWLEDGE_BASE_DIR"))
+chatbot_service = ChatbotService(
+    prompt_cache=prompt_cache,
+    token_counter=TokenCounter(tokenizer_path=os.getenv("CHAT_TOKENIZER_PATH")),
+    knowledge_index=knowledge_index,
+    answer_cache=AnswerCache(ttl=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", AnswerCache.TTL_SECONDS))),
+    intent_router=ChatIntentRouter(carbon_calculator),
+    search_deadline=float(os.getenv("CHAT_SEARCH_DEADLINE_SECONDS", 0))
+)
+similarity_index = ImageSimilarityIndex(
+    persist_path=os.getenv("SIMILARITY_INDEX_PATH"),
+    max_entries=int(os.getenv("SIMILARITY_INDEX_SIZE", ImageSimilarityIndex.MAX_ENTRIES))
+)
+quality_gate = ImageQualityGate()
+analysis_store = AnalysisStore(
+    max_entries=int(os.getenv("ANALYSIS_STORE_SIZE", AnalysisStore.DEFAULT_MAX_ENTRIES))
+)
+scenario_sweep = ScenarioSweep(carbon_calculator)
+chat_sessions = ChatSessionStore(
+    max_sessions=int(os.getenv("CHAT_SESSION_LIMIT", ChatSessionStore.DEFAULT_MAX_SESSIONS)),
+    ttl=float(os.getenv("CHAT_SESSION_TTL_SECONDS", ChatSessionStore.DEFAULT_TTL_SECONDS))
+)
 
 # Root endpoint
 @app.get("/")
@@ -50,11 +131,20 @@ async def root():
         "status": "running",
         "endpoints": {
             "POST /analyze": "Complete analysis with image + location + report",
+            "POST /analyze/what-if": "Rank intervention scenarios for a completed analysis",
             "POST /chat": "Ask questions about carbon credits or your analysis",
+            "POST /chat/stream": "Same as /chat, streamed token by token (Server-Sent Events)",
             "POST /chat/suggestions": "Get suggested questions",
+            "GET /chat/sessions/{session_id}": "Conversation kept for a chat session",
+            "DELETE /chat/sessions/{session_id}": "End a chat session",
+            "POST /portfolio/aggregate": "Portfolio totals over streamed analyses (NDJSON)",
+            "GET /portfolio": "Portfolio totals over analyses run on this server",
+            "POST /projection": "Year-by-year projection with growth curves, price paths and NPV",
             "GET /test-chatbot": "Test chatbot connection",
             "GET /states": "Get list of Indian states",
+            "GET /locations/autocomplete": "City/state suggestions for a partial name",
             "GET /health": "API health check",
+            "GET /metrics": "Cache and cost-saving counters",
             "GET /docs": "Interactive documentation"
         }
     }
@@ -71,6 +161,27 @@ async def health_check():
         }
     }
 
+# Cache and cost-saving counters
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        "similarity_index": similarity_index.get_stats(),
+        "preflight_quality_gate": quality_gate.get_stats(),
+        "analysis_store": analysis_store.get_stats(),
+        "weather_cache": location_service.weather_cache.get_stats(),
+        "weather_warmer": weather_warmer.get_stats(),
+        "chat_stream": chatbot_service.get_stream_stats(),
+        "chat_sessions": chat_sessions.get_stats(),
+        "prompt_context_cache": prompt_cache.get_stats(),
+        "chat_tokens": chatbot_service.token_counter.get_stats(),
+        "chat_summaries": chatbot_service.get_summary_stats(),
+        "web_search": chatbot_service.web_search.get_stats(),
+        "knowledge_index": knowledge_index.get_stats(),
+        "answer_cache": chatbot_service.answer_cache.get_stats(),
+        "chat_intents": chatbot_service.intents.get_stats(),
+        "chat_search": chatbot_service.get_search_stats()
+    }
+
 # Get states list
 @app.get("/states")
 async def get_states():
@@ -79,6 +190,24 @@ async def get_states():
         "total": len(LocationService.get_state_list())
     }
 
+# City/state suggestions
+@app.get("/locations/autocomplete")
+async def autocomplete_locations(q: str, state: Optional[str] = None, limit: int = 10):
+    """
+    Suggest places for a partial or misspelled name
+    
+    Matches canonical names, former names and codes ("Bangalore",
+    "Orissa", "UP") from the bundled gazetteer; pass state to restrict
+    suggestions to that state's cities.
+    """
+    
+    suggestions = location_service.gazetteer.autocomplete(q, state=state, limit=limit)
+    return {
+        "query": q,
+        "suggestions": suggestions,
+        "total": len(suggestions)
+    }
+
 # Test chatbot connection
 @app.get("/test-chatbot")
 async def test_chatbot():
@@ -89,12 +218,57 @@ async def test_chatbot():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _open_chat_session(
+    session_id: Optional[str],
+    conversation_history: Optional[List[Dict[str, str]]],
+    user_analysis: Optional[Dict],
+    analysis_id: Optional[str]
+):
+    """
+    Session for a chat turn, plus the analysis to use as context and its
+    content fingerprint
+    
+    An existing session_id continues that conversation (404 if unknown or
+    expired); otherwise a new session is started, seeded with any
+    conversation_history sent by older clients. An unknown analysis_id
+    falls back to user_analysis if both were sent.
+    """
+    
+    if analysis_id and analysis_store.get(analysis_id) is None:
+        if user_analysis is None:
+            raise HTTPException(status_code=404, detail=f"Analysis {analysis_id} not found - send user_analysis instead")
+        analysis_id = None
+    
+    if session_id:
+        session = chat_sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Chat session {session_id} not found or expired - start a new one")
+        chat_sessions.set_analysis(session, user_analysis=user_analysis, analysis_id=analysis_id)
+    else:
+        session = chat_sessions.create(
+            history=conversation_history,
+            user_analysis=user_analysis,
+            analysis_id=analysis_id
+        )
+    
+    analysis = session.user_analysis
+    fingerprint = session.analysis_fingerprint
+    if session.analysis_id:
+        record = analysis_store.get(session.analysis_id)
+        analysis = record.to_dict() if record else None
+        fingerprint = analysis_store.fingerprint(session.analysis_id)
+    
+    return session, analysis, fingerprint
+
 # Chatbot endpoint
 @app.post("/chat")
 async def chat(
+    background_tasks: BackgroundTasks,
     message: str = Body(..., embed=True, description="Your question"),
-    conversation_history: Optional[List[Dict[str, str]]] = Body(None, description="Previous messages"),
-    user_analysis: Optional[Dict] = Body(None, description="Your complete analysis data for context")
+    session_id: Optional[str] = Body(None, description="Chat session to continue (returned by the previous turn)"),
+    conversation_history: Optional[List[Dict[str, str]]] = Body(None, description="Previous messages (only used when starting a session)"),
+    user_analysis: Optional[Dict] = Body(None, description="Your complete analysis data for context"),
+    analysis_id: Optional[str] = Body(None, description="ID of an analysis run on this server (instead of user_analysis)")
 ):
     """
     Chat with AI assistant about carbon credits
@@ -111,16 +285,23 @@ async def chat(
     - "What are the latest carbon credit prices in India?"
     - "Are there programs specific to Gujarat?"
     
-    Provide your complete analysis data for personalized answers.
+    The conversation is kept on the server: the response includes a
+    session_id - send it with the next message instead of the history.
+    Provide your analysis (or its analysis_id) once for personalized answers.
+    Older turns are summarized in the background after the response is sent.
     """
     
+    session, analysis, fingerprint = _open_chat_session(session_id, conversation_history, user_analysis, analysis_id)
+    
     try:
         print(f"\n[CHAT] User: {message[:100]}...")
         
         result = await chatbot_service.chat(
             user_message=message,
-            conversation_history=conversation_history,
-            user_analysis=user_analysis
+            conversation_history=session.unsummarized(),
+            user_analysis=analysis,
+            conversation_summary=session.summary,
+            analysis_fingerprint=fingerprint
         )
         
         if result.get('search_performed'):
@@ -132,13 +313,20 @@ async def chat(
         if context_info.get('conversation_truncated'):
             print(f"[CHAT] Context truncated - keeping {context_info.get('messages_in_context')} messages")
         
+        if result["status"] == "success":
+            chat_sessions.append(session, "user", message)
+            chat_sessions.append(session, "assistant", result["response"])
+            background_tasks.add_task(chatbot_service.update_summary, session, chat_sessions)
+        
         return {
             "status": result["status"],
+            "session_id": session.session_id,
             "response": result["response"],
             "tokens": result.get("tokens", {}),
             "model": result.get("model"),
             "search_performed": result.get("search_performed", False),
-            "context_info": result.get("context_info", {})
+            "context_info": result.get("context_info", {}),
+            "cached": result.get("cached", False)
         }
         
     except Exception as e:
@@ -148,6 +336,126 @@ async def chat(
             detail=f"Chat failed: {str(e)}"
         )
 
+# Streaming chatbot endpoint
+@app.post("/chat/stream")
+async def chat_stream(
+    request: Request,
+    message: str = Body(..., embed=True, description="Your question"),
+    session_id: Optional[str] = Body(None, description="Chat session to continue (returned by the previous turn)"),
+    conversation_history: Optional[List[Dict[str, str]]] = Body(None, description="Previous messages (only used when starting a session)"),
+    user_analysis: Optional[Dict] = Body(None, description="Your complete analysis data for context"),
+    analysis_id: Optional[str] = Body(None, description="ID of an analysis run on this server (instead of user_analysis)")
+):
+    """
+    Chat with AI assistant, streamed as Server-Sent Events
+    
+    Same inputs as /chat. Events:
+    - start: sent immediately, with the session_id
+    - token: {"text": ...} for each piece of the answer as it is generated
+    - done: full response, tokens, model, search_performed, context_info, timing
+    - error: sent instead of done if the model call fails
+    
+    If the client disconnects, generation upstream is stopped and the
+    turn is not added to the session. Older turns are summarized once the
+    stream has finished.
+    """
+    
+    session, analysis, fingerprint = _open_chat_session(session_id, conversation_history, user_analysis, analysis_id)
+    print(f"\n[CHAT] User (stream): {message[:100]}...")
+    
+    async def events():
+        async with aclosing(chatbot_service.chat_stream(
+            user_message=message,
+            conversation_history=session.unsummarized(),
+            user_analysis=analysis,
+            conversation_summary=session.summary,
+            analysis_fingerprint=fingerprint
+        )) as stream:
+            async for event in stream:
+                if await request.is_disconnected():
+                    print("[CHAT] Client disconnected - stopping stream")
+                    break
+                name = event.pop("event")
+                if name == "start":
+                    event["session_id"] = session.session_id
+                elif name == "done":
+                    event["session_id"] = session.session_id
+                    chat_sessions.append(session, "user", message)
+                    chat_sessions.append(session, "assistant", event["response"])
+                    print(f"[CHAT] Streamed response: {event['response'][:100]}... (first token {event['timing']['time_to_first_token_ms']} ms)")
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(chatbot_service.update_summary, session, chat_sessions)
+    )
+
+# Knowledge base retrieval
+@app.get("/knowledge/search")
+async def search_knowledge(
+    q: str,
+    limit: int = KnowledgeIndex.TOP_K
+):
+    """Knowledge base passages the chatbot would use for a question"""
+    
+    limit = max(1, min(limit, 10))
+    return {
+        "status": "success",
+        "query": q,
+        "passages": knowledge_index.search(q, top_k=limit)
+    }
+
+# Re-read the knowledge base after editing its markdown files
+@app.post("/knowledge/rebuild")
+async def rebuild_knowledge(x_admin_token: Optional[str] = Header(None)):
+    """
+    Rebuild the knowledge index (admin only)
+    
+    Requires the X-Admin-Token header to match the ADMIN_TOKEN environment
+    variable; disabled when ADMIN_TOKEN is not set. The index is rebuilt
+    in a worker thread, so chat keeps being served meanwhile.
+    """
+    
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Knowledge rebuild is disabled - set ADMIN_TOKEN to enable it")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token")
+    
+    stats = await asyncio.to_thread(knowledge_index.rebuild)
+    # Cached answers may rest on the old passages
+    chatbot_service.answer_cache.clear()
+    return {
+        "status": "success",
+        "knowledge_index": stats
+    }
+
+# Chat session history
+@app.get("/chat/sessions/{session_id}")
+async def get_chat_session(session_id: str):
+    session = chat_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Chat session {session_id} not found or expired")
+    return {
+        "status": "success",
+        "session_id": session.session_id,
+        "analysis_id": session.analysis_id,
+        "has_analysis": bool(session.analysis_id or session.user_analysis),
+        "turns": session.turns,
+        "summary": session.summary,
+        "summarized_messages": session.summarized,
+        "messages": session.history()
+    }
+
+# End a chat session
+@app.delete("/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Chat session {session_id} not found or expired")
+    return {"status": "success", "session_id": session_id}
+
 # Get suggested questions
 @app.post("/chat/suggestions")
 async def get_suggestions(
@@ -175,13 +483,138 @@ async def get_suggestions(
             ]
         }
 
+# Long-term projection for a completed analysis
+@app.post("/projection")
+async def get_projection(
+    user_analysis: Dict = Body(..., description="Your complete analysis data"),
+    horizon_years: int = Body(ProjectionEngine.DEFAULT_HORIZON_YEARS, description="Projection horizon (1-40 years)"),
+    discount_rate: float = Body(ProjectionEngine.DEFAULT_DISCOUNT_RATE, description="Annual discount rate for NPV")
+):
+    """
+    Project sequestration and revenue year by year
+    
+    Applies vegetation growth curves, credit price paths and discounting
+    to an existing analysis - no image or AI calls needed.
+    """
+    
+    carbon_est = user_analysis.get("carbon_analysis", {}).get("carbon_estimate", {})
+    vision = user_analysis.get("vision_analysis", {})
+    
+    try:
+        projection = carbon_calculator.projection.project(
+            carbon_est.get("annual_sequestration_tons", 0.0),
+            vision.get("vegetation_type", "unknown"),
+            horizon_years=horizon_years,
+            discount_rate=discount_rate
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "status": "success",
+        "projection": projection
+    }
+
+# Portfolio totals over analyses run on this server
+@app.get("/portfolio")
+async def get_portfolio():
+    """
+    Aggregate every analysis kept in memory on this server
+    
+    Returns totals, revenue bands, per-parcel percentiles and breakdowns
+    by state, vegetation type and confidence.
+    """
+    
+    return {
+        "status": "success",
+        "source": "analysis_store",
+        "portfolio": aggregate_portfolio(record.to_dict() for record in analysis_store.values())
+    }
+
+# Portfolio totals over submitted analyses
+@app.post("/portfolio/aggregate")
+async def aggregate_portfolio_stream(request: Request):
+    """
+    Aggregate analyses streamed as NDJSON (one /analyze response per line)
+    
+    The body is read incrementally and folded into running totals, so
+    memory use does not grow with the number of parcels. Lines that are
+    not valid analyses are counted in skipped_records.
+    """
+    
+    start = time.perf_counter()
+    aggregator = PortfolioAggregator()
+    pending = b""
+    
+    async for chunk in request.stream():
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            aggregator.add_json_line(line)
+    aggregator.add_json_line(pending)
+    
+    portfolio = aggregator.result()
+    portfolio["compute_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    print(f"[PORTFOLIO] {portfolio['parcels']} parcels aggregated in {portfolio['compute_ms']} ms")
+    
+    return {
+        "status": "success",
+        "source": "request",
+        "portfolio": portfolio
+    }
+
+# What-if scenarios for a completed analysis
+@app.post("/analyze/what-if")
+async def what_if_analysis(
+    interventions: Dict[str, List] = Body(..., description="Values to try per input, e.g. {\"vegetation_type\": [\"mixed\", \"forest\"], \"land_condition\": [\"good\"]}"),
+    analysis_id: Optional[str] = Body(None, description="ID of an analysis run on this server"),
+    user_analysis: Optional[Dict] = Body(None, description="Your complete analysis data (if no analysis_id)"),
+    rank_by: str = Body("revenue", description="Rank by 'revenue' (INR) or 'tons' (CO2) uplift"),
+    top_n: int = Body(ScenarioSweep.DEFAULT_TOP_N, description="Number of scenarios to return")
+):
+    """
+    Quantify recommendations without a new image
+    
+    Every combination of the given interventions is evaluated locally
+    against the baseline analysis - no vision or AI calls.
+    
+    Supported interventions:
+    - vegetation_type, vegetation_density, land_condition
+    - density_percentage, area_hectares, credit_price_inr
+    """
+    
+    if analysis_id:
+        record = analysis_store.get(analysis_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"Analysis {analysis_id} not found - send user_analysis instead")
+        analysis = record.to_dict()
+    elif user_analysis:
+        analysis = user_analysis
+    else:
+        raise HTTPException(status_code=400, detail="Provide analysis_id or user_analysis")
+    
+    try:
+        result = scenario_sweep.sweep(analysis, interventions, rank_by=rank_by, top_n=top_n)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    print(f"[WHAT-IF] {result['scenarios_evaluated']} scenarios in {result['compute_ms']} ms")
+    
+    return {
+        "status": "success",
+        "analysis_id": analysis.get("analysis_id"),
+        "what_if": result
+    }
+
 # MAIN ENDPOINT - Complete Analysis
 @app.post("/analyze")
 async def analyze_land(
     file: UploadFile = File(..., description="Farmland image (JPEG/PNG/WebP, max 10MB)"),
     city: Optional[str] = Form(None, description="City name (e.g., Surat)"),
     state: Optional[str] = Form(None, description="State name (e.g., Gujarat)"),
-    include_report: bool = Form(True, description="Generate professional report (recommended)")
+    include_report: bool = Form(True, description="Generate professional report (recommended)"),
+    reuse_similar: bool = Form(True, description="Reuse the vision result of a near-identical earlier upload")
 ):
     """
     Complete farmland carbon credit analysis
@@ -193,6 +626,7 @@ async def analyze_land(
     - city: Your city (optional but recommended)
     - state: Your state (optional but recommended)
     - include_report: Generate reports (default: true)
+    - reuse_similar: Reuse the vision result of a near-identical earlier upload (default: true)
     
     Returns: Complete analysis with vision, carbon calculations, and reports
     """
@@ -210,13 +644,23 @@ async def analyze_land(
         image_quality = ImageProcessor.estimate_image_quality(metadata)
         print(f"[{analysis_id}] Image processed: {metadata['processed_dimensions']}")
         
+        # Pre-flight quality gate: reject unusable images before the vision call
+        preflight = metadata["preflight"]
+        quality_gate.record(preflight)
+        print(f"[{analysis_id}] Pre-flight: {preflight['verdict']} (score {preflight['score']}, {preflight['compute_ms']} ms)")
+        if preflight["verdict"] == "reject":
+            raise HTTPException(
+                status_code=422,
+                detail=f"Image not suitable for analysis: {'; '.join(preflight['issues'])}"
+            )
+        
         # STEP 2: Location Analysis (optional)
         location_data = None
         if city and state:
             print(f"[{analysis_id}] Fetching location data: {city}, {state}")
             try:
                 location_data = await location_service.get_location_analysis(city, state)
-                print(f"[{analysis_id}] Location multiplier: {location_data['climate_multiplier']}x")
+                print(f"[{analysis_id}] Location multiplier: {location_data['climate_multiplier']}x ({location_data['climate_source']})")
                 if location_data.get('weather_data'):
                     w = location_data['weather_data']
                     print(f"[{analysis_id}] Weather: {w['temperature']}°C, {w['humidity']}% humidity")
@@ -226,18 +670,40 @@ async def analyze_land(
         else:
             print(f"[{analysis_id}] No location provided - using baseline")
         
-        # STEP 3: AI Vision Analysis
-        print(f"[{analysis_id}] Running Llama Vision analysis...")
-        vision_result = await ai_client.analyze_image_with_llama_vision(
-            base64_image, 
-            metadata
-        )
+        # STEP 3: AI Vision Analysis (skipped for repeat photos of the same plot)
+        similarity_match = similarity_index.find_nearest(metadata["perceptual_hash"])
+        reused_result = similarity_index.reuse(similarity_match) if reuse_similar else None
+        vision_reused = reused_result is not None
+        
+        if vision_reused:
+            print(f"[{analysis_id}] Near-identical image found (distance {similarity_match['distance']}) - reusing vision result")
+            vision_result = reused_result
+            vision_result["api_usage"] = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        else:
+            print(f"[{analysis_id}] Running Llama Vision analysis...")
+            vision_result = await ai_client.analyze_image_with_llama_vision(
+                base64_image, 
+                metadata,
+                reference_analysis=similarity_match["vision_result"] if similarity_match else None
+            )
+            similarity_index.add(metadata["perceptual_hash"], analysis_id, vision_result)
+            if similarity_index.save_due():
+                await asyncio.to_thread(similarity_index.save, entries=similarity_index.snapshot())
+        
         vision_result["image_quality"] = image_quality
+        vision_result["image_quality_score"] = preflight["score"]
+        vision_result["vegetation_indices"] = metadata.pop("vegetation_indices", None)
         
         print(f"[{analysis_id}] Vision complete:")
         print(f"[{analysis_id}]   Type: {vision_result['vegetation_type']}")
         print(f"[{analysis_id}]   Density: {vision_result['density_percentage']}%")
         print(f"[{analysis_id}]   Condition: {vision_result['land_condition']}")
+        if vision_result["vegetation_indices"]:
+            veg_idx = vision_result["vegetation_indices"]
+            if veg_idx["canopy_cover_percentage"] is None:
+                print(f"[{analysis_id}]   Pixel canopy cover: no usable pixels ({veg_idx['compute_ms']} ms)")
+            else:
+                print(f"[{analysis_id}]   Pixel canopy cover: {veg_idx['canopy_cover_percentage']}% ({veg_idx['compute_ms']} ms)")
         
         # STEP 4: Carbon Calculations
         print(f"[{analysis_id}] Calculating carbon potential...")
@@ -261,6 +727,11 @@ async def analyze_land(
             "location_data": location_data,
             "vision_analysis": vision_result,
             "carbon_analysis": carbon_analysis,
+            "similarity_match": {
+                "matched_analysis_id": similarity_match["analysis_id"],
+                "distance": similarity_match["distance"],
+                "vision_result_reused": vision_reused
+            } if similarity_match else None,
             "summary": {
                 "vegetation_type": vision_result["vegetation_type"],
                 "land_condition": vision_result["land_condition"],
@@ -270,6 +741,11 @@ async def analyze_land(
                     "mid_range": carbon_est['potential_revenue_inr']['1_year']['mid'],
                     "optimistic": carbon_est['potential_revenue_inr']['1_year']['max']
                 },
+                "annual_revenue_range_p10_p90_inr": {
+                    "p10": carbon_est['uncertainty']['annual_revenue_inr']['p10'],
+                    "p50": carbon_est['uncertainty']['annual_revenue_inr']['p50'],
+                    "p90": carbon_est['uncertainty']['annual_revenue_inr']['p90']
+                },
                 "estimated_land_area_hectares": carbon_est['estimated_land_area_hectares'],
                 "annual_co2_sequestration_tons": carbon_est['annual_sequestration_tons'],
                 "confidence": carbon_est['confidence_level']
@@ -294,6 +770,9 @@ async def analyze_land(
                 print(f"[{analysis_id}] Report generation failed: {str(e)}")
                 response["reports"] = {"error": str(e)}
         
+        record = AnalysisRecord.from_response(response)
+        analysis_store.put(analysis_id, record, fingerprint=PromptContextCache.fingerprint(record.to_dict()))
+        
         print(f"[{analysis_id}] COMPLETE")
         print(f"{'='*60}\n")
         
@@ -309,28 +788,3 @@ async def analyze_land(
             status_code=500,
             detail=f"Analysis failed: {str(e)}"
         )
-
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    print("=" * 60)
-    print("Carbon Credit Analyzer API")
-    print("=" * 60)
-    print("FastAPI server initialized")
-    print("All services initialized")
-    
-    # Check API keys
-    keys = {
-        "OpenRouter (Llama Vision + Mistral Chat)": os.getenv("OPENROUTER_API_KEY"),
-        "OpenAI (Reports)": os.getenv("OPENAI_API_KEY"),
-        "OpenWeather (Location)": os.getenv("OPENWEATHER_API_KEY"),
-        "SerpApi (Web Search)": os.getenv("SERPAPI_KEY")
-    }
-    
-    for service, key in keys.items():
-        status = "OK" if key else "MISSING"
-        print(f"{service}: {status}")
-    
-    print("=" * 60)
-    print("Visit http://localhost:8000/docs")
-    print("=" * 60)
\ No newline at end of file
@@ -0,0 +1,424 @@
+import sys
+from array import array
+from typing import Dict, Any, Optional, Tuple
+
+
+class SlottedResult:
+    """
+    Base for compact result records
+
+    Subclasses list their fields in __slots__, so instances carry no
+    per-object __dict__. On conversion from the pipeline's plain dicts:
+    - nested dicts listed in NESTED become records too
+    - lists become tuples
+    - strings in INTERNED fields (categories, template text) are interned,
+      so thousands of stored analyses share one copy of each
+
+    to_dict() returns the same plain dict shape the API has always returned.
+    """
+
+    __slots__ = ()
+
+    # Field -> record class for nested results
+    NESTED: Dict[str, type] = {}
+
+    # Fields whose strings (or tuple of strings) repeat across analyses
+    INTERNED: Tuple[str, ...] = ()
+
+    # Fields left out of to_dict() when None (absent in the source dict)
+    OPTIONAL: Tuple[str, ...] = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]):
+        """Build a record from a pipeline dict (None stays None)"""
+
+        if data is None:
+            return None
+
+        values = {}
+        for name in cls.__slots__:
+            value = data.get(name)
+            if value is None:
+                pass
+            elif name in cls.NESTED:
+                value = cls.NESTED[name].from_dict(value)
+            elif isinstance(value, list):
+                if name in cls.INTERNED:
+                    value = tuple(sys.intern(v) if isinstance(v, str) else v for v in value)
+                else:
+                    value = tuple(value)
+            elif name in cls.INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            values[name] = value
+        return cls(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict view for the API"""
+
+        result = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is None and name in self.OPTIONAL:
+                continue
+            if isinstance(value, SlottedResult):
+                value = value.to_dict()
+            elif isinstance(value, tuple):
+                value = list(value)
+            result[name] = value
+        return result
+
+    def __eq__(self, other) -> bool:
+        return type(other) is type(self) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class VegetationIndices(SlottedResult):
+    """Pixel vegetation indices (VegetationIndexAnalyzer.analyze)"""
+
+    __slots__ = (
+        "exg_mean", "vari_mean", "gli_mean", "canopy_cover_percentage",
+        "vegetation_density", "pixels_analyzed", "usable_pixel_fraction",
+        "exg_threshold", "compute_ms"
+    )
+    INTERNED = ("vegetation_density",)
+
+
+class VisionResult(SlottedResult):
+    """Validated vision model output (AIClient._validate_and_fix_analysis)"""
+
+    __slots__ = (
+        "vegetation_type", "vegetation_density", "density_percentage",
+        "estimated_tree_count", "land_condition", "visible_features",
+        "confidence", "reasoning", "image_quality", "image_quality_score",
+        "vegetation_indices", "api_usage"
+    )
+    NESTED = {"vegetation_indices": VegetationIndices}
+    INTERNED = (
+        "vegetation_type", "vegetation_density", "land_condition",
+        "visible_features", "image_quality", "confidence"
+    )
+    OPTIONAL = ("image_quality_score", "api_usage")
+
+
+class SequestrationDetails(SlottedResult):
+    """CarbonCalculator.calculate_sequestration result"""
+
+    __slots__ = (
+        "base_rate", "density_multiplier", "condition_multiplier",
+        "density_percentage_multiplier", "effective_rate_per_hectare",
+        "estimated_area_hectares", "density_percentage", "annual_co2_tons",
+        "density_source", "density_cross_check", "climate_multiplier",
+        "location_adjustment"
+    )
+    INTERNED = ("density_source", "location_adjustment")
+    OPTIONAL = ("density_cross_check", "climate_multiplier", "location_adjustment")
+
+
+class LocationInfo(SlottedResult):
+    __slots__ = ("city", "state", "climate_zone", "coordinates")
+    INTERNED = ("city", "state", "climate_zone")
+    OPTIONAL = ("coordinates",)
+
+
+class ClimateNormalsData(SlottedResult):
+    __slots__ = ("annual_rainfall_mm", "mean_temperature_c", "mean_humidity_pct", "source")
+    INTERNED = ("source",)
+
+
+class WeatherData(SlottedResult):
+    __slots__ = ("temperature", "humidity", "weather", "description", "coordinates")
+    INTERNED = ("weather", "description")
+
+
+class LocationData(SlottedResult):
+    """LocationService.get_location_analysis result"""
+
+    __slots__ = (
+        "location", "climate_multiplier", "baseline_multiplier",
+        "climate_source", "climate_normals", "weather_data",
+        "adjustments", "explanation"
+    )
+    NESTED = {"location": LocationInfo, "climate_normals": ClimateNormalsData, "weather_data": WeatherData}
+    INTERNED = ("climate_source", "adjustments", "explanation")
+    OPTIONAL = ("climate_source", "climate_normals")
+
+
+class RevenueProjections(SlottedResult):
+    """
+    1/5/10-year revenue at min/mid/max prices
+
+    The nine values live in one flat array('d') instead of nested dicts
+    of float objects.
+    """
+
+    __slots__ = ("values",)
+
+    HORIZONS = ("1_year", "5_year", "10_year")
+    BANDS = ("min", "mid", "max")
+
+    def __init__(self, values=()):
+        self.values = array("d", values)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]):
+        if data is None:
+            return None
+        return cls(data[horizon][band] for horizon in cls.HORIZONS for band in cls.BANDS)
+
+    def get(self, horizon: str, band: str) -> float:
+        return self.values[self.HORIZONS.index(horizon) * 3 + self.BANDS.index(band)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        values = self.values
+        return {
+            horizon: {band: values[i * 3 + j] for j, band in enumerate(self.BANDS)}
+            for i, horizon in enumerate(self.HORIZONS)
+        }
+
+
+class UncertaintyBands(SlottedResult):
+    """MonteCarloEstimator.simulate result, bands packed into array('d')"""
+
+    __slots__ = ("values", "draws", "seed", "note")
+
+    OUTPUTS = ("annual_co2_tons", "annual_revenue_inr")
+    STATS = ("p10", "p50", "p90", "mean")
+
+    def __init__(self, values=(), draws=None, seed=None, note=None):
+        self.values = array("d", values)
+        self.draws = draws
+        self.seed = seed
+        self.note = note
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]):
+        if data is None:
+            return None
+        return cls(
+            (data[output][stat] for output in cls.OUTPUTS for stat in cls.STATS),
+            draws=data.get("draws"),
+            seed=data.get("seed"),
+            note=sys.intern(data["note"]) if data.get("note") else None
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        values = self.values
+        size = len(self.STATS)
+        result = {
+            output: {stat: values[i * size + j] for j, stat in enumerate(self.STATS)}
+            for i, output in enumerate(self.OUTPUTS)
+        }
+        result.update({"draws": self.draws, "seed": self.seed, "note": self.note})
+        return result
+
+
+class SensitivityDriver(SlottedResult):
+    """Top driver of a sensitivity analysis (SensitivityAnalyzer.analyze)"""
+
+    __slots__ = ("input", "label", "share_of_revenue_variance_percent", "explanation")
+    INTERNED = ("input", "label")
+
+
+class RevenueDriver(SlottedResult):
+    """One input's share of the revenue uncertainty (Sobol) and its tornado swing"""
+
+    __slots__ = ("input", "label", "total_effect", "annual_revenue_inr_low", "annual_revenue_inr_high")
+    INTERNED = ("input", "label")
+
+    @classmethod
+    def from_sensitivity(cls, sensitivity: Dict[str, Any]) -> Tuple["RevenueDriver", ...]:
+        swings = {row["input"]: row for row in sensitivity.get("tornado") or []}
+        return tuple(
+            cls(
+                input=sys.intern(row["input"]),
+                label=sys.intern(row["label"]),
+                total_effect=row["total_effect"],
+                annual_revenue_inr_low=swings.get(row["input"], {}).get("annual_revenue_inr_low"),
+                annual_revenue_inr_high=swings.get(row["input"], {}).get("annual_revenue_inr_high")
+            )
+            for row in (sensitivity.get("sobol") or {}).get("annual_revenue_inr") or []
+        )
+
+
+class ProjectionSummary(SlottedResult):
+    """Headline figures of a long-term projection (ProjectionEngine.project)"""
+
+    __slots__ = (
+        "horizon_years", "discount_rate", "vegetation_type",
+        "total_sequestration_tons", "mid_total_revenue_inr", "mid_npv_inr"
+    )
+    INTERNED = ("vegetation_type",)
+
+    @classmethod
+    def from_projection(cls, projection: Optional[Dict[str, Any]]):
+        if not projection:
+            return None
+        mid = (projection.get("scenarios") or {}).get("mid") or {}
+        return cls(
+            horizon_years=projection.get("horizon_years"),
+            discount_rate=projection.get("discount_rate"),
+            vegetation_type=sys.intern(projection["vegetation_type"]) if projection.get("vegetation_type") else None,
+            total_sequestration_tons=projection.get("total_sequestration_tons"),
+            mid_total_revenue_inr=mid.get("total_revenue_inr"),
+            mid_npv_inr=mid.get("npv_inr")
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Projection-shaped dict without the yearly series"""
+
+        return {
+            "horizon_years": self.horizon_years,
+            "discount_rate": self.discount_rate,
+            "vegetation_type": self.vegetation_type,
+            "total_sequestration_tons": self.total_sequestration_tons,
+            "scenarios": {"mid": {"total_revenue_inr": self.mid_total_revenue_inr, "npv_inr": self.mid_npv_inr}},
+            "summary_only": True
+        }
+
+
+class AnalysisRecord(SlottedResult):
+    """
+    Compact stored form of one /analyze response
+
+    Keeps the inputs and headline outputs that follow-up endpoints use
+    (what-if, portfolio, chat context), including the compact summaries
+    the chat prompt reads: projection totals, the revenue drivers (Sobol
+    share and tornado swing per input), next steps and the executive
+    summary. Bulky derived blocks are dropped: the yearly projection
+    series (regenerate with /projection), the rest of the tornado/Sobol
+    tables, image metadata and the full reports.
+    """
+
+    __slots__ = (
+        "analysis_id", "timestamp", "vision_analysis", "location_data",
+        "calculation_details", "potential_revenue_inr", "uncertainty",
+        "top_driver", "annual_sequestration_tons", "estimated_land_area_hectares",
+        "area_estimation_method", "potential_annual_credits", "confidence_level",
+        "recommendations", "similarity_match", "revenue_drivers", "projection",
+        "next_steps", "executive_summary"
+    )
+    INTERNED = ("area_estimation_method", "confidence_level", "recommendations", "next_steps")
+
+    @classmethod
+    def from_response(cls, response: Dict[str, Any]) -> "AnalysisRecord":
+        """Build a record from a complete /analyze response"""
+
+        carbon_analysis = response["carbon_analysis"]
+        carbon_est = carbon_analysis["carbon_estimate"]
+        sensitivity = carbon_est.get("sensitivity") or {}
+
+        return cls(
+            analysis_id=response.get("analysis_id"),
+            timestamp=response.get("timestamp"),
+            vision_analysis=VisionResult.from_dict(response.get("vision_analysis")),
+            location_data=LocationData.from_dict(response.get("location_data")),
+            calculation_details=SequestrationDetails.from_dict(carbon_est["calculation_details"]),
+            potential_revenue_inr=RevenueProjections.from_dict(carbon_est["potential_revenue_inr"]),
+            uncertainty=UncertaintyBands.from_dict(carbon_est.get("uncertainty")),
+            top_driver=SensitivityDriver.from_dict(sensitivity.get("top_driver")),
+            annual_sequestration_tons=carbon_est["annual_sequestration_tons"],
+            estimated_land_area_hectares=carbon_est["estimated_land_area_hectares"],
+            area_estimation_method=sys.intern(carbon_est["area_estimation_method"]),
+            potential_annual_credits=carbon_est["potential_annual_credits"],
+            confidence_level=sys.intern(carbon_est["confidence_level"]),
+            recommendations=tuple(sys.intern(r) for r in carbon_analysis.get("recommendations", [])),
+            similarity_match=response.get("similarity_match"),
+            revenue_drivers=RevenueDriver.from_sensitivity(sensitivity),
+            projection=ProjectionSummary.from_projection(carbon_est.get("long_term_projection")),
+            next_steps=tuple(sys.intern(step) for step in carbon_analysis.get("next_steps", [])),
+            executive_summary=(response.get("reports") or {}).get("executive_summary")
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Response-shaped dict (minus the dropped blocks; projection and sensitivity summarized)"""
+
+        vision = self.vision_analysis.to_dict() if self.vision_analysis else {}
+        location = self.location_data.to_dict() if self.location_data else None
+        revenue = self.potential_revenue_inr.to_dict()
+        uncertainty = self.uncertainty.to_dict() if self.uncertainty else None
+
+        carbon_estimate = {
+            "annual_sequestration_tons": self.annual_sequestration_tons,
+            "estimated_land_area_hectares": self.estimated_land_area_hectares,
+            "area_estimation_method": self.area_estimation_method,
+            "potential_annual_credits": self.potential_annual_credits,
+            "potential_revenue_inr": revenue,
+            "confidence_level": self.confidence_level,
+            "uncertainty": uncertainty,
+            "sensitivity": self._sensitivity(),
+            "calculation_details": self.calculation_details.to_dict()
+        }
+        if self.projection:
+            carbon_estimate["long_term_projection"] = self.projection.to_dict()
+
+        carbon_analysis = {
+            "carbon_estimate": carbon_estimate,
+            "recommendations": list(self.recommendations),
+            "next_steps": list(self.next_steps or ())
+        }
+        if location:
+            carbon_analysis["location_analysis"] = location
+
+        location_info = location["location"] if location else None
+        summary = {
+            "vegetation_type": vision.get("vegetation_type"),
+            "land_condition": vision.get("land_condition"),
+            "location": f"{location_info['city']}, {location_info['state']}" if location_info else "Not provided",
+            "estimated_annual_revenue_inr": {
+                "conservative": revenue["1_year"]["min"],
+                "mid_range": revenue["1_year"]["mid"],
+                "optimistic": revenue["1_year"]["max"]
+            },
+            "estimated_land_area_hectares": self.estimated_land_area_hectares,
+            "annual_co2_sequestration_tons": self.annual_sequestration_tons,
+            "confidence": self.confidence_level
+        }
+        if uncertainty:
+            summary["annual_revenue_range_p10_p90_inr"] = {
+                stat: uncertainty["annual_revenue_inr"][stat] for stat in ("p10", "p50", "p90")
+            }
+
+        result = {
+            "analysis_id": self.analysis_id,
+            "status": "success",
+            "timestamp": self.timestamp,
+            "location_data": location,
+            "vision_analysis": vision,
+            "carbon_analysis": carbon_analysis,
+            "similarity_match": self.similarity_match,
+            "summary": summary
+        }
+        if self.executive_summary:
+            result["reports"] = {"executive_summary": self.executive_summary}
+        return result
+
+    def _sensitivity(self) -> Optional[Dict[str, Any]]:
+        if not self.top_driver and not self.revenue_drivers:
+            return None
+        drivers = self.revenue_drivers or ()
+        return {
+            "top_driver": self.top_driver.to_dict() if self.top_driver else None,
+            "sobol": {
+                "annual_revenue_inr": [
+                    {"input": d.input, "label": d.label, "total_effect": d.total_effect} for d in drivers
+                ]
+            },
+            "tornado": [
+                {
+                    "input": d.input,
+                    "label": d.label,
+                    "annual_revenue_inr_low": d.annual_revenue_inr_low,
+                    "annual_revenue_inr_high": d.annual_revenue_inr_high
+                }
+                for d in drivers
+            ]
+        }
@@ -0,0 +1,104 @@
+"""
+Build the bundled climate-normals grid from station normals
+
+Interpolates data/climate_stations.csv (approximate long-term annual
+normals for ~70 Indian stations) onto a regular 0.25 degree lat/lon grid
+with inverse-distance weighting and writes:
+    data/climate_normals_india.npy   float32 array (variables, lat, lon)
+    data/climate_normals_india.json  grid metadata
+
+Cells further than MAX_DISTANCE_DEG from every station are NaN (outside
+coverage). Rainfall is interpolated in log space since it varies by
+orders of magnitude between neighbouring regions.
+
+Run from the backend directory:
+    python scripts/build_climate_normals.py
+"""
+
+import csv
+import json
+import os
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
+
+STATIONS_CSV = os.path.join(DATA_DIR, "climate_stations.csv")
+GRID_NPY = os.path.join(DATA_DIR, "climate_normals_india.npy")
+GRID_JSON = os.path.join(DATA_DIR, "climate_normals_india.json")
+
+LAT_MIN, LAT_MAX = 6.0, 37.5
+LON_MIN, LON_MAX = 68.0, 97.5
+STEP = 0.25
+
+NEAREST_STATIONS = 6
+POWER = 2.0
+MAX_DISTANCE_DEG = 3.5
+
+VARIABLES = ("annual_rainfall_mm", "mean_temperature_c", "mean_humidity_pct")
+LOG_VARIABLES = ("annual_rainfall_mm",)
+
+
+def load_stations(path: str) -> dict:
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    columns = {"lat": [], "lon": []}
+    columns.update({name: [] for name in VARIABLES})
+    for row in rows:
+        for name in columns:
+            columns[name].append(float(row[name]))
+    return {name: np.array(values) for name, values in columns.items()}
+
+
+def build_grid(stations: dict) -> np.ndarray:
+    lats = np.arange(LAT_MIN, LAT_MAX + STEP / 2, STEP)
+    lons = np.arange(LON_MIN, LON_MAX + STEP / 2, STEP)
+    grid_lat, grid_lon = np.meshgrid(lats, lons, indexing="ij")
+
+    # Distances in degrees with longitude scaled by cos(latitude)
+    dlat = grid_lat[..., None] - stations["lat"]
+    dlon = (grid_lon[..., None] - stations["lon"]) * np.cos(np.radians(grid_lat[..., None]))
+    distance = np.hypot(dlat, dlon)
+
+    nearest = np.argsort(distance, axis=-1)[..., :NEAREST_STATIONS]
+    nearest_distance = np.take_along_axis(distance, nearest, axis=-1)
+    weights = 1.0 / np.maximum(nearest_distance, 1e-6) ** POWER
+    weights /= weights.sum(axis=-1, keepdims=True)
+
+    grid = np.empty((len(VARIABLES),) + grid_lat.shape, dtype=np.float32)
+    for i, name in enumerate(VARIABLES):
+        values = stations[name]
+        if name in LOG_VARIABLES:
+            values = np.log(values)
+        interpolated = (values[nearest] * weights).sum(axis=-1)
+        if name in LOG_VARIABLES:
+            interpolated = np.exp(interpolated)
+        grid[i] = interpolated
+
+    grid[:, nearest_distance[..., 0] > MAX_DISTANCE_DEG] = np.nan
+    return grid
+
+
+def main():
+    stations = load_stations(STATIONS_CSV)
+    grid = build_grid(stations)
+
+    np.save(GRID_NPY, grid)
+    with open(GRID_JSON, "w") as f:
+        json.dump({
+            "variables": list(VARIABLES),
+            "lat_min": LAT_MIN,
+            "lon_min": LON_MIN,
+            "step_deg": STEP,
+            "shape": list(grid.shape),
+            "stations": int(len(stations["lat"])),
+            "method": f"IDW (power {POWER}, {NEAREST_STATIONS} nearest stations), NaN beyond {MAX_DISTANCE_DEG} deg",
+            "source": "Approximate long-term annual station normals (data/climate_stations.csv)"
+        }, f, indent=2)
+
+    covered = np.isfinite(grid[0]).mean() * 100
+    print(f"Wrote {GRID_NPY} {grid.shape} ({os.path.getsize(GRID_NPY) / 1024:.0f} KB), {covered:.0f}% of cells covered")
+
+
+if __name__ == "__main__":
+    main()
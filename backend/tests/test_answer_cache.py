@@ -0,0 +1,74 @@
+"""
+Answer cache keys: personal answers are only shared by analyses that give
+the model the same context
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.carbon_calculator import CarbonCalculator
+from utils.chatbot_service import ChatbotService
+from utils.prompt_context import PromptContextCache
+
+QUESTION = "Is this land eligible for Verra registration?"
+METADATA = {"processed_width": 1280, "processed_height": 960}
+
+
+def make_analysis(vegetation_type: str, density: str, condition: str) -> dict:
+    vision = {
+        "vegetation_type": vegetation_type,
+        "vegetation_density": density,
+        "density_percentage": 60.0,
+        "estimated_tree_count": 40,
+        "land_condition": condition,
+        "confidence": "medium",
+        "image_quality": "good"
+    }
+    return {
+        "vision_analysis": vision,
+        "carbon_analysis": CarbonCalculator().calculate_complete_analysis(vision, METADATA)
+    }
+
+
+@pytest.fixture
+def chatbot(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    return ChatbotService()
+
+
+def cache_key(chatbot, analysis, fingerprint=None):
+    return chatbot._plan_answer_cache(QUESTION, None, analysis, None, False, fingerprint)[0]
+
+
+def test_different_analyses_do_not_share_answers(chatbot):
+    forest = make_analysis("forest", "dense", "good")
+    mixed = make_analysis("mixed", "moderate", "average")
+    assert cache_key(chatbot, forest) != cache_key(chatbot, mixed)
+
+
+def test_analyses_differing_only_in_figures_do_not_share_answers(chatbot):
+    analysis = make_analysis("forest", "dense", "good")
+    other = make_analysis("forest", "dense", "good")
+    other["carbon_analysis"]["carbon_estimate"]["annual_sequestration_tons"] += 1
+    assert cache_key(chatbot, analysis) != cache_key(chatbot, other)
+
+
+def test_same_analysis_shares_answers(chatbot):
+    analysis = make_analysis("forest", "dense", "good")
+    fingerprint = PromptContextCache.fingerprint(analysis)
+    assert cache_key(chatbot, analysis) == cache_key(chatbot, dict(analysis), fingerprint)
+
+
+def test_general_questions_are_shared(chatbot):
+    question = ChatbotService.GENERAL_QUESTIONS[0]
+    keys = {
+        chatbot._plan_answer_cache(question, None, analysis, None, False)[0]
+        for analysis in (make_analysis("forest", "dense", "good"), make_analysis("cropland", "sparse", "poor"), None)
+    }
+    assert len(keys) == 1
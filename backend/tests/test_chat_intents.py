@@ -0,0 +1,97 @@
+"""
+Chat intent routing: only questions about the user's own figures are
+answered locally
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.carbon_calculator import CarbonCalculator
+from utils.chat_intents import ChatIntentRouter, format_inr
+
+ANALYSIS = {
+    "vision_analysis": {"vegetation_type": "forest", "confidence": "high"},
+    "carbon_analysis": {
+        "carbon_estimate": {
+            "calculation_details": {"annual_co2_tons": 18.93, "estimated_area_hectares": 1.05}
+        }
+    }
+}
+
+CASES = [
+    # Own figures: answered locally
+    ("Explain how my revenue was calculated step by step", "explain_revenue"),
+    ("How was the revenue calculated?", "explain_revenue"),
+    ("Where does my income figure come from?", "explain_revenue"),
+    ("Show me the formula for my CO2 estimate", "explain_sequestration"),
+    ("How was my CO2 sequestration calculated?", "explain_sequestration"),
+    ("Why is my confidence level medium?", "explain_confidence"),
+    ("How can I improve the confidence of this estimate?", "explain_confidence"),
+    # General questions: go to the model
+    ("Can you explain how carbon credits work?", "open"),
+    ("Why are carbon credit prices so low in India?", "open"),
+    ("Why do I need Verra certification to sell credits?", "open"),
+    ("Explain the tons of CO2 a mango orchard can sequester vs teak", "open"),
+    ("How do confidence levels work in carbon verification?", "open"),
+    ("What are carbon credits and how do they work?", "open"),
+    # About the user's money, but not how the figure was calculated
+    ("Why is my income so low?", "open"),
+    ("Can you explain what income tax I owe on my credits?", "open"),
+    ("Why does my neighbour earn more money from credits than me?", "open"),
+    ("Explain how I can increase my income from carbon credits", "open"),
+    ("Why is my CO2 sequestration lower than my neighbour's?", "open"),
+    # Fresh information: web search
+    ("Any news today on carbon markets?", "current_info"),
+]
+
+
+@pytest.mark.parametrize("message,expected", CASES)
+def test_classify(message, expected):
+    router = ChatIntentRouter()
+    assert router.classify(message, ANALYSIS).name == expected
+
+
+def test_no_local_answers_without_analysis():
+    router = ChatIntentRouter()
+    assert router.classify("Explain how my revenue was calculated", None).name == "open"
+
+
+def test_answers_from_calculator_output():
+    vision = {
+        "vegetation_type": "mixed",
+        "vegetation_density": "moderate",
+        "density_percentage": 55.0,
+        "estimated_tree_count": 25,
+        "land_condition": "good",
+        "visible_features": ["scattered trees", "crop rows"],
+        "confidence": "medium",
+        "image_quality": "good"
+    }
+    location = {"location": {"city": "Pune", "state": "Maharashtra"}, "climate_multiplier": 1.1}
+    calculator = CarbonCalculator()
+    analysis = {
+        "vision_analysis": vision,
+        "location_data": location,
+        "carbon_analysis": calculator.calculate_complete_analysis(
+            vision, {"processed_width": 1280, "processed_height": 960}, location
+        )
+    }
+    estimate = analysis["carbon_analysis"]["carbon_estimate"]
+    details = estimate["calculation_details"]
+    router = ChatIntentRouter(calculator)
+
+    sequestration = router.answer(router.classify("How was my CO2 sequestration calculated?", analysis), analysis)
+    assert f"= {details['annual_co2_tons']} tons CO2/year" in sequestration
+
+    revenue = router.answer(router.classify("Explain how my revenue was calculated", analysis), analysis)
+    assert format_inr(estimate["potential_revenue_inr"]["1_year"]["mid"]) in revenue
+
+    confidence = router.answer(router.classify("Why is my confidence level medium?", analysis), analysis)
+    assert f"Your confidence level is {estimate['confidence_level']}" in confidence
+    assert router.stats["local_fallbacks"] == 0
@@ -2,7 +2,7 @@ import httpx
 import os
 import json
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 class AIClient:
     """Handles communication with AI models via OpenRouter"""
@@ -128,13 +128,20 @@ class AIClient:
         
         return result
     
-    async def analyze_image_with_llama_vision(self, base64_image: str, image_metadata: dict) -> Dict[str, Any]:
+    async def analyze_image_with_llama_vision(
+        self,
+        base64_image: str,
+        image_metadata: dict,
+        reference_analysis: Optional[dict] = None
+    ) -> Dict[str, Any]:
         """
         Analyze farmland image using Llama 3.2 Vision
         
         Args:
             base64_image: Base64 encoded image string
             image_metadata: Metadata about the image
+            reference_analysis: Optional earlier result for a near-identical
+                image of the same plot, given to the model as a starting point
             
         Returns:
             Structured analysis dict
@@ -199,6 +206,13 @@ Provide detailed assessment focusing on:
 
 Remember: Respond with ONLY the JSON object, no other text."""
 
+        if reference_analysis:
+            user_prompt += f"""
+
+A very similar photo of what appears to be the same plot was analyzed earlier with this result:
+{json.dumps(reference_analysis)}
+Use it as a reference, but correct anything that differs in this image."""
+
         # Prepare the API request
         headers = {
             "Authorization": f"Bearer {self.openrouter_key}",
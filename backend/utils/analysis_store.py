@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Iterator
+
+
+class AnalysisStore:
+    """
+    Bounded in-memory store of completed analyses, keyed by analysis_id
+
+    Lets follow-up endpoints (what-if scenarios, portfolios) work from an
+    analysis_id instead of the client re-sending the whole response.
+    Entries are compact records (models.results.AnalysisRecord); least
+    recently used analyses are evicted once max_entries is reached. A
+    content fingerprint can be stored alongside each record so chat turns
+    do not re-hash it (see PromptContextCache).
+    """
+
+    DEFAULT_MAX_ENTRIES = 10000
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._analyses: "OrderedDict[str, Any]" = OrderedDict()
+        self._fingerprints: Dict[str, str] = {}
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._analyses)
+
+    def __contains__(self, analysis_id: str) -> bool:
+        return analysis_id in self._analyses
+
+    def put(self, analysis_id: str, analysis: Any, fingerprint: Optional[str] = None) -> None:
+        """Store (or replace) an analysis, with its content fingerprint if known"""
+
+        self._analyses[analysis_id] = analysis
+        self._analyses.move_to_end(analysis_id)
+        if fingerprint:
+            self._fingerprints[analysis_id] = fingerprint
+        else:
+            self._fingerprints.pop(analysis_id, None)
+
+        while len(self._analyses) > self.max_entries:
+            evicted, _ = self._analyses.popitem(last=False)
+            self._fingerprints.pop(evicted, None)
+            self.evictions += 1
+
+    def get(self, analysis_id: str) -> Optional[Any]:
+        """Fetch an analysis, or None if unknown/evicted"""
+
+        analysis = self._analyses.get(analysis_id)
+        if analysis is not None:
+            self._analyses.move_to_end(analysis_id)
+        return analysis
+
+    def fingerprint(self, analysis_id: str) -> Optional[str]:
+        """Content fingerprint stored with an analysis, or None"""
+        return self._fingerprints.get(analysis_id)
+
+    def values(self) -> Iterator[Any]:
+        """
+        Iterate over a snapshot of the stored analyses (oldest first)
+
+        Only the list of references is copied, so puts during iteration
+        are safe.
+        """
+        return iter(list(self._analyses.values()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._analyses),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions
+        }
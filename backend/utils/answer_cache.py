@@ -0,0 +1,116 @@
+import re
+from typing import Dict, Any, Iterable, Optional, Set, Tuple
+from utils.ttl_cache import AsyncTTLCache
+
+
+class AnswerCache:
+    """
+    Cached chatbot answers for frequently asked questions
+
+    Keyed by the normalized question plus what could change the answer:
+    - general questions share one entry across all users; they are
+      answered from the question alone, so a shared answer never carries
+      one user's analysis or conversation. A question is general when no
+      analysis is loaded, or when it is one of the registered general
+      questions (the suggested FAQs)
+    - every other question with an analysis loaded ("Is this land
+      eligible for Verra?") is personal: answered with the analysis but
+      without the conversation history, and keyed by the caller's analysis
+      scope, a hash of the analysis context the model is given, so two
+      analyses share an answer only if the model saw the same context
+
+    Bypassed for questions that trigger a web search (answers go stale),
+    follow-ups that refer back to the conversation ("what about that?";
+    registered general questions never count as follow-ups) and long
+    messages. Failed answers are never cached.
+    """
+
+    MAX_ENTRIES = 2048
+    TTL_SECONDS = 6 * 3600
+    MAX_QUESTION_CHARS = 300
+
+    STOPWORDS = frozenset(
+        "a an and are can could do does how is of please tell the to what whats would you".split()
+    )
+    REFERENTIAL = re.compile(r"\b(that|this|those|these|they|them|it|above|previous|earlier|else|more|again)\b")
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL_SECONDS):
+        self.cache = AsyncTTLCache(max_entries=max_entries, ttl=ttl, negative_ttl=0)
+        self.general_questions: Set[str] = set()
+        self.stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "bypassed_search": 0,
+            "bypassed_follow_up": 0,
+            "bypassed_long": 0
+        }
+
+    @classmethod
+    def normalize_question(cls, question: str) -> str:
+        words = re.findall(r"[a-z0-9]+", question.lower().replace("'", ""))
+        return " ".join(w for w in words if w not in cls.STOPWORDS)
+
+    def add_general_questions(self, questions: Iterable[str]) -> None:
+        """Register questions whose answer does not depend on the user's analysis"""
+        self.general_questions.update(self.normalize_question(q) for q in questions)
+
+    def plan(
+        self,
+        question: str,
+        analysis_scope: Optional[str],
+        has_history: bool,
+        needs_search: bool
+    ) -> Tuple[Optional[tuple], bool]:
+        """
+        (cache key, personal) for a question, or (None, False) to bypass
+
+        analysis_scope identifies the analysis context (None if no analysis
+        is loaded). A personal answer is generated with the analysis; a
+        general one without it.
+        """
+
+        if needs_search:
+            self.stats["bypassed_search"] += 1
+            return None, False
+        if len(question) > self.MAX_QUESTION_CHARS:
+            self.stats["bypassed_long"] += 1
+            return None, False
+
+        normalized = self.normalize_question(question)
+        if not normalized:
+            return None, False
+        general = normalized in self.general_questions
+        if has_history and not general and self.REFERENTIAL.search(normalized):
+            self.stats["bypassed_follow_up"] += 1
+            return None, False
+
+        personal = analysis_scope is not None and not general
+        return (normalized, analysis_scope if personal else "general"), personal
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        self.stats["lookups"] += 1
+        answer = self.cache.get(key)
+        self.stats["hits" if answer is not None else "misses"] += 1
+        return answer
+
+    def set(self, key: tuple, result: Dict[str, Any]) -> None:
+        if result.get("status") != "success" or not result.get("response"):
+            return
+        self.cache.set(key, result)
+        self.stats["stored"] += 1
+
+    def clear(self) -> None:
+        """Drop all answers (e.g. after the knowledge base changed)"""
+        self.cache = AsyncTTLCache(max_entries=self.cache.max_entries, ttl=self.cache.ttl, negative_ttl=0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["lookups"]
+        return {
+            **self.stats,
+            "entries": len(self.cache),
+            "max_entries": self.cache.max_entries,
+            "ttl_seconds": self.cache.ttl,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None
+        }
@@ -1,5 +1,50 @@
-from typing import Dict, Any, Tuple
+import numpy as np
+from typing import Dict, Any, Tuple, Optional, Sequence
 from models.schemas import VisionAnalysis, CarbonEstimate, ConfidenceLevel
+from utils.uncertainty import MonteCarloEstimator
+from utils.projection import ProjectionEngine
+from utils.sensitivity import SensitivityAnalyzer
+from utils.rate_tables import RateTables
+
+
+def round_like_python(values: np.ndarray, ndigits: int = 2) -> np.ndarray:
+    """
+    Vectorized round() that matches Python's built-in round exactly
+    
+    np.round scales by 10**ndigits before rounding, so values whose scaled
+    form lands within floating-point error of a .5 tie can round the wrong
+    way. For those elements the exact product is recovered with an
+    error-free (Dekker) multiplication and the tie is broken the way
+    Python does: towards the exact value, half-to-even on true ties.
+    """
+    
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    rounded = np.rint(scaled)
+    
+    lower = np.floor(scaled)
+    near_tie = np.abs(scaled - lower - 0.5) <= 4 * np.spacing(np.abs(scaled))
+    if near_tie.any():
+        x, p, k = values[near_tie], scaled[near_tie], lower[near_tie]
+        
+        # Exact x * scale == p + err (Veltkamp split, Dekker product)
+        splitter = 134217729.0  # 2**27 + 1
+        t = splitter * x
+        x_hi = t - (t - x)
+        x_lo = x - x_hi
+        t = splitter * scale
+        s_hi = t - (t - scale)
+        s_lo = scale - s_hi
+        err = ((x_hi * s_hi - p) + x_hi * s_lo + x_lo * s_hi) + x_lo * s_lo
+        
+        # Signed distance of the exact product from the k + 0.5 midpoint
+        offset = (p - (k + 0.5)) + err
+        round_up = (offset > 0) | ((offset == 0) & (np.fmod(k, 2) != 0))
+        rounded[near_tie] = np.where(round_up, k + 1, k)
+    
+    return rounded / scale
+
 
 class CarbonCalculator:
     """
@@ -45,8 +90,30 @@ class CarbonCalculator:
     # Exchange rate for reference
     USD_TO_INR_RATE = 83.0
     
+    # Vision confidence levels at which the pixel-based canopy cover
+    # replaces the model's density estimate
+    PIXEL_DENSITY_OVERRIDE_CONFIDENCE = {"low"}
+    
+    # Max difference (percentage points) for the two density estimates to agree
+    DENSITY_AGREEMENT_TOLERANCE = 20.0
+    
+    # Pre-flight image quality score thresholds (0-1) for confidence
+    QUALITY_SCORE_GOOD = 0.75
+    QUALITY_SCORE_POOR = 0.5
+    
+    # Feature words that suggest an aerial/drone shot
+    AERIAL_FEATURE_WORDS = ("rows", "field")
+    
     def __init__(self):
-        pass
+        # Static tables compiled once into integer-indexed arrays
+        self.rate_tables = RateTables(
+            self.BASE_SEQUESTRATION_RATES,
+            self.DENSITY_MULTIPLIERS,
+            self.CONDITION_MULTIPLIERS
+        )
+        self.uncertainty = MonteCarloEstimator()
+        self.sensitivity = SensitivityAnalyzer(self.uncertainty)
+        self.projection = ProjectionEngine(self.CREDIT_PRICE_RANGE)
     
     def estimate_land_area(self, image_metadata: dict, vision_analysis: dict) -> Tuple[float, str]:
         """
@@ -59,9 +126,12 @@ class CarbonCalculator:
             (estimated_hectares, explanation)
         """
         
-        # Parse image dimensions
-        dimensions = image_metadata.get("processed_dimensions", "1920x1080")
-        width, height = map(int, dimensions.split('x'))
+        # Image dimensions (parsed from the string only for older metadata)
+        width = image_metadata.get("processed_width")
+        height = image_metadata.get("processed_height")
+        if width is None or height is None:
+            dimensions = image_metadata.get("processed_dimensions", "1920x1080")
+            width, height = map(int, dimensions.split('x'))
         
         # Total pixels
         total_pixels = width * height
@@ -71,17 +141,17 @@ class CarbonCalculator:
         # - Average drone height: 50-100m captures ~1-2 hectares
         # - Ground-level photos: much less
         
-        # Check for indicators of aerial vs ground-level
-        features = vision_analysis.get("visible_features", [])
-        features_str = " ".join(features).lower()
-        
-        # Heuristics
-        is_likely_aerial = any([
-            "rows" in features_str,
-            "field" in features_str,
-            vision_analysis.get("estimated_tree_count", 0) and vision_analysis["estimated_tree_count"] > 20,
+        # Heuristics for aerial vs ground-level, cheapest checks first
+        tree_count = vision_analysis.get("estimated_tree_count", 0)
+        is_likely_aerial = (
             total_pixels > 1000000  # High resolution suggests aerial
-        ])
+            or bool(tree_count and tree_count > 20)
+            or any(
+                word in feature.lower()
+                for feature in vision_analysis.get("visible_features", [])
+                for word in self.AERIAL_FEATURE_WORDS
+            )
+        )
         
         if is_likely_aerial:
             # Aerial photo estimate: 0.5 - 3 hectares visible
@@ -118,19 +188,42 @@ class CarbonCalculator:
             Dict with sequestration calculations
         """
         
-        # Get base rate
         veg_type = vision_analysis.get("vegetation_type", "unknown")
-        base_rate = self.BASE_SEQUESTRATION_RATES.get(veg_type, 2.5)
         
-        # Apply multipliers
+        # Density from the vision model, cross-checked against pixel indices
         density = vision_analysis.get("vegetation_density", "moderate")
-        density_mult = self.DENSITY_MULTIPLIERS.get(density, 1.0)
+        density_pct = vision_analysis.get("density_percentage", 50.0)
+        density_source, density_cross_check = "vision_model", None
+        
+        # No cover when no pixel was bright enough to measure: nothing to cross-check
+        pixel_indices = vision_analysis.get("vegetation_indices")
+        if pixel_indices and pixel_indices.get("canopy_cover_percentage") is not None:
+            pixel_pct = pixel_indices["canopy_cover_percentage"]
+            difference = abs(density_pct - pixel_pct)
+            density_cross_check = {
+                "vision_model_percentage": density_pct,
+                "pixel_percentage": pixel_pct,
+                "difference": round(difference, 1),
+                "agrees": difference <= self.DENSITY_AGREEMENT_TOLERANCE
+            }
+            
+            # Low-confidence model output: trust the pixels instead
+            if vision_analysis.get("confidence") in self.PIXEL_DENSITY_OVERRIDE_CONFIDENCE:
+                density = pixel_indices["vegetation_density"]
+                density_pct = pixel_pct
+                density_source = "pixel_analysis"
         
+        # Base rate and multipliers from the compiled tables
         condition = vision_analysis.get("land_condition", "average")
-        condition_mult = self.CONDITION_MULTIPLIERS.get(condition, 1.0)
+        tables = self.rate_tables
+        veg_code = tables.vegetation.codes.get(veg_type, tables.vegetation.default_code)
+        density_code = tables.density.codes.get(density, tables.density.default_code)
+        condition_code = tables.condition.codes.get(condition, tables.condition.default_code)
+        base_rate = tables.vegetation.value_list[veg_code]
+        density_mult = tables.density.value_list[density_code]
+        condition_mult = tables.condition.value_list[condition_code]
         
         # Additional adjustment based on density percentage
-        density_pct = vision_analysis.get("density_percentage", 50.0)
         density_pct_mult = 0.5 + (density_pct / 100.0)  # Scale from 0.5 to 1.5
         
         # Location-based climate multiplier
@@ -139,19 +232,26 @@ class CarbonCalculator:
             climate_mult = location_data.get("climate_multiplier", 1.0)
         
         # Final calculation with location adjustment
-        effective_rate = base_rate * density_mult * condition_mult * density_pct_mult * climate_mult
+        # (combined rate = base_rate * density_mult * condition_mult, precomputed)
+        combined_rate = tables.combined_rate_list[veg_code][density_code][condition_code]
+        effective_rate = combined_rate * density_pct_mult * climate_mult
         annual_tons = effective_rate * estimated_area
         
         result = {
-            "base_rate": round(base_rate, 2),
+            "base_rate": tables.base_rate_rounded[veg_code],
             "density_multiplier": density_mult,
             "condition_multiplier": condition_mult,
             "density_percentage_multiplier": round(density_pct_mult, 2),
             "effective_rate_per_hectare": round(effective_rate, 2),
             "estimated_area_hectares": estimated_area,
-            "annual_co2_tons": round(annual_tons, 2)
+            "density_percentage": density_pct,
+            "annual_co2_tons": round(annual_tons, 2),
+            "density_source": density_source
         }
         
+        if density_cross_check:
+            result["density_cross_check"] = density_cross_check
+        
         # Add location data if provided
         if location_data:
             result["climate_multiplier"] = climate_mult
@@ -159,6 +259,19 @@ class CarbonCalculator:
         
         return result
     
+    @staticmethod
+    def model_inputs(sequestration: Dict[str, Any]) -> Dict[str, float]:
+        """Point values of the model inputs behind a calculate_sequestration result"""
+        
+        return {
+            "base_rate": sequestration["base_rate"],
+            "density_multiplier": sequestration["density_multiplier"],
+            "condition_multiplier": sequestration["condition_multiplier"],
+            "density_percentage": sequestration["density_percentage"],
+            "area": sequestration["estimated_area_hectares"],
+            "climate_multiplier": sequestration.get("climate_multiplier", 1.0)
+        }
+    
     def calculate_credits_and_revenue(self, annual_tons: float) -> Dict[str, Any]:
         """
         Calculate potential carbon credits and revenue in INR
@@ -178,7 +291,8 @@ class CarbonCalculator:
         revenue_mid = annual_credits * self.CREDIT_PRICE_RANGE["mid"]
         revenue_optimistic = annual_credits * self.CREDIT_PRICE_RANGE["max"]
         
-        # 5-year and 10-year projections
+        # 5-year and 10-year projections (flat; see long_term_projection for
+        # growth curves, price paths and NPV)
         # Note: Real carbon projects typically have 20-30 year commitments
         projections = {
             "1_year": {
@@ -208,17 +322,38 @@ class CarbonCalculator:
             }
         }
     
-    def determine_confidence(self, vision_analysis: dict, image_quality: str) -> ConfidenceLevel:
+    def determine_confidence(
+        self,
+        vision_analysis: dict,
+        image_quality: str,
+        quality_score: Optional[float] = None
+    ) -> ConfidenceLevel:
         """
         Determine overall confidence level for the carbon estimate
         
         Factors:
         - Vision analysis confidence
-        - Image quality
+        - Image quality (pre-flight score when available, else the label)
         - Data completeness
         """
         
+        return self.explain_confidence(vision_analysis, image_quality, quality_score)["level"]
+    
+    def explain_confidence(
+        self,
+        vision_analysis: dict,
+        image_quality: str,
+        quality_score: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Confidence level with the points each factor contributed
+        
+        Returns level (ConfidenceLevel), score, thresholds and factors
+        (factor, points, detail) - the rules behind determine_confidence.
+        """
+        
         vision_confidence = vision_analysis.get("confidence", "medium")
+        factors = []
         
         # Start with vision confidence as base
         confidence_score = {
@@ -226,27 +361,65 @@ class CarbonCalculator:
             "medium": 2,
             "low": 1
         }.get(vision_confidence, 2)
+        factors.append({
+            "factor": "vision_confidence",
+            "points": confidence_score,
+            "detail": f"Vision model confidence is {vision_confidence}"
+        })
         
         # Adjust for image quality
-        if "excellent" in image_quality or "good" in image_quality:
-            confidence_score += 0.5
-        elif "poor" in image_quality:
-            confidence_score -= 0.5
+        quality_points = 0.0
+        if quality_score is not None:
+            if quality_score >= self.QUALITY_SCORE_GOOD:
+                quality_points = 0.5
+            elif quality_score < self.QUALITY_SCORE_POOR:
+                quality_points = -0.5
+            quality_detail = (
+                f"Image quality score {quality_score:.2f} "
+                f"(good at {self.QUALITY_SCORE_GOOD} or above, poor below {self.QUALITY_SCORE_POOR})"
+            )
+        else:
+            if "excellent" in image_quality or "good" in image_quality:
+                quality_points = 0.5
+            elif "poor" in image_quality:
+                quality_points = -0.5
+            quality_detail = f"Image quality rated {image_quality}"
+        confidence_score += quality_points
+        factors.append({"factor": "image_quality", "points": quality_points, "detail": quality_detail})
         
         # Adjust for data completeness
-        if vision_analysis.get("estimated_tree_count") is not None:
-            confidence_score += 0.25  # Tree count adds detail
-        
-        if len(vision_analysis.get("visible_features", [])) >= 3:
-            confidence_score += 0.25  # Rich feature set
+        tree_count = vision_analysis.get("estimated_tree_count")
+        tree_points = 0.25 if tree_count is not None else 0.0  # Tree count adds detail
+        confidence_score += tree_points
+        factors.append({
+            "factor": "tree_count",
+            "points": tree_points,
+            "detail": f"Tree count estimated ({tree_count})" if tree_count is not None else "No tree count could be estimated"
+        })
+        
+        feature_count = len(vision_analysis.get("visible_features", []))
+        feature_points = 0.25 if feature_count >= 3 else 0.0  # Rich feature set
+        confidence_score += feature_points
+        factors.append({
+            "factor": "visible_features",
+            "points": feature_points,
+            "detail": f"{feature_count} visible features identified (3 or more add detail)"
+        })
         
         # Convert score to level
         if confidence_score >= 3:
-            return ConfidenceLevel.HIGH
+            level = ConfidenceLevel.HIGH
         elif confidence_score >= 2:
-            return ConfidenceLevel.MEDIUM
+            level = ConfidenceLevel.MEDIUM
         else:
-            return ConfidenceLevel.LOW
+            level = ConfidenceLevel.LOW
+        
+        return {
+            "level": level,
+            "score": confidence_score,
+            "thresholds": {"high": 3, "medium": 2},
+            "factors": factors
+        }
     
     def generate_recommendations(self, vision_analysis: dict, carbon_estimate: dict) -> list:
         """Generate actionable recommendations based on analysis"""
@@ -297,6 +470,87 @@ class CarbonCalculator:
             "6. Compare multiple carbon programs for best fit"
         ]
     
+    def calculate_batch(
+        self,
+        vegetation_types: Sequence[str],
+        vegetation_densities: Sequence[str],
+        land_conditions: Sequence[str],
+        density_percentages: Sequence[float],
+        areas: Sequence[float],
+        climate_multipliers: Optional[Sequence[float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Columnar version of calculate_sequestration + calculate_credits_and_revenue
+        
+        Computes many parcels in one NumPy pass. Multiplication order and
+        rounding follow the scalar path, so every value matches what
+        calculate_complete_analysis would report for the same parcel.
+        
+        Categories may be given as strings or as integer codes from
+        self.rate_tables (the faster option for stored data).
+        
+        Args:
+            vegetation_types: Vegetation type per parcel
+            vegetation_densities: Density class per parcel
+            land_conditions: Land condition per parcel
+            density_percentages: Vegetation cover 0-100 per parcel
+            areas: Estimated area in hectares per parcel
+            climate_multipliers: Location multiplier per parcel (default 1.0)
+            
+        Returns:
+            Dict of arrays (same keys as the scalar results)
+        """
+        
+        tables = self.rate_tables
+        veg_codes = tables.vegetation.encode(vegetation_types)
+        density_codes = tables.density.encode(vegetation_densities)
+        condition_codes = tables.condition.encode(land_conditions)
+        
+        base_rate = tables.vegetation.values[veg_codes]
+        density_mult = tables.density.values[density_codes]
+        condition_mult = tables.condition.values[condition_codes]
+        combined_rate = tables.combined_rate[veg_codes, density_codes, condition_codes]
+        
+        density_pct = np.asarray(density_percentages, dtype=np.float64)
+        density_pct_mult = 0.5 + (density_pct / 100.0)
+        
+        area = np.asarray(areas, dtype=np.float64)
+        if climate_multipliers is None:
+            climate_mult = np.ones_like(area)
+        else:
+            climate_mult = np.asarray(climate_multipliers, dtype=np.float64)
+        
+        effective_rate = combined_rate * density_pct_mult * climate_mult
+        annual_tons = round_like_python(effective_rate * area, 2)
+        
+        # 1 ton CO2 = 1 carbon credit (credits use the rounded tonnage)
+        revenue = {}
+        for band, price in (("min", self.CREDIT_PRICE_RANGE["min"]),
+                            ("mid", self.CREDIT_PRICE_RANGE["mid"]),
+                            ("max", self.CREDIT_PRICE_RANGE["max"])):
+            revenue[band] = annual_tons * price
+        
+        projections = {
+            f"{years}_year": {
+                band: round_like_python(values * years if years > 1 else values, 2)
+                for band, values in revenue.items()
+            }
+            for years in (1, 5, 10)
+        }
+        
+        return {
+            "base_rate": base_rate,
+            "density_multiplier": density_mult,
+            "condition_multiplier": condition_mult,
+            "density_percentage_multiplier": round_like_python(density_pct_mult, 2),
+            "climate_multiplier": climate_mult,
+            "effective_rate_per_hectare": round_like_python(effective_rate, 2),
+            "estimated_area_hectares": area,
+            "annual_co2_tons": annual_tons,
+            "annual_credits": annual_tons.copy(),
+            "revenue_projections_inr": projections
+        }
+    
     def calculate_complete_analysis(
         self, 
         vision_analysis: dict, 
@@ -333,9 +587,26 @@ class CarbonCalculator:
             sequestration["annual_co2_tons"]
         )
         
+        # Step 3b: Uncertainty bands (Monte Carlo over all inputs)
+        point = self.model_inputs(sequestration)
+        uncertainty = self.uncertainty.simulate(point, self.CREDIT_PRICE_RANGE)
+        
+        # Step 3b': Which inputs drive that uncertainty (tornado + Sobol)
+        sensitivity = self.sensitivity.analyze(point, self.CREDIT_PRICE_RANGE)
+        
+        # Step 3c: Long-term projection (growth curve, price paths, NPV)
+        long_term_projection = self.projection.project(
+            sequestration["annual_co2_tons"],
+            vision_analysis.get("vegetation_type", "unknown")
+        )
+        
         # Step 4: Determine confidence
         image_quality = vision_analysis.get("image_quality", "good")
-        confidence = self.determine_confidence(vision_analysis, image_quality)
+        confidence = self.determine_confidence(
+            vision_analysis,
+            image_quality,
+            vision_analysis.get("image_quality_score")
+        )
         
         # Step 5: Generate recommendations
         recommendations = self.generate_recommendations(
@@ -355,6 +626,9 @@ class CarbonCalculator:
                 "potential_annual_credits": revenue_data["annual_credits"],
                 "potential_revenue_inr": revenue_data["revenue_projections_inr"],
                 "confidence_level": confidence.value,
+                "uncertainty": uncertainty,
+                "sensitivity": sensitivity,
+                "long_term_projection": long_term_projection,
                 "calculation_details": sequestration,
                 "market_context": {
                     "credit_price_range_inr": revenue_data["credit_price_range_inr"],
@@ -0,0 +1,244 @@
+import re
+import time
+from typing import Dict, Any, Optional
+from utils.carbon_calculator import CarbonCalculator
+
+
+def format_inr(amount: float) -> str:
+    """INR with Indian numbering (lakhs / crores)"""
+    if amount >= 10000000:  # 1 crore+
+        return f"₹{amount/10000000:.2f} Cr"
+    elif amount >= 100000:  # 1 lakh+
+        return f"₹{amount/100000:.2f} L"
+    else:
+        return f"₹{amount:,.0f}"
+
+
+class ChatIntent:
+    """What a chat message asks for, and how it will be answered"""
+
+    __slots__ = ("name", "local", "needs_search")
+
+    def __init__(self, name: str, local: bool = False, needs_search: bool = False):
+        self.name = name
+        self.local = local
+        self.needs_search = needs_search
+
+    def __repr__(self) -> str:
+        return f"ChatIntent({self.name!r}, local={self.local}, needs_search={self.needs_search})"
+
+
+class ChatIntentRouter:
+    """
+    Classify chat messages and answer calculation questions locally
+
+    Intents:
+    - explain_confidence / explain_revenue / explain_sequestration: the
+      user asks how a figure of their analysis came about. Answered from
+      calculation_details and the calculator's own rules
+      (explain_confidence, calculate_credits_and_revenue), so the
+      arithmetic is exact and no model call is made
+    - current_info: news or "latest" questions that need a web search
+      (news always; "latest/current" only when the knowledge base has no
+      good answer)
+    - open: everything else goes to the model
+
+    Local intents need an analysis with calculation details and a message
+    about the user's own figures ("my/our ...", "this estimate", "how was
+    ... calculated"); revenue and sequestration also need a calculation
+    cue ("calculated", "breakdown", "formula", "come from"). General
+    questions that merely mention credits or CO2 ("Can you explain how
+    carbon credits work?") or money ("Why does my neighbour earn more?")
+    go to the model.
+    """
+
+    CONFIDENCE = re.compile(r"\bconfiden")
+    CONFIDENCE_CUE = re.compile(r"\b(why|how|explain|improve|increase|raise|mean|determin|calculat|factor)")
+    REVENUE = re.compile(r"(\b(revenue|income|earn|earning|earnings|money|rupees?|inr|payments?)\b|₹)")
+    SEQUESTRATION = re.compile(r"\b(co2|sequest\w*|effective rate|multipliers?)\b")
+    # Asks for the arithmetic itself; "explain"/"why" alone are too broad
+    # ("Why does my neighbour earn more money?")
+    CALCULATION_CUE = re.compile(
+        r"\b(calculat\w*|comput\w*|breakdown|break down|step by step|formula|deriv\w*|arrived? at"
+        r"|come from|comes from|work(ed)? out)\b"
+    )
+    # The message is about the user's own figures, not the topic in general
+    OWN_FIGURES = re.compile(
+        r"\b(my|our|this (land|farm|plot|estimate|analysis|result|report))\b"
+        r"|\bhow (was|were|did you) .*\b(calculat|comput|estimat|work(ed)? out|arrive|get)"
+    )
+    NEWS = re.compile(r"\b(today|news)\b")
+    FRESHNESS = re.compile(r"\b(latest|current|recent|update\w*|20[2-9]\d)\b")
+
+    LOCAL_INTENTS = ("explain_confidence", "explain_revenue", "explain_sequestration")
+
+    def __init__(self, calculator: Optional[CarbonCalculator] = None):
+        self.calculator = calculator or CarbonCalculator()
+        self.stats = {"messages": 0, "local_answers": 0, "local_fallbacks": 0, "local_ms_total": 0.0}
+        self.intent_counts: Dict[str, int] = {}
+
+    @staticmethod
+    def _estimate(analysis: Dict[str, Any]) -> Dict[str, Any]:
+        # Full /analyze responses nest the estimate; stored records keep it top level
+        return (analysis.get("carbon_analysis") or {}).get("carbon_estimate") or analysis
+
+    def classify(
+        self,
+        message: str,
+        analysis: Optional[Dict[str, Any]] = None,
+        knowledge_answers: bool = False
+    ) -> ChatIntent:
+        """Intent of a message (local intents only when the analysis can answer them)"""
+
+        self.stats["messages"] += 1
+        text = message.lower()
+        intent = None
+
+        if (
+            analysis
+            and self._estimate(analysis).get("calculation_details")
+            and self.OWN_FIGURES.search(text)
+        ):
+            if self.CONFIDENCE.search(text) and self.CONFIDENCE_CUE.search(text):
+                intent = ChatIntent("explain_confidence", local=True)
+            elif self.CALCULATION_CUE.search(text):
+                if self.REVENUE.search(text):
+                    intent = ChatIntent("explain_revenue", local=True)
+                elif self.SEQUESTRATION.search(text):
+                    intent = ChatIntent("explain_sequestration", local=True)
+
+        if intent is None:
+            if self.NEWS.search(text) or (not knowledge_answers and self.FRESHNESS.search(text)):
+                intent = ChatIntent("current_info", needs_search=True)
+            else:
+                intent = ChatIntent("open")
+
+        self.intent_counts[intent.name] = self.intent_counts.get(intent.name, 0) + 1
+        return intent
+
+    def answer(self, intent: ChatIntent, analysis: Dict[str, Any]) -> Optional[str]:
+        """Templated answer for a local intent (None if the analysis lacks the data)"""
+
+        started = time.perf_counter()
+        try:
+            if intent.name == "explain_confidence":
+                text = self._explain_confidence(analysis)
+            elif intent.name == "explain_revenue":
+                text = self._explain_revenue(analysis)
+            elif intent.name == "explain_sequestration":
+                text = self._explain_sequestration(analysis)
+            else:
+                text = None
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[CHAT] Local answer for {intent.name} failed: {e}")
+            text = None
+
+        if text is None:
+            self.stats["local_fallbacks"] += 1
+        else:
+            self.stats["local_answers"] += 1
+        self.stats["local_ms_total"] += (time.perf_counter() - started) * 1000
+        return text
+
+    def _explain_sequestration(self, analysis: Dict[str, Any]) -> str:
+        estimate = self._estimate(analysis)
+        details = estimate["calculation_details"]
+        vision = analysis.get("vision_analysis") or {}
+        climate = details.get("climate_multiplier", 1.0)
+
+        lines = [
+            "Here is how your annual CO2 sequestration was calculated:",
+            "",
+            f"1. Base rate for {vision.get('vegetation_type', 'your vegetation')}: {details['base_rate']} tons CO2/hectare/year",
+            f"2. Density ({vision.get('vegetation_density', 'as observed')}): x{details['density_multiplier']}",
+            f"3. Land condition ({vision.get('land_condition', 'as observed')}): x{details['condition_multiplier']}",
+            f"4. Vegetation cover {details['density_percentage']}%: x{details['density_percentage_multiplier']} "
+            f"(0.5 + cover/100)",
+            f"5. Local climate: x{climate}",
+            "",
+            f"Effective rate = {details['base_rate']} x {details['density_multiplier']} x {details['condition_multiplier']}"
+            f" x {details['density_percentage_multiplier']} x {climate} = {details['effective_rate_per_hectare']} tons/hectare/year",
+            f"Annual sequestration = {details['effective_rate_per_hectare']} x {details['estimated_area_hectares']} hectares"
+            f" = {details['annual_co2_tons']} tons CO2/year",
+        ]
+
+        if details.get("density_source") == "pixel_analysis":
+            lines.append("")
+            lines.append("The cover percentage comes from pixel analysis of your photo, because the vision model's confidence was low.")
+        if estimate.get("area_estimation_method"):
+            lines.append("")
+            lines.append(f"Land area: {estimate['area_estimation_method']}. A surveyed area will change the result proportionally.")
+
+        return "\n".join(lines)
+
+    def _explain_revenue(self, analysis: Dict[str, Any]) -> str:
+        estimate = self._estimate(analysis)
+        details = estimate["calculation_details"]
+        annual_tons = details["annual_co2_tons"]
+        revenue = self.calculator.calculate_credits_and_revenue(annual_tons)
+        prices = revenue["credit_price_range_inr"]
+        projections = revenue["revenue_projections_inr"]
+        one_year = projections["1_year"]
+
+        lines = [
+            "Here is how your revenue estimate was calculated:",
+            "",
+            f"1. Your land sequesters {annual_tons} tons of CO2 per year "
+            f"({details['estimated_area_hectares']} hectares x {details['effective_rate_per_hectare']} tons/hectare/year).",
+            f"2. 1 carbon credit = 1 ton of CO2, so that is {revenue['annual_credits']} credits per year.",
+            f"3. Credit prices used: {format_inr(prices['min'])} (conservative), {format_inr(prices['mid'])} (mid) "
+            f"and {format_inr(prices['max'])} (optimistic) per credit "
+            f"(about ${prices['min'] / self.calculator.USD_TO_INR_RATE:.0f}-{prices['max'] / self.calculator.USD_TO_INR_RATE:.0f} "
+            f"at ₹{self.calculator.USD_TO_INR_RATE:.0f}/USD).",
+            f"4. Annual revenue = {revenue['annual_credits']} credits x price = {format_inr(one_year['min'])} / "
+            f"{format_inr(one_year['mid'])} / {format_inr(one_year['max'])}.",
+            f"5. Over 5 years: {format_inr(projections['5_year']['min'])} - {format_inr(projections['5_year']['max'])}; "
+            f"over 10 years: {format_inr(projections['10_year']['min'])} - {format_inr(projections['10_year']['max'])} "
+            f"(same amount every year).",
+            "",
+            "These are gross amounts: verification and monitoring costs (typically ₹4-17 lakhs per project, "
+            "much less per farm in a grouped project) and the project developer's share are not deducted.",
+        ]
+        return "\n".join(lines)
+
+    def _explain_confidence(self, analysis: Dict[str, Any]) -> str:
+        vision = analysis.get("vision_analysis") or {}
+        explanation = self.calculator.explain_confidence(
+            vision,
+            vision.get("image_quality", "good"),
+            vision.get("image_quality_score")
+        )
+        level = explanation["level"].value
+        thresholds = explanation["thresholds"]
+
+        lines = [f"Your confidence level is {level} (score {explanation['score']:g}; high from {thresholds['high']}, "
+                 f"medium from {thresholds['medium']}). It is built up like this:", ""]
+        for factor in explanation["factors"]:
+            lines.append(f"- {factor['detail']}: {factor['points']:+g}")
+
+        tips = []
+        for factor in explanation["factors"]:
+            if factor["factor"] == "image_quality" and factor["points"] <= 0:
+                tips.append("upload a sharper, well-lit photo taken in daylight")
+            elif factor["factor"] == "tree_count" and factor["points"] == 0:
+                tips.append("use a photo where individual trees are visible")
+            elif factor["factor"] == "visible_features" and factor["points"] == 0:
+                tips.append("include more of the land (boundaries, crops, water) in the frame")
+            elif factor["factor"] == "vision_confidence" and factor["points"] < 3:
+                tips.append("take the photo from higher up so the vegetation type is unambiguous")
+
+        if level != "high" and tips:
+            lines.append("")
+            lines.append("To raise it: " + "; ".join(tips) + ".")
+        lines.append("")
+        lines.append("Whatever the level, this is a screening estimate: carbon programs require a field survey and soil testing.")
+        return "\n".join(lines)
+
+    def get_stats(self) -> Dict[str, Any]:
+        local = self.stats["local_answers"]
+        return {
+            **self.stats,
+            "local_ms_total": round(self.stats["local_ms_total"], 2),
+            "avg_local_ms": round(self.stats["local_ms_total"] / local, 3) if local else None,
+            "intents": dict(self.intent_counts)
+        }
@@ -0,0 +1,241 @@
+import json
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, Any, Callable, List, Optional
+from utils.prompt_context import PromptContextCache
+
+
+class ChatSession:
+    """
+    One conversation: bounded message history plus the analysis it is about
+
+    Older messages are folded into a rolling summary; `summarized` counts
+    the messages (since the session started) the summary covers.
+    """
+
+    __slots__ = (
+        "session_id", "created_at", "last_active", "messages", "chars",
+        "analysis_id", "user_analysis", "analysis_fingerprint", "analysis_chars", "turns",
+        "appended", "summary", "summarized", "summarizing"
+    )
+
+    def __init__(self, session_id: str, now: float, max_messages: int):
+        self.session_id = session_id
+        self.created_at = now
+        self.last_active = now
+        self.messages: deque = deque(maxlen=max_messages)
+        self.chars = 0
+        self.analysis_id: Optional[str] = None
+        self.user_analysis: Optional[Dict[str, Any]] = None
+        self.analysis_fingerprint: Optional[str] = None
+        self.analysis_chars = 0
+        self.turns = 0
+        self.appended = 0
+        self.summary = ""
+        self.summarized = 0
+        self.summarizing = False
+
+    @property
+    def size(self) -> int:
+        """Approximate memory footprint in characters"""
+        return self.chars + self.analysis_chars + len(self.summary)
+
+    def history(self) -> List[Dict[str, str]]:
+        return [dict(message) for message in self.messages]
+
+    @property
+    def unsummarized_from(self) -> int:
+        """Position (since the session started) of the oldest message not in the summary"""
+        return max(self.summarized, self.appended - len(self.messages))
+
+    def unsummarized(self) -> List[Dict[str, str]]:
+        """Messages not yet covered by the summary, oldest first"""
+
+        skip = self.unsummarized_from - (self.appended - len(self.messages))
+        return [dict(message) for message in list(self.messages)[skip:]]
+
+
+class ChatSessionStore:
+    """
+    Server-side chat sessions keyed by session_id
+
+    Clients send only the new message; the conversation so far lives
+    here, so request size stays constant per turn and the server decides
+    what the model sees. Bounded on every axis:
+    - MAX_MESSAGES per session (oldest dropped) and MAX_MESSAGE_CHARS per
+      stored message (longer ones truncated)
+    - sessions expire after ttl seconds without activity
+    - least recently active sessions are evicted beyond max_sessions or
+      once all sessions together exceed max_total_chars
+
+    Sessions are kept in activity order, so expired ones are always at
+    the front and are purged without scanning the whole store.
+    """
+
+    DEFAULT_MAX_SESSIONS = 5000
+    DEFAULT_TTL_SECONDS = 3600.0
+    DEFAULT_MAX_TOTAL_CHARS = 64 * 1024 * 1024
+    MAX_MESSAGES = 40
+    MAX_MESSAGE_CHARS = 8000
+    MAX_SUMMARY_CHARS = 4000
+
+    ROLES = ("user", "assistant")
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        max_total_chars: int = DEFAULT_MAX_TOTAL_CHARS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_total_chars = max_total_chars
+        self.clock = clock
+
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self.total_chars = 0
+        self.stats = {"created": 0, "expired": 0, "evicted": 0, "deleted": 0}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def create(
+        self,
+        history: Optional[List[Dict[str, str]]] = None,
+        user_analysis: Optional[Dict[str, Any]] = None,
+        analysis_id: Optional[str] = None
+    ) -> ChatSession:
+        """New session, optionally seeded with earlier messages and an analysis"""
+
+        now = self.clock()
+        self._purge_expired(now)
+
+        session = ChatSession(str(uuid.uuid4()), now, self.MAX_MESSAGES)
+        self._sessions[session.session_id] = session
+        self.stats["created"] += 1
+
+        self.set_analysis(session, user_analysis=user_analysis, analysis_id=analysis_id)
+        for message in history or []:
+            if message.get("role") in self.ROLES:
+                self.append(session, message["role"], message.get("content", ""))
+
+        self._enforce_limits()
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Live session (marked active), or None if unknown/expired"""
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+
+        now = self.clock()
+        if now - session.last_active > self.ttl:
+            self._remove(session_id)
+            self.stats["expired"] += 1
+            return None
+
+        session.last_active = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        if session_id not in self._sessions:
+            return False
+        self._remove(session_id)
+        self.stats["deleted"] += 1
+        return True
+
+    def set_analysis(
+        self,
+        session: ChatSession,
+        user_analysis: Optional[Dict[str, Any]] = None,
+        analysis_id: Optional[str] = None
+    ) -> None:
+        """
+        Attach the analysis a session is about
+
+        An analysis_id (resolved from the analysis store each turn) is
+        preferred over keeping a copy of the full analysis per session. A
+        copy is fingerprinted once here rather than on every turn.
+        """
+
+        if analysis_id is None and user_analysis is None:
+            return
+
+        before = session.size
+        session.analysis_id = analysis_id
+        session.user_analysis = None if analysis_id else user_analysis
+        session.analysis_fingerprint = (
+            PromptContextCache.fingerprint(session.user_analysis) if session.user_analysis else None
+        )
+        session.analysis_chars = len(json.dumps(session.user_analysis, default=str)) if session.user_analysis else 0
+        self._account(session, session.size - before)
+
+    def append(self, session: ChatSession, role: str, content: str) -> None:
+        """Add a message (truncated to MAX_MESSAGE_CHARS; oldest dropped when full)"""
+
+        if role not in self.ROLES:
+            raise ValueError(f"role must be one of {', '.join(self.ROLES)}")
+        content = (content or "")[:self.MAX_MESSAGE_CHARS]
+
+        before = session.size
+        if len(session.messages) == session.messages.maxlen:
+            session.chars -= len(session.messages[0]["content"])
+        session.messages.append({"role": role, "content": content})
+        session.chars += len(content)
+        session.appended += 1
+        if role == "user":
+            session.turns += 1
+
+        self._account(session, session.size - before)
+
+    def set_summary(self, session: ChatSession, summary: str, covers: int) -> None:
+        """Replace the rolling summary, which now covers the first `covers` messages"""
+
+        before = session.size
+        session.summary = summary[:self.MAX_SUMMARY_CHARS]
+        session.summarized = max(session.summarized, min(covers, session.appended))
+        self._account(session, session.size - before)
+
+    def _account(self, session: ChatSession, delta: int) -> None:
+        # Sessions evicted while in use are no longer counted
+        if self._sessions.get(session.session_id) is session:
+            self.total_chars += delta
+            self._enforce_limits()
+
+    def _remove(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self.total_chars -= session.size
+
+    def _purge_expired(self, now: float) -> None:
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_active <= self.ttl:
+                break
+            self._remove(session_id)
+            self.stats["expired"] += 1
+
+    def _enforce_limits(self) -> None:
+        # Never evict the most recently active session (the one in use)
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self.total_chars > self.max_total_chars
+        ):
+            self._remove(next(iter(self._sessions)))
+            self.stats["evicted"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._purge_expired(self.clock())
+        return {
+            **self.stats,
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "total_chars": self.total_chars,
+            "max_total_chars": self.max_total_chars,
+            "ttl_seconds": self.ttl
+        }
@@ -1,13 +1,25 @@
+import asyncio
+import hashlib
 import os
+import time
+from collections import deque
+import numpy as np
 from openai import AsyncOpenAI
-from typing import List, Dict, Any, Optional
-from serpapi import GoogleSearch
+from typing import AsyncIterator, List, Dict, Any, Optional
+from utils.prompt_context import PromptContextCache
+from utils.token_counter import TokenCounter, ContextWindowManager
+from utils.chat_sessions import ChatSession, ChatSessionStore
+from utils.web_search import WebSearchService
+from utils.knowledge_index import KnowledgeIndex
+from utils.answer_cache import AnswerCache
+from utils.chat_intents import ChatIntent, ChatIntentRouter
 
 class ChatbotService:
     """
     Enhanced AI Chatbot using Mistral 8x7B via OpenRouter
     Features:
     - Full report context
+    - Local knowledge base of carbon programs (BM25 retrieval)
     - Web search capability (SerpApi)
     - Smart context window management
     - Cost-effective via OpenRouter credits
@@ -18,7 +30,79 @@ class ChatbotService:
     SAFE_CONTEXT_TOKENS = 24000  # Leave room for response
     MAX_HISTORY_MESSAGES = 20   # Maximum conversation history to keep
     
-    def __init__(self):
+    # Rolling summary: raw messages sent alongside it, and how many older
+    # messages must be waiting before they are folded in
+    SUMMARY_KEEP_MESSAGES = 6
+    SUMMARY_MIN_BATCH = 4
+    SUMMARY_MAX_TOKENS = 300
+    
+    # Recent streams kept for time-to-first-token percentiles
+    TTFT_SAMPLES = 1000
+    
+    # Suggested questions that do not depend on the user's analysis; the
+    # answer cache shares one answer for each across all users
+    SUGGESTED_QUESTIONS = (
+        "What are carbon credits and how do they work?",
+        "How do I get started with carbon credit programs in India?",
+        "What's the difference between Verra and CAMPA?",
+        "What are the latest carbon credit prices in India?",
+        "How long does the verification process typically take?"
+    )
+    GENERAL_QUESTIONS = SUGGESTED_QUESTIONS + (
+        "What are the best forest carbon programs in India?",
+        "What carbon credit options exist for cropland?",
+        "Is mixed vegetation beneficial for carbon credits?"
+    )
+    
+    # Recent web search records (overlap with prompt preparation) for /metrics
+    SEARCH_RECORDS = 50
+    
+    # Fixed part of the system prompt
+    BASE_KNOWLEDGE = """You are a helpful carbon credit expert assistant for Indian farmers.
+
+CORE KNOWLEDGE:
+- Carbon credits: 1 credit = 1 ton CO2 sequestered
+- Indian programs: CAMPA (Compensatory Afforestation Fund Management and Planning Authority), State Forest Departments, Verra, Gold Standard
+- Current prices: ₹1,245-4,150 per credit (₹15-50 USD at ₹83/USD exchange rate)
+- Eligibility requirements: Professional land survey and soil testing required
+- Typical commitments: 20-30 years for most carbon credit programs
+- Verification costs in India: ₹4-17 lakhs (includes land survey, soil testing, baseline assessment, monitoring setup)
+- Sequestration rates hierarchy: forest > agroforestry > cropland > grassland
+- Key factors affecting sequestration: vegetation type, density, land condition, climate zone
+
+YOUR CAPABILITIES:
+1. Answer questions using the user's complete analysis report with specific numbers
+2. Explain calculations, methodologies, multipliers, and all recommendations in detail
+3. Search the web for current information when user asks about latest data
+4. Provide personalized advice based on their specific land characteristics and location
+
+RESPONSE GUIDELINES:
+- Be conversational, helpful, and informative
+- Always reference specific numbers from their analysis when relevant
+- Explain technical terms in simple language suitable for farmers
+- Be honest about uncertainties and limitations
+- Encourage professional verification for final decisions
+- Keep responses concise (2-5 sentences) unless user asks for detailed explanation
+- Use INR (₹) for all monetary values
+- When knowledge base passages are provided, rely on them for program rules, costs and eligibility
+
+IMPORTANT: When user asks about their specific analysis, always use their exact data from the context provided."""
+    
+    # Sent with every completion request (OpenRouter attribution)
+    EXTRA_HEADERS = {
+        "HTTP-Referer": "https://carbon-credit-analyzer.local",
+        "X-Title": "Carbon Credit Analyzer"
+    }
+    
+    def __init__(
+        self,
+        prompt_cache: Optional[PromptContextCache] = None,
+        token_counter: Optional[TokenCounter] = None,
+        knowledge_index: Optional[KnowledgeIndex] = None,
+        answer_cache: Optional[AnswerCache] = None,
+        intent_router: Optional[ChatIntentRouter] = None,
+        search_deadline: Optional[float] = None
+    ):
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         self.serpapi_key = os.getenv("SERPAPI_KEY")
         
@@ -32,86 +116,29 @@ class ChatbotService:
         )
         
         self.model = "mistralai/mixtral-8x7b-instruct"
-    
-    def _estimate_tokens(self, text: str) -> int:
-        """
-        Rough token estimation (1 token ≈ 4 characters for English)
-        More accurate than character count alone
-        """
-        # Account for special tokens and formatting
-        return len(text) // 3
-    
-    def _manage_context_window(
-        self,
-        system_prompt: str,
-        conversation_history: List[Dict[str, str]],
-        user_message: str,
-        search_results: Optional[str] = None
-    ) -> List[Dict[str, str]]:
-        """
-        Intelligently manage context window to prevent overflow
-        
-        Strategy:
-        1. Always keep system prompt (user's analysis)
-        2. Keep recent conversation (sliding window)
-        3. Summarize older messages if needed
-        4. Add search results if available
-        """
-        
-        # Estimate tokens
-        system_tokens = self._estimate_tokens(system_prompt)
-        user_tokens = self._estimate_tokens(user_message)
-        search_tokens = self._estimate_tokens(search_results) if search_results else 0
-        
-        # Reserve tokens for response
-        available_tokens = self.SAFE_CONTEXT_TOKENS - system_tokens - user_tokens - search_tokens - 500
-        
-        # Build message list
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-        
-        # Add conversation history (newest first approach)
-        if conversation_history:
-            # Reverse to prioritize recent messages
-            history_tokens = 0
-            kept_messages = []
-            
-            for msg in reversed(conversation_history[-self.MAX_HISTORY_MESSAGES:]):
-                msg_tokens = self._estimate_tokens(msg.get("content", ""))
-                
-                if history_tokens + msg_tokens < available_tokens:
-                    kept_messages.insert(0, msg)
-                    history_tokens += msg_tokens
-                else:
-                    # Context window full, stop adding older messages
-                    break
-            
-            # Add a context indicator if we dropped messages
-            if len(kept_messages) < len(conversation_history):
-                messages.append({
-                    "role": "system",
-                    "content": f"[Earlier conversation history truncated. Showing last {len(kept_messages)} messages.]"
-                })
-            
-            messages.extend(kept_messages)
-        
-        # Add search results if available
-        if search_results:
-            messages.append({
-                "role": "system",
-                "content": f"Current Web Search Results:\n{search_results}\n\nUse this up-to-date information to answer the user's question."
-            })
+        self.web_search = WebSearchService(self.serpapi_key)
+        self.knowledge = knowledge_index or KnowledgeIndex()
+        self.answer_cache = answer_cache or AnswerCache()
+        self.answer_cache.add_general_questions(self.GENERAL_QUESTIONS)
+        self.intents = intent_router or ChatIntentRouter()
+        self.prompt_cache = prompt_cache if prompt_cache is not None else PromptContextCache()
+        self.token_counter = token_counter or TokenCounter()
+        self.context_manager = ContextWindowManager(
+            self.token_counter, self.SAFE_CONTEXT_TOKENS, self.MAX_HISTORY_MESSAGES
+        )
         
-        # Add current message
-        messages.append({"role": "user", "content": user_message})
+        # Streaming counters and recent time-to-first-token samples
+        self.stream_stats = {"streams": 0, "completed": 0, "cancelled": 0, "errors": 0}
+        self.first_token_ms = deque(maxlen=self.TTFT_SAMPLES)
         
-        # Log context usage
-        total_tokens = sum(self._estimate_tokens(m.get("content", "")) for m in messages)
-        print(f"[CONTEXT] Estimated tokens: {total_tokens}/{self.SAFE_CONTEXT_TOKENS}")
-        print(f"[CONTEXT] Messages in context: {len(messages)}")
+        # Rolling summary counters
+        self.summary_stats = {"runs": 0, "failed": 0, "messages_folded": 0, "ms_total": 0.0}
         
-        return messages
+        # Seconds a chat turn waits for web search (None: until it finishes)
+        self.search_deadline = search_deadline or None
+        self.search_stats = {"searches": 0, "included": 0, "late": 0, "saved_ms_total": 0.0}
+        self.search_records = deque(maxlen=self.SEARCH_RECORDS)
+        self._late_searches = set()
     
     def _extract_full_report_context(self, user_analysis: Optional[Dict]) -> str:
         """Extract complete information from user's analysis including reports"""
@@ -125,15 +152,29 @@ class ChatbotService:
         # Carbon analysis
         carbon = user_analysis.get('carbon_analysis', {}).get('carbon_estimate', {})
         calc_details = carbon.get('calculation_details', {})
+        uncertainty = carbon.get('uncertainty') or {}
+        projection = carbon.get('long_term_projection') or {}
+        sensitivity = carbon.get('sensitivity') or {}
+        drivers = sensitivity.get('sobol', {}).get('annual_revenue_inr', [])
+        swings = {row['input']: row for row in sensitivity.get('tornado', [])}
         
         # Location data
-        location = user_analysis.get('location_data', {})
-        location_info = location.get('location', {})
-        weather = location.get('weather_data', {})
+        location = user_analysis.get('location_data') or {}
+        location_info = location.get('location') or {}
+        weather = location.get('weather_data') or {}
+        normals = location.get('climate_normals') or {}
         
         # Reports
-        reports = user_analysis.get('reports', {})
-        exec_summary = reports.get('executive_summary', '')
+        reports = user_analysis.get('reports') or {}
+        exec_summary = reports.get('executive_summary') or 'Not available for this analysis'
+        
+        if projection:
+            projection_text = f"""{projection.get('horizon_years', 30)}-Year Projection (growth curve, price escalation, {projection.get('discount_rate', 0.08):.0%} discount rate):
+  - Total CO2: {projection.get('total_sequestration_tons', 0)} tons
+  - Mid-Range Total Revenue: ₹{projection.get('scenarios', {}).get('mid', {}).get('total_revenue_inr', 0):,.0f}
+  - Mid-Range NPV: ₹{projection.get('scenarios', {}).get('mid', {}).get('npv_inr', 0):,.0f}"""
+        else:
+            projection_text = "Long-term Projection: not available for this analysis"
         
         # Recommendations and next steps
         carbon_analysis = user_analysis.get('carbon_analysis', {})
@@ -149,6 +190,7 @@ Location Information:
 - Climate Zone: {location_info.get('climate_zone', 'N/A')}
 - Current Temperature: {weather.get('temperature', 'N/A')}°C
 - Humidity: {weather.get('humidity', 'N/A')}%
+- Long-term Normals: {normals.get('annual_rainfall_mm', 'N/A')} mm rainfall/year, {normals.get('mean_temperature_c', 'N/A')}°C mean temperature, {normals.get('mean_humidity_pct', 'N/A')}% humidity
 - Climate Multiplier: {location.get('climate_multiplier', 1.0)}x
 
 Land Characteristics:
@@ -189,6 +231,15 @@ Revenue Projections (INR):
   - Mid-Range: ₹{carbon.get('potential_revenue_inr', {}).get('10_year', {}).get('mid', 0):,.0f}
   - Optimistic: ₹{carbon.get('potential_revenue_inr', {}).get('10_year', {}).get('max', 0):,.0f}
 
+Uncertainty (Monte Carlo, P10-P50-P90):
+  - CO2: {uncertainty.get('annual_co2_tons', {}).get('p10', 'N/A')} / {uncertainty.get('annual_co2_tons', {}).get('p50', 'N/A')} / {uncertainty.get('annual_co2_tons', {}).get('p90', 'N/A')} tons/year
+  - Revenue: ₹{uncertainty.get('annual_revenue_inr', {}).get('p10', 0):,.0f} / ₹{uncertainty.get('annual_revenue_inr', {}).get('p50', 0):,.0f} / ₹{uncertainty.get('annual_revenue_inr', {}).get('p90', 0):,.0f} per year
+
+What Drives the Estimate (share of revenue uncertainty; revenue at P10 / P90 of that input):
+{chr(10).join(f"  - {d['label']}: {d['total_effect'] * 100:.0f}% (₹{swings.get(d['input'], {}).get('annual_revenue_inr_low', 0):,.0f} - ₹{swings.get(d['input'], {}).get('annual_revenue_inr_high', 0):,.0f})" for d in drivers) or '  - N/A'}
+
+{projection_text}
+
 Confidence Level: {carbon.get('confidence_level', 'N/A')}
 
 Expert Recommendations:
@@ -205,122 +256,285 @@ Use this complete context to answer user's questions accurately and specifically
         return context
     
     async def _web_search(self, query: str) -> str:
-        """Perform web search using SerpApi"""
-        
-        if not self.serpapi_key:
-            return "Web search unavailable (API key not configured)"
-        
-        try:
-            search = GoogleSearch({
-                "q": query,
-                "api_key": self.serpapi_key,
-                "num": 3,
-                "gl": "in",  # India
-                "hl": "en"
-            })
-            
-            results = search.get_dict()
-            
-            if "organic_results" not in results:
-                return "No search results found"
-            
-            # Extract top 3 results
-            search_summary = []
-            for idx, result in enumerate(results["organic_results"][:3], 1):
-                title = result.get("title", "")
-                snippet = result.get("snippet", "")
-                link = result.get("link", "")
-                search_summary.append(f"{idx}. {title}\n   {snippet}\n   Source: {link}")
-            
-            return "\n\n".join(search_summary)
-            
-        except Exception as e:
-            return f"Search error: {str(e)}"
+        """Perform web search using SerpApi (off the event loop, cached)"""
+        return await self.web_search.search(query)
     
-    def _create_system_prompt(self, user_analysis: Optional[Dict] = None) -> str:
-        """Create enhanced system prompt with full context"""
-        
-        base_knowledge = """You are a helpful carbon credit expert assistant for Indian farmers.
-
-CORE KNOWLEDGE:
-- Carbon credits: 1 credit = 1 ton CO2 sequestered
-- Indian programs: CAMPA (Compensatory Afforestation Fund Management and Planning Authority), State Forest Departments, Verra, Gold Standard
-- Current prices: ₹1,245-4,150 per credit (₹15-50 USD at ₹83/USD exchange rate)
-- Eligibility requirements: Professional land survey and soil testing required
-- Typical commitments: 20-30 years for most carbon credit programs
-- Verification costs in India: ₹4-17 lakhs (includes land survey, soil testing, baseline assessment, monitoring setup)
-- Sequestration rates hierarchy: forest > agroforestry > cropland > grassland
-- Key factors affecting sequestration: vegetation type, density, land condition, climate zone
-
-YOUR CAPABILITIES:
-1. Answer questions using the user's complete analysis report with specific numbers
-2. Explain calculations, methodologies, multipliers, and all recommendations in detail
-3. Search the web for current information when user asks about latest data
-4. Provide personalized advice based on their specific land characteristics and location
-
-RESPONSE GUIDELINES:
-- Be conversational, helpful, and informative
-- Always reference specific numbers from their analysis when relevant
-- Explain technical terms in simple language suitable for farmers
-- Be honest about uncertainties and limitations
-- Encourage professional verification for final decisions
-- Keep responses concise (2-5 sentences) unless user asks for detailed explanation
-- Use INR (₹) for all monetary values
+    def _create_system_prompt(
+        self,
+        user_analysis: Optional[Dict] = None,
+        analysis_fingerprint: Optional[str] = None
+    ) -> str:
+        """
+        Create enhanced system prompt with full context
 
-IMPORTANT: When user asks about their specific analysis, always use their exact data from the context provided."""
+        Rendered once per analysis and reused across chat turns (pass the
+        analysis fingerprint if it is already known).
+        """
 
         # Add user's complete analysis
         if user_analysis:
-            context = self._extract_full_report_context(user_analysis)
-            return base_knowledge + "\n\n" + context
+            return self.prompt_cache.render(
+                user_analysis,
+                "chat_system_prompt",
+                lambda analysis: self.BASE_KNOWLEDGE + "\n\n" + self._extract_full_report_context(analysis),
+                fingerprint=analysis_fingerprint
+            )
+
+        return self.BASE_KNOWLEDGE
+    
+    def _retrieve(self, user_message: str, user_analysis: Optional[Dict] = None) -> tuple:
+        """
+        Knowledge base passages for a message and its intent
+        
+        Returns (passages, knowledge_answers, intent).
+        """
+        
+        # Local knowledge base first; it answers most factual questions
+        passages = self.knowledge.search(user_message)
+        knowledge_answers = bool(passages) and passages[0]["score"] >= self.knowledge.CONFIDENT_SCORE
+        intent = self.intents.classify(user_message, user_analysis, knowledge_answers)
+        return passages, knowledge_answers, intent
+    
+    def _local_answer(self, intent: ChatIntent, user_analysis: Optional[Dict]) -> Optional[Dict[str, Any]]:
+        """Result for a calculation question answered without the model, if possible"""
+        
+        if not intent.local:
+            return None
+        text = self.intents.answer(intent, user_analysis)
+        if text is None:
+            return None
+        return {
+            "status": "success",
+            "response": text,
+            "tokens": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            "model": "local",
+            "search_performed": False,
+            "context_info": {"intent": intent.name, "answered_locally": True},
+            "cached": False
+        }
+    
+    def _plan_answer_cache(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        user_analysis: Optional[Dict],
+        conversation_summary: Optional[str],
+        needs_search: bool,
+        analysis_fingerprint: Optional[str] = None
+    ) -> tuple:
+        """
+        Answer cache key for a turn, and the context to answer it with
+        
+        Cacheable answers are generated without the conversation, and
+        general ones (no analysis, or a registered general question)
+        without the analysis, so they can be shared.
+        Returns (key or None, history, analysis, summary).
+        """
+        
+        key, personal = self.answer_cache.plan(
+            user_message,
+            self._analysis_scope(user_analysis, analysis_fingerprint),
+            has_history=bool(conversation_history or conversation_summary),
+            needs_search=needs_search
+        )
+        if key is None:
+            return None, conversation_history, user_analysis, conversation_summary
+        return key, None, user_analysis if personal else None, None
+    
+    def _analysis_scope(
+        self,
+        user_analysis: Optional[Dict],
+        analysis_fingerprint: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Answer cache scope of an analysis: a hash of the system prompt it renders
+        
+        Personal answers see the analysis only through that prompt, so
+        analyses that render differently never share an answer. Cached
+        with the prompt itself.
+        """
         
-        return base_knowledge
+        if not user_analysis:
+            return None
+        analysis_fingerprint = analysis_fingerprint or self.prompt_cache.fingerprint(user_analysis)
+        return self.prompt_cache.render(
+            user_analysis,
+            "chat_answer_scope",
+            lambda analysis: hashlib.blake2b(
+                self._create_system_prompt(analysis, analysis_fingerprint).encode("utf-8"), digest_size=16
+            ).hexdigest(),
+            fingerprint=analysis_fingerprint
+        )
+    
+    @staticmethod
+    def _cached_answer(cached: Dict[str, Any]) -> Dict[str, Any]:
+        """A cached result as returned for a hit (no tokens spent)"""
+        
+        return {
+            **cached,
+            "tokens": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            "cached": True,
+            "context_info": {**cached.get("context_info", {}), "answer_cache": "hit"}
+        }
+    
+    async def _build_messages(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        user_analysis: Optional[Dict],
+        conversation_summary: Optional[str] = None,
+        retrieval: Optional[tuple] = None,
+        analysis_fingerprint: Optional[str] = None
+    ) -> tuple:
+        """
+        Prompt messages for a chat turn (knowledge base passages, plus a
+        web search if needed)
+        
+        Returns (messages, search_performed, context_info).
+        """
+        
+        passages, knowledge_answers, intent = retrieval or self._retrieve(user_message, user_analysis)
+        needs_search = intent.needs_search
+        
+        # Start the search first: the SerpApi call runs in a worker thread
+        # while the prompt is prepared and budgeted below
+        search_task = None
+        if needs_search and self.serpapi_key:
+            print(f"[CHAT] Performing web search for: {user_message}")
+            search_started = time.perf_counter()
+            search_task = self.web_search.start(user_message + " carbon credits India")
+        
+        plan = self.context_manager.plan(
+            self._create_system_prompt(user_analysis, analysis_fingerprint),
+            conversation_history,
+            user_message,
+            conversation_summary,
+            self.knowledge.format_passages(passages)
+        )
+        
+        search_results = None
+        search_record = None
+        if search_task is not None:
+            search_results, search_record = await self._await_search(search_task, search_started)
+        
+        # Add the search results (or a note that they are late) to the budget
+        messages, budget = self.context_manager.finish(
+            plan, search_results, search_pending=search_task is not None and search_results is None
+        )
+        print(
+            f"[CONTEXT] {budget['used']}/{budget['budget']} tokens "
+            f"(system {budget['system_tokens']}, summary {budget['summary_tokens']}, history {budget['history_tokens']}, "
+            f"knowledge {budget['knowledge_tokens']}, search {budget['search_tokens']}, message {budget['message_tokens']}); "
+            f"{budget['history_messages_used']} history messages kept, {budget['history_messages_dropped']} dropped"
+        )
+        
+        context_info = {
+            "messages_in_context": len(messages),
+            "history_messages_used": budget["history_messages_used"],
+            "conversation_truncated": budget["history_messages_dropped"] > 0,
+            "estimated_prompt_tokens": budget["used"],
+            "knowledge_passages": [f"{p['title']} - {p['heading']}" for p in passages],
+            "intent": intent.name,
+            "answered_from_knowledge_base": knowledge_answers and not needs_search,
+            "search_overlap": search_record,
+            "token_budget": budget
+        }
+        
+        return messages, needs_search and bool(search_results), context_info
+    
+    async def _await_search(self, task: asyncio.Future, started: float) -> tuple:
+        """
+        Wait for a web search until the deadline
+        
+        started is when the search was dispatched; the prompt was prepared
+        since. Returns (results or None if late, record). The record has the
+        preparation time, how long the turn waited in total, the search
+        time, whether the results made it in, and the latency saved against
+        the sequential path (preparation, then the whole search). A late
+        search keeps running: its results land in the search cache for the
+        next turn, and the record gets the search time and saving then.
+        """
+        
+        prepared_ms = (time.perf_counter() - started) * 1000
+        remaining = None
+        if self.search_deadline is not None:
+            remaining = max(0.0, self.search_deadline - prepared_ms / 1000)
+        
+        done, _ = await asyncio.wait({task}, timeout=remaining)
+        waited_ms = (time.perf_counter() - started) * 1000
+        record = {
+            "deadline_ms": round(self.search_deadline * 1000) if self.search_deadline is not None else None,
+            "prepared_ms": round(prepared_ms, 1),
+            "waited_ms": round(waited_ms, 1),
+            "search_ms": None,
+            "included": bool(done),
+            "saved_ms": None
+        }
+        self.search_stats["searches"] += 1
+        self.search_records.append(record)
+        
+        if done:
+            results, finished_at = task.result()
+            search_ms = (finished_at - started) * 1000
+            saved_ms = max(0.0, prepared_ms + search_ms - waited_ms)
+            record["search_ms"] = round(search_ms, 1)
+            record["saved_ms"] = round(saved_ms, 1)
+            self.search_stats["included"] += 1
+            self.search_stats["saved_ms_total"] += saved_ms
+            return results, record
+        
+        print(f"[CHAT] Web search missed the {record['deadline_ms']} ms deadline - answering without it")
+        self.search_stats["late"] += 1
+        self._late_searches.add(task)
+        
+        def finished(task: asyncio.Future) -> None:
+            self._late_searches.discard(task)
+            if task.cancelled():
+                return
+            search_ms = (task.result()[1] - started) * 1000
+            saved_ms = max(0.0, prepared_ms + search_ms - waited_ms)
+            record["search_ms"] = round(search_ms, 1)
+            record["saved_ms"] = round(saved_ms, 1)
+            self.search_stats["saved_ms_total"] += saved_ms
+        
+        task.add_done_callback(finished)
+        return None, record
     
     async def chat(
         self,
         user_message: str,
         conversation_history: List[Dict[str, str]] = None,
-        user_analysis: Optional[Dict] = None
+        user_analysis: Optional[Dict] = None,
+        conversation_summary: Optional[str] = None,
+        analysis_fingerprint: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Enhanced chat with web search capability using Mistral 8x7B
+        
+        Calculation questions are answered locally and frequently asked
+        questions from the answer cache; the rest go to the model. Pass
+        analysis_fingerprint (PromptContextCache.fingerprint of
+        user_analysis) to avoid re-hashing the analysis every turn.
         """
         
-        # Check if we need web search
-        search_results = None
-        needs_search = any([
-            "latest" in user_message.lower(),
-            "current" in user_message.lower(),
-            "recent" in user_message.lower(),
-            "2025" in user_message,
-            "today" in user_message.lower(),
-            "news" in user_message.lower(),
-            "update" in user_message.lower()
-        ])
-        
-        # Build conversation
-        messages = [
-            {"role": "system", "content": self._create_system_prompt(user_analysis)}
-        ]
-        
-        # Add conversation history (last 10 messages for context management)
-        if conversation_history:
-            messages.extend(conversation_history[-10:])
-        
-        # Perform search if needed
-        if needs_search and self.serpapi_key:
-            print(f"[CHAT] Performing web search for: {user_message}")
-            search_query = user_message + " carbon credits India"
-            search_results = await self._web_search(search_query)
-            
-            # Add search results to context
-            messages.append({
-                "role": "system",
-                "content": f"Current Web Search Results:\n{search_results}\n\nUse this up-to-date information to answer the user's question along with your base knowledge."
-            })
+        retrieval = self._retrieve(user_message, user_analysis)
+        local = self._local_answer(retrieval[2], user_analysis)
+        if local is not None:
+            return local
         
-        # Add current message
-        messages.append({"role": "user", "content": user_message})
+        cache_key, conversation_history, user_analysis, conversation_summary = self._plan_answer_cache(
+            user_message, conversation_history, user_analysis, conversation_summary, retrieval[2].needs_search,
+            analysis_fingerprint
+        )
+        if cache_key is not None:
+            cached = self.answer_cache.get(cache_key)
+            if cached is not None:
+                return self._cached_answer(cached)
+        
+        messages, search_performed, context_info = await self._build_messages(
+            user_message, conversation_history, user_analysis, conversation_summary, retrieval, analysis_fingerprint
+        )
+        context_info["answer_cache"] = "miss" if cache_key is not None else "bypass"
         
         try:
             response = await self.client.chat.completions.create(
@@ -329,15 +543,12 @@ IMPORTANT: When user asks about their specific analysis, always use their exact
                 temperature=0.7,
                 max_tokens=600,
                 top_p=0.9,
-                extra_headers={
-                    "HTTP-Referer": "https://carbon-credit-analyzer.local",
-                    "X-Title": "Carbon Credit Analyzer"
-                }
+                extra_headers=self.EXTRA_HEADERS
             )
             
             assistant_message = response.choices[0].message.content
             
-            return {
+            result = {
                 "status": "success",
                 "response": assistant_message,
                 "tokens": {
@@ -346,8 +557,13 @@ IMPORTANT: When user asks about their specific analysis, always use their exact
                     "total_tokens": response.usage.total_tokens
                 },
                 "model": self.model,
-                "search_performed": needs_search and bool(search_results)
+                "search_performed": search_performed,
+                "context_info": context_info,
+                "cached": False
             }
+            if cache_key is not None:
+                self.answer_cache.set(cache_key, result)
+            return result
             
         except Exception as e:
             error_msg = str(e)
@@ -359,26 +575,257 @@ IMPORTANT: When user asks about their specific analysis, always use their exact
                 "error": error_msg
             }
     
+    async def chat_stream(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None,
+        user_analysis: Optional[Dict] = None,
+        conversation_summary: Optional[str] = None,
+        analysis_fingerprint: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat()
+        
+        Yields events as dicts:
+        - {"event": "start"} immediately, before any search or model call
+        - {"event": "token", "text": ...} as the model produces text
+        - {"event": "done", ...} with the full response, token usage,
+          search_performed, context_info and timings
+        - {"event": "error", ...} instead of "done" if the call fails
+        
+        Closing the generator (client disconnected) closes the upstream
+        stream, so no further tokens are generated or billed.
+        """
+        
+        started = time.perf_counter()
+        self.stream_stats["streams"] += 1
+        
+        stream = None
+        finished = False
+        first_token_ms = None
+        parts = []
+        usage = None
+        
+        try:
+            retrieval = self._retrieve(user_message, user_analysis)
+            ready = self._local_answer(retrieval[2], user_analysis)
+            cache_key = None
+            if ready is None:
+                cache_key, conversation_history, user_analysis, conversation_summary = self._plan_answer_cache(
+                    user_message, conversation_history, user_analysis, conversation_summary, retrieval[2].needs_search,
+                    analysis_fingerprint
+                )
+                cached = self.answer_cache.get(cache_key) if cache_key is not None else None
+                ready = self._cached_answer(cached) if cached is not None else None
+            
+            yield {"event": "start", "model": ready["model"] if ready is not None else self.model}
+            
+            # Local or cached answer: send it whole
+            if ready is not None:
+                finished = True
+                self.stream_stats["completed"] += 1
+                yield {"event": "token", "text": ready["response"]}
+                yield {
+                    "event": "done",
+                    **ready,
+                    "timing": {
+                        "time_to_first_token_ms": round((time.perf_counter() - started) * 1000, 1),
+                        "total_ms": round((time.perf_counter() - started) * 1000, 1)
+                    }
+                }
+                return
+            
+            messages, search_performed, context_info = await self._build_messages(
+                user_message, conversation_history, user_analysis, conversation_summary, retrieval, analysis_fingerprint
+            )
+            context_info["answer_cache"] = "miss" if cache_key is not None else "bypass"
+            
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=600,
+                top_p=0.9,
+                stream=True,
+                stream_options={"include_usage": True},
+                extra_headers=self.EXTRA_HEADERS
+            )
+            
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    if first_token_ms is None:
+                        first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+                        self.first_token_ms.append(first_token_ms)
+                    parts.append(text)
+                    yield {"event": "token", "text": text}
+            
+            finished = True
+            
+        except Exception as e:
+            error_msg = str(e)
+            print(f"[CHAT] Stream error: {error_msg}")
+            self.stream_stats["errors"] += 1
+            finished = True
+            yield {
+                "event": "error",
+                "response": "I'm having trouble connecting right now. Please try again.",
+                "error": error_msg
+            }
+            return
+        
+        finally:
+            if stream is not None:
+                await stream.close()
+            if not finished:
+                self.stream_stats["cancelled"] += 1
+                print(f"[CHAT] Stream cancelled after {len(parts)} chunks")
+        
+        response_text = "".join(parts)
+        if usage:
+            tokens = {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "total_tokens": usage.total_tokens,
+                "estimated": False
+            }
+        else:
+            # Provider sent no usage chunk; fall back to the estimate
+            prompt_tokens = context_info["estimated_prompt_tokens"]
+            completion_tokens = self.token_counter.count(response_text)
+            tokens = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "estimated": True
+            }
+        
+        self.stream_stats["completed"] += 1
+        result = {
+            "status": "success",
+            "response": response_text,
+            "tokens": tokens,
+            "model": self.model,
+            "search_performed": search_performed,
+            "context_info": context_info,
+            "cached": False
+        }
+        if cache_key is not None:
+            self.answer_cache.set(cache_key, result)
+        yield {
+            "event": "done",
+            **result,
+            "timing": {
+                "time_to_first_token_ms": first_token_ms,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+        }
+    
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """Streaming counters and time-to-first-token percentiles"""
+        
+        samples = np.array(self.first_token_ms) if self.first_token_ms else None
+        return {
+            **self.stream_stats,
+            "time_to_first_token_ms": {
+                "samples": len(self.first_token_ms),
+                "p50": round(float(np.percentile(samples, 50)), 1) if samples is not None else None,
+                "p90": round(float(np.percentile(samples, 90)), 1) if samples is not None else None
+            }
+        }
+    
+    async def summarize(self, previous_summary: str, messages: List[Dict[str, str]]) -> Optional[str]:
+        """Rolling summary extended with messages (None if the model call fails)"""
+        
+        transcript = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in messages)
+        prompt = f"""Update the running summary of a conversation between an Indian farmer and a carbon credit assistant.
+
+CURRENT SUMMARY:
+{previous_summary or "(none yet)"}
+
+NEW MESSAGES:
+{transcript}
+
+Write the updated summary in under 150 words. Keep every figure, decision, open question and stated fact about the farmer's land; drop greetings and repetition. Reply with the summary only."""
+        
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.2,
+                max_tokens=self.SUMMARY_MAX_TOKENS,
+                extra_headers=self.EXTRA_HEADERS
+            )
+            return (response.choices[0].message.content or "").strip() or None
+        except Exception as e:
+            print(f"[CHAT] Summary failed: {e}")
+            return None
+    
+    async def update_summary(self, session: ChatSession, store: ChatSessionStore) -> bool:
+        """
+        Fold older messages of a session into its rolling summary
+        
+        Runs after a response has been sent. Once SUMMARY_MIN_BATCH
+        messages older than the last SUMMARY_KEEP_MESSAGES are waiting,
+        they are summarized together with the previous summary, so the
+        prompt carries the summary plus a few raw turns however long the
+        conversation gets. Returns True if the summary was updated.
+        """
+        
+        pending = session.unsummarized()
+        fold = len(pending) - self.SUMMARY_KEEP_MESSAGES
+        if session.summarizing or fold < self.SUMMARY_MIN_BATCH:
+            return False
+        
+        covers = session.unsummarized_from + fold
+        session.summarizing = True
+        started = time.perf_counter()
+        self.summary_stats["runs"] += 1
+        try:
+            summary = await self.summarize(session.summary, pending[:fold])
+        finally:
+            session.summarizing = False
+            self.summary_stats["ms_total"] += (time.perf_counter() - started) * 1000
+        
+        if not summary:
+            self.summary_stats["failed"] += 1
+            return False
+        
+        store.set_summary(session, summary, covers)
+        self.summary_stats["messages_folded"] += fold
+        print(f"[CHAT] Session {session.session_id[:8]} summary now covers {session.summarized} messages")
+        return True
+    
+    def get_summary_stats(self) -> Dict[str, Any]:
+        return {**self.summary_stats, "ms_total": round(self.summary_stats["ms_total"], 1)}
+    
+    def get_search_stats(self) -> Dict[str, Any]:
+        """Search/prompt overlap: latency saved and answers sent without results"""
+        
+        return {
+            **self.search_stats,
+            "saved_ms_total": round(self.search_stats["saved_ms_total"], 1),
+            "deadline_seconds": self.search_deadline,
+            "late_in_flight": len(self._late_searches),
+            "recent": list(self.search_records)
+        }
+    
     async def get_suggested_questions(self, user_analysis: Optional[Dict] = None) -> List[str]:
         """Generate contextual suggested questions"""
         
-        general_questions = [
-            "What are carbon credits and how do they work?",
-            "How do I get started with carbon credit programs in India?",
-            "What's the difference between Verra and CAMPA?",
-            "What are the latest carbon credit prices in India?",
-            "How long does the verification process typically take?"
-        ]
-        
         if not user_analysis:
-            return general_questions
+            return list(self.SUGGESTED_QUESTIONS)
         
         # Personalized questions based on complete analysis
         vision = user_analysis.get('vision_analysis', {})
         carbon = user_analysis.get('carbon_analysis', {}).get('carbon_estimate', {})
         confidence = carbon.get('confidence_level', 'medium')
         veg_type = vision.get('vegetation_type', 'unknown')
-        location = user_analysis.get('location_data', {}).get('location', {})
+        location = (user_analysis.get('location_data') or {}).get('location') or {}
         state = location.get('state', '')
         
         personalized = []
@@ -0,0 +1,71 @@
+import json
+import os
+import numpy as np
+from typing import Dict, Any, Optional
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+class ClimateNormals:
+    """
+    Long-term climate normals for India from a bundled, memory-mapped grid
+
+    The grid (data/climate_normals_india.npy, built by
+    scripts/build_climate_normals.py) is a regular lat/lon raster, so the
+    spatial index is plain arithmetic: a point maps to its four surrounding
+    cells in O(1) and is bilinearly interpolated. No network call, and the
+    result does not depend on the time of day of the upload.
+    """
+
+    DEFAULT_PATH = os.path.join(DATA_DIR, "climate_normals_india.npy")
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.available = False
+        try:
+            with open(os.path.splitext(path)[0] + ".json") as f:
+                self.meta = json.load(f)
+            self.grid = np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"Climate normals unavailable ({e}) - using regional baselines only")
+            self.meta, self.grid = {}, None
+            return
+
+        self.variables = self.meta["variables"]
+        self.lat_min = self.meta["lat_min"]
+        self.lon_min = self.meta["lon_min"]
+        self.step = self.meta["step_deg"]
+        self.rows, self.cols = self.grid.shape[1:]
+        self.available = True
+
+    def lookup(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        """
+        Interpolated normals at a point
+
+        Returns None outside the grid's coverage.
+        """
+
+        if not self.available:
+            return None
+
+        y = (lat - self.lat_min) / self.step
+        x = (lon - self.lon_min) / self.step
+        if not (0 <= y <= self.rows - 1 and 0 <= x <= self.cols - 1):
+            return None
+
+        row, col = min(int(y), self.rows - 2), min(int(x), self.cols - 2)
+        fy, fx = y - row, x - col
+
+        # (variables, 2, 2) window and bilinear weights; cells outside
+        # coverage (NaN) are left out and the rest renormalized
+        window = np.asarray(self.grid[:, row:row + 2, col:col + 2], dtype=np.float64)
+        weights = np.array([[(1 - fy) * (1 - fx), (1 - fy) * fx], [fy * (1 - fx), fy * fx]])
+        valid = np.isfinite(window[0])
+        total = weights[valid].sum()
+        if total <= 0:
+            return None
+
+        values = (np.where(valid, window, 0.0) * weights).sum(axis=(1, 2)) / total
+
+        result = {name: round(float(value), 1) for name, value in zip(self.variables, values)}
+        result["source"] = "climate_normals"
+        return result
@@ -0,0 +1,335 @@
+import csv
+import os
+import re
+from bisect import bisect_left
+from typing import Dict, Any, Iterable, List, Optional
+from utils.climate_normals import DATA_DIR
+
+
+class _NameIndex:
+    """
+    Exact, prefix and trigram lookup over normalized names
+
+    Each key (canonical name or alias) maps to one or more targets
+    (row numbers in the owning table).
+    """
+
+    def __init__(self):
+        # key -> [(target, is_alias)]
+        self.exact: Dict[str, list] = {}
+        # key -> {trigram}, and trigram -> [key]
+        self.key_trigrams: Dict[str, frozenset] = {}
+        self.trigrams: Dict[str, list] = {}
+        self.sorted_keys: List[str] = []
+
+    def add(self, key: str, target: int, is_alias: bool = False) -> None:
+        if key not in self.exact:
+            self.exact[key] = []
+            grams = frozenset(trigrams(key))
+            self.key_trigrams[key] = grams
+            for gram in grams:
+                self.trigrams.setdefault(gram, []).append(key)
+        if all(existing != target for existing, _ in self.exact[key]):
+            self.exact[key].append((target, is_alias))
+
+    def freeze(self) -> None:
+        self.sorted_keys = sorted(self.exact)
+
+    def prefix(self, key: str) -> Iterable[str]:
+        """Keys starting with key, in sorted order"""
+
+        i = bisect_left(self.sorted_keys, key)
+        while i < len(self.sorted_keys) and self.sorted_keys[i].startswith(key):
+            yield self.sorted_keys[i]
+            i += 1
+
+    def fuzzy(self, key: str, min_score: float) -> List[tuple]:
+        """(score, key) for keys with Dice trigram similarity >= min_score, best first"""
+
+        grams = frozenset(trigrams(key))
+        if not grams:
+            return []
+
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self.trigrams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        scored = []
+        for candidate, count in shared.items():
+            score = 2.0 * count / (len(grams) + len(self.key_trigrams[candidate]))
+            if score >= min_score:
+                scored.append((round(score, 3), candidate))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored
+
+
+def normalize_name(text: str) -> str:
+    """
+    Lookup key for a place name
+
+    Case, punctuation and spacing are ignored, so "Tamil Nadu",
+    "tamilnadu" and "TAMIL-NADU" share a key; "&" reads as "and".
+    """
+
+    text = (text or "").lower().replace("&", " and ")
+    return re.sub(r"[^a-z0-9]+", "", text)
+
+
+def trigrams(key: str) -> List[str]:
+    """Character trigrams of a key, padded so short names still index"""
+
+    padded = f"^{key}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class Gazetteer:
+    """
+    Offline gazetteer of Indian states, union territories and cities
+
+    Loaded once from data/gazetteer_states.csv and data/gazetteer_cities.csv
+    (canonical names, state codes, former and common alternative names,
+    approximate coordinates). Names resolve locally, cheapest step first:
+    - exact match on the normalized name, alias or state code (dict lookup)
+    - prefix match for autocomplete (bisect over the sorted keys)
+    - fuzzy match for misspellings (candidates sharing character trigrams,
+      scored by Dice similarity)
+
+    State coordinates are the mean of that state's listed cities.
+    """
+
+    STATES_CSV = os.path.join(DATA_DIR, "gazetteer_states.csv")
+    CITIES_CSV = os.path.join(DATA_DIR, "gazetteer_cities.csv")
+
+    # Minimum trigram similarity for a fuzzy match
+    MIN_FUZZY_SCORE = 0.5
+    # Shorter inputs only match exactly (codes such as "UP", "TN")
+    MIN_FUZZY_LENGTH = 4
+
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+
+    def __init__(self, states_path: str = STATES_CSV, cities_path: str = CITIES_CSV):
+        self.states: List[Dict[str, Any]] = []
+        self.cities: List[Dict[str, Any]] = []
+        self.state_index = _NameIndex()
+        self.city_index = _NameIndex()
+        # state row -> city rows
+        self.cities_by_state: Dict[int, List[int]] = {}
+
+        try:
+            self._load(states_path, cities_path)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Gazetteer unavailable ({e}) - using exact state names only")
+            self.states, self.cities = [], []
+            self.state_index, self.city_index = _NameIndex(), _NameIndex()
+            self.cities_by_state = {}
+
+        self.state_index.freeze()
+        self.city_index.freeze()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.states)
+
+    def _load(self, states_path: str, cities_path: str) -> None:
+        with open(states_path, newline="") as f:
+            for row in csv.DictReader(f):
+                target = len(self.states)
+                self.states.append({"name": row["state"], "code": row["code"], "lat": None, "lon": None})
+                self.state_index.add(normalize_name(row["state"]), target)
+                self.state_index.add(normalize_name(row["code"]), target, is_alias=True)
+                for alias in _split_aliases(row["aliases"]):
+                    self.state_index.add(normalize_name(alias), target, is_alias=True)
+
+        with open(cities_path, newline="") as f:
+            for row in csv.DictReader(f):
+                state = self._exact_state(row["state"])
+                if state is None:
+                    raise ValueError(f"unknown state {row['state']!r} for {row['city']}")
+                target = len(self.cities)
+                self.cities.append({
+                    "name": row["city"],
+                    "state": self.states[state]["name"],
+                    "lat": float(row["lat"]),
+                    "lon": float(row["lon"])
+                })
+                self.cities_by_state.setdefault(state, []).append(target)
+                self.city_index.add(normalize_name(row["city"]), target)
+                for alias in _split_aliases(row["aliases"]):
+                    self.city_index.add(normalize_name(alias), target, is_alias=True)
+
+        for state, rows in self.cities_by_state.items():
+            self.states[state]["lat"] = round(sum(self.cities[i]["lat"] for i in rows) / len(rows), 4)
+            self.states[state]["lon"] = round(sum(self.cities[i]["lon"] for i in rows) / len(rows), 4)
+
+    def _exact_state(self, name: str) -> Optional[int]:
+        matches = self.state_index.exact.get(normalize_name(name))
+        return matches[0][0] if matches else None
+
+    @staticmethod
+    def _match_type(is_alias: bool) -> str:
+        return "alias" if is_alias else "exact"
+
+    def resolve_state(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Canonical state for a name, code, alias or misspelling
+
+        Returns {name, code, lat, lon, match, score} or None.
+        """
+
+        key = normalize_name(text)
+        if not key:
+            return None
+
+        matches = self.state_index.exact.get(key)
+        if matches:
+            target, is_alias = matches[0]
+            return self._state_result(target, self._match_type(is_alias), 1.0)
+
+        if len(key) < self.MIN_FUZZY_LENGTH:
+            return None
+        for score, candidate in self.state_index.fuzzy(key, self.MIN_FUZZY_SCORE):
+            target, _ = self.state_index.exact[candidate][0]
+            return self._state_result(target, "fuzzy", score)
+        return None
+
+    def resolve_city(self, text: str, state: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Canonical city for a name, former name or misspelling
+
+        With a state, only that state's cities are considered. Names shared
+        by several states (e.g. Bilaspur) resolve to the first listed.
+        Returns {name, state, lat, lon, match, score} or None.
+        """
+
+        key = normalize_name(text)
+        if not key:
+            return None
+
+        allowed = None
+        if state is not None:
+            resolved_state = self.resolve_state(state)
+            if resolved_state is None:
+                return None
+            allowed = set(self.cities_by_state.get(resolved_state["row"], ()))
+
+        for target, is_alias in self.city_index.exact.get(key, ()):
+            if allowed is None or target in allowed:
+                return self._city_result(target, self._match_type(is_alias), 1.0)
+
+        if len(key) < self.MIN_FUZZY_LENGTH:
+            return None
+        for score, candidate in self.city_index.fuzzy(key, self.MIN_FUZZY_SCORE):
+            for target, _ in self.city_index.exact[candidate]:
+                if allowed is None or target in allowed:
+                    return self._city_result(target, "fuzzy", score)
+        return None
+
+    def resolve(self, city: str, state: str) -> Dict[str, Any]:
+        """
+        Canonical city/state and coordinates for user input
+
+        The state is resolved first and the city looked up within it; if
+        the state is not recognised, the city is looked up nationwide and
+        its state used (state_match "inferred"). Unresolved parts keep the
+        input (stripped).
+        Coordinates fall back from city to state centroid to None.
+        """
+
+        resolved_state = self.resolve_state(state)
+        resolved_city = self.resolve_city(city, state if resolved_state else None)
+        if resolved_state is None and resolved_city is not None:
+            resolved_state = {**self.resolve_state(resolved_city["state"]), "match": "inferred"}
+
+        place = {
+            "city": resolved_city["name"] if resolved_city else " ".join((city or "").split()),
+            "state": resolved_state["name"] if resolved_state else " ".join((state or "").split()),
+            "city_match": resolved_city["match"] if resolved_city else None,
+            "state_match": resolved_state["match"] if resolved_state else None,
+            "coordinates": None
+        }
+
+        source = resolved_city or resolved_state
+        if source is not None and source["lat"] is not None:
+            place["coordinates"] = {
+                "lat": source["lat"],
+                "lon": source["lon"],
+                "resolved_from": "city" if resolved_city else "state"
+            }
+        return place
+
+    def autocomplete(self, query: str, state: Optional[str] = None, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Place suggestions for a partial name
+
+        States and cities whose name or alias starts with the query come
+        first (canonical-name matches before alias matches), then fuzzy
+        matches for misspellings until limit is reached. With a state,
+        only that state's cities are suggested.
+        """
+
+        key = normalize_name(query)
+        limit = max(1, min(int(limit), self.MAX_LIMIT))
+        if not key:
+            return []
+
+        allowed = None
+        if state:
+            resolved_state = self.resolve_state(state)
+            allowed = set(self.cities_by_state.get(resolved_state["row"], ())) if resolved_state else set()
+
+        prefixed, aliased = [], []
+        if allowed is None:
+            for candidate in self.state_index.prefix(key):
+                for target, is_alias in self.state_index.exact[candidate]:
+                    # Codes are only shown for an exact code match
+                    if is_alias and len(candidate) <= 2 and candidate != key:
+                        continue
+                    (aliased if is_alias else prefixed).append(("state", target))
+        for candidate in self.city_index.prefix(key):
+            for target, is_alias in self.city_index.exact[candidate]:
+                if allowed is None or target in allowed:
+                    (aliased if is_alias else prefixed).append(("city", target))
+
+        ranked = prefixed + aliased
+        if len(ranked) < limit and len(key) >= self.MIN_FUZZY_LENGTH - 1:
+            for _, candidate in self.city_index.fuzzy(key, self.MIN_FUZZY_SCORE):
+                for target, _ in self.city_index.exact[candidate]:
+                    if allowed is None or target in allowed:
+                        ranked.append(("city", target))
+
+        suggestions, seen = [], set()
+        for kind, target in ranked:
+            if (kind, target) in seen:
+                continue
+            seen.add((kind, target))
+            record = self.states[target] if kind == "state" else self.cities[target]
+            suggestions.append({
+                "name": record["name"],
+                "state": record["name"] if kind == "state" else record["state"],
+                "type": kind,
+                "lat": record["lat"],
+                "lon": record["lon"]
+            })
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+    def _state_result(self, target: int, match: str, score: float) -> Dict[str, Any]:
+        record = self.states[target]
+        return {**record, "row": target, "match": match, "score": score}
+
+    def _city_result(self, target: int, match: str, score: float) -> Dict[str, Any]:
+        return {**self.cities[target], "match": match, "score": score}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "states": len(self.states),
+            "cities": len(self.cities),
+            "names_indexed": len(self.state_index.exact) + len(self.city_index.exact)
+        }
+
+
+def _split_aliases(value: Optional[str]) -> List[str]:
+    return [alias.strip() for alias in (value or "").split("|") if alias.strip()]
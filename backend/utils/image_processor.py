@@ -1,8 +1,12 @@
 from PIL import Image
 import base64
 import io
+import numpy as np
 from fastapi import UploadFile, HTTPException
 from typing import Tuple
+from utils.vegetation_index import VegetationIndexAnalyzer
+from utils.image_similarity import compute_dhash
+from utils.image_quality import ImageQualityGate
 
 class ImageProcessor:
     """Handles image upload, validation, and processing"""
@@ -17,6 +21,9 @@ class ImageProcessor:
     # Max file size (10MB)
     MAX_FILE_SIZE = 10 * 1024 * 1024
     
+    # Longest side of the downsampled copy used for local pixel analysis
+    ANALYSIS_MAX_SIDE = 256
+    
     @staticmethod
     async def validate_image(file: UploadFile) -> None:
         """Validate uploaded file is an image"""
@@ -75,6 +82,12 @@ class ImageProcessor:
         # Get final dimensions
         final_width, final_height = image.size
         
+        # Local pixel analysis on a small copy (milliseconds, no API call)
+        pixels = ImageProcessor.get_analysis_pixels(image)
+        vegetation_indices = VegetationIndexAnalyzer.analyze(pixels)
+        perceptual_hash = compute_dhash(image)
+        preflight = ImageQualityGate.assess(pixels)
+        
         # Convert to base64
         buffered = io.BytesIO()
         image.save(buffered, format="JPEG", quality=85, optimize=True)
@@ -84,16 +97,37 @@ class ImageProcessor:
         metadata = {
             "original_dimensions": f"{original_width}x{original_height}",
             "processed_dimensions": f"{final_width}x{final_height}",
+            "processed_width": final_width,
+            "processed_height": final_height,
             "format": "JPEG",
-            "was_resized": (original_width != final_width or original_height != final_height)
+            "was_resized": (original_width != final_width or original_height != final_height),
+            "perceptual_hash": perceptual_hash,
+            "preflight": preflight,
+            "vegetation_indices": vegetation_indices
         }
         
         return img_base64, metadata
     
+    @staticmethod
+    def get_analysis_pixels(image: Image.Image) -> np.ndarray:
+        """Downsample an RGB image to a small uint8 array for local analysis"""
+        
+        small = image.copy()
+        small.thumbnail(
+            (ImageProcessor.ANALYSIS_MAX_SIDE, ImageProcessor.ANALYSIS_MAX_SIDE),
+            Image.Resampling.BILINEAR
+        )
+        return np.asarray(small, dtype=np.uint8)
+    
     @staticmethod
     def estimate_image_quality(metadata: dict) -> str:
         """Estimate if image quality is good enough for analysis"""
         
+        # Pre-flight problems (blur, exposure, flat colour) outweigh resolution
+        preflight = metadata.get("preflight")
+        if preflight and preflight["verdict"] != "ok" and preflight["issues"]:
+            return f"poor - {preflight['issues'][0]}"
+        
         width, height = map(int, metadata["processed_dimensions"].split('x'))
         total_pixels = width * height
         
@@ -0,0 +1,157 @@
+import time
+import numpy as np
+from typing import Dict, Any, List
+
+
+class ImageQualityGate:
+    """
+    Fast local pre-flight check run before paying for a vision call
+
+    Works on the small analysis copy of the image and measures:
+    - Sharpness: variance of the Laplacian of the grayscale image
+    - Exposure: mean brightness and share of crushed/blown-out pixels
+    - Colour entropy: Shannon entropy of a 4096-bin colour histogram
+      (flat images, screenshots and documents score very low)
+
+    Unusable images are rejected with an actionable message; borderline
+    ones are flagged and analyzed with reduced confidence.
+    """
+
+    # Laplacian variance (on the downsampled copy)
+    BLUR_REJECT_VARIANCE = 5.0
+    BLUR_GOOD_VARIANCE = 120.0
+
+    # Brightness (0-255)
+    DARK_PIXEL_LEVEL = 20
+    BRIGHT_PIXEL_LEVEL = 235
+    REJECT_MEAN_DARK = 20.0
+    REJECT_MEAN_BRIGHT = 240.0
+    CLIPPED_FRACTION_FLAG = 0.4
+
+    # Colour entropy in bits (max 12 for 16 levels per channel)
+    ENTROPY_REJECT = 1.5
+    ENTROPY_GOOD = 5.0
+
+    # Overall score below which an image is flagged
+    FLAG_SCORE = 0.5
+
+    # Weights for the combined 0-1 score
+    WEIGHTS = {"sharpness": 0.4, "exposure": 0.35, "colour": 0.25}
+
+    # Cost of one vision call (see README cost table)
+    VISION_CALL_COST_INR = 8.0
+
+    def __init__(self):
+        self.stats = {"checked": 0, "passed": 0, "flagged": 0, "rejected": 0}
+
+    @staticmethod
+    def assess(pixels: np.ndarray) -> Dict[str, Any]:
+        """
+        Score an RGB image array for analysis suitability
+
+        Args:
+            pixels: Array of shape (height, width, 3) with values 0-255
+
+        Returns:
+            Dict with metrics, 0-1 score, verdict (ok/flag/reject) and issues
+        """
+
+        start = time.perf_counter()
+        gate = ImageQualityGate
+        rgb = np.asarray(pixels, dtype=np.uint8)
+
+        # Sharpness: 4-neighbour Laplacian on luma
+        gray = rgb.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        if gray.shape[0] >= 3 and gray.shape[1] >= 3:
+            laplacian = (
+                4.0 * gray[1:-1, 1:-1]
+                - gray[:-2, 1:-1] - gray[2:, 1:-1]
+                - gray[1:-1, :-2] - gray[1:-1, 2:]
+            )
+            blur_variance = float(laplacian.var())
+        else:
+            blur_variance = 0.0
+
+        # Exposure
+        mean_brightness = float(gray.mean())
+        dark_fraction = float((gray < gate.DARK_PIXEL_LEVEL).mean())
+        bright_fraction = float((gray > gate.BRIGHT_PIXEL_LEVEL).mean())
+
+        # Colour entropy over 16 levels per channel (4096 bins)
+        quantized = (rgb >> 4).reshape(-1, 3).astype(np.int32)
+        bins = (quantized[:, 0] << 8) | (quantized[:, 1] << 4) | quantized[:, 2]
+        counts = np.bincount(bins, minlength=4096)
+        probabilities = counts[counts > 0] / bins.size
+        colour_entropy = max(0.0, float(-(probabilities * np.log2(probabilities)).sum()))
+
+        # Component scores (0-1)
+        sharpness_score = min(1.0, blur_variance / gate.BLUR_GOOD_VARIANCE)
+        clipped = dark_fraction + bright_fraction
+        exposure_score = 1.0 - min(1.0, max(0.0, clipped - 0.1) / 0.5)
+        exposure_score *= 1.0 - min(1.0, abs(mean_brightness - 128.0) / 128.0) ** 2
+        colour_score = min(1.0, max(0.0, (colour_entropy - gate.ENTROPY_REJECT) / (gate.ENTROPY_GOOD - gate.ENTROPY_REJECT)))
+
+        score = (
+            gate.WEIGHTS["sharpness"] * sharpness_score
+            + gate.WEIGHTS["exposure"] * exposure_score
+            + gate.WEIGHTS["colour"] * colour_score
+        )
+
+        rejections: List[str] = []
+        warnings: List[str] = []
+
+        if mean_brightness < gate.REJECT_MEAN_DARK:
+            rejections.append("Image is almost completely dark - retake the photo in daylight")
+        elif mean_brightness > gate.REJECT_MEAN_BRIGHT:
+            rejections.append("Image is overexposed (washed out) - avoid pointing the camera at the sun")
+        elif clipped > gate.CLIPPED_FRACTION_FLAG:
+            warnings.append("Large areas are too dark or too bright - shoot with the sun behind you")
+
+        # Blank dark/white frames have no edges either; one message is enough
+        if not rejections:
+            if blur_variance < gate.BLUR_REJECT_VARIANCE:
+                rejections.append("Image is too blurry - hold the camera steady and tap to focus on the land")
+            elif sharpness_score < 0.5:
+                warnings.append("Image is slightly blurry - a sharper photo will improve accuracy")
+
+        if colour_entropy < gate.ENTROPY_REJECT:
+            rejections.append("Image has almost no colour detail - upload an outdoor photo of the land, not a screenshot or document")
+        elif colour_score < 0.5:
+            warnings.append("Image has little colour variation - make sure the land fills most of the frame")
+
+        if rejections:
+            verdict = "reject"
+        elif score < gate.FLAG_SCORE or warnings:
+            verdict = "flag"
+        else:
+            verdict = "ok"
+
+        return {
+            "verdict": verdict,
+            "score": round(score, 3),
+            "issues": rejections + warnings,
+            "metrics": {
+                "blur_variance": round(blur_variance, 1),
+                "mean_brightness": round(mean_brightness, 1),
+                "dark_fraction": round(dark_fraction, 3),
+                "bright_fraction": round(bright_fraction, 3),
+                "colour_entropy_bits": round(colour_entropy, 2)
+            },
+            "compute_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    def record(self, assessment: Dict[str, Any]) -> None:
+        """Count a pre-flight result"""
+
+        self.stats["checked"] += 1
+        key = {"ok": "passed", "flag": "flagged", "reject": "rejected"}[assessment["verdict"]]
+        self.stats[key] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters including vision calls (and cost) saved by rejections"""
+
+        return {
+            **self.stats,
+            "vision_calls_saved": self.stats["rejected"],
+            "estimated_cost_saved_inr": self.stats["rejected"] * self.VISION_CALL_COST_INR
+        }
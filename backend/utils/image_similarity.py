@@ -0,0 +1,277 @@
+import os
+import json
+import threading
+import time
+from itertools import combinations
+from PIL import Image
+from typing import Dict, Any, List, Optional, Tuple
+
+
+def compute_dhash(image: Image.Image, hash_size: int = 8) -> str:
+    """
+    Compute a difference hash (dHash) of an image
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale thumbnail
+    and each bit records whether a pixel is brighter than its right neighbour.
+    Small crops, angle and exposure changes flip only a few bits.
+
+    Returns:
+        Hash as a hex string (16 chars for the default 64-bit hash)
+    """
+
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count("1")
+
+
+class ImageSimilarityIndex:
+    """
+    In-memory index of perceptual hashes of previously analyzed images
+
+    Uses multi-index hashing: each 64-bit hash is split into 4 chunks of
+    16 bits, and each chunk gets its own hash table. If two hashes are within
+    distance r, at least one chunk differs in at most r // 4 bits, so a query
+    only probes the few chunk values within that distance instead of scanning
+    every entry. Lookups stay sub-millisecond at hundreds of thousands of images.
+
+    Only confident vision results are indexed: a low-confidence or
+    unparsed ("unknown") result is never reused, so a re-upload of that
+    photo gets a fresh vision call. Beyond max_entries the oldest entries
+    are evicted (EVICT_FRACTION at a time, then the chunk tables are
+    rebuilt), and with a persist path the index is due for a save every
+    SAVE_EVERY additions.
+    """
+
+    HASH_BITS = 64
+    CHUNKS = 4
+    CHUNK_BITS = HASH_BITS // CHUNKS
+    CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+    # Report a match up to this distance (likely the same plot)
+    MATCH_DISTANCE = 7
+
+    # Reuse the prior vision result outright up to this distance
+    REUSE_DISTANCE = 3
+
+    MAX_ENTRIES = 100_000
+    EVICT_FRACTION = 0.1
+    SAVE_EVERY = 100
+
+    # Vision fields worth keeping for reuse (per-upload fields are recomputed)
+    STORED_FIELDS = (
+        "vegetation_type", "vegetation_density", "density_percentage",
+        "estimated_tree_count", "land_condition", "visible_features",
+        "confidence", "reasoning"
+    )
+
+    def __init__(self, persist_path: Optional[str] = None, max_entries: int = MAX_ENTRIES):
+        self.persist_path = persist_path
+        self.max_entries = max_entries
+        self._unsaved = 0
+
+        self._hashes: List[int] = []
+        self._analysis_ids: List[str] = []
+        self._vision_results: List[Dict[str, Any]] = []
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(self.CHUNKS)]
+
+        # Bit masks with up to N bits set inside one chunk, built lazily
+        self._probe_masks: Dict[int, List[int]] = {}
+
+        self.stats = {"lookups": 0, "matches": 0, "reused": 0, "not_indexed_low_confidence": 0, "evictions": 0}
+
+        if persist_path and os.path.exists(persist_path):
+            self.load(persist_path)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _chunks(self, value: int) -> List[int]:
+        return [
+            (value >> (i * self.CHUNK_BITS)) & self.CHUNK_MASK
+            for i in range(self.CHUNKS)
+        ]
+
+    def _masks_within(self, max_flips: int) -> List[int]:
+        """All chunk-sized masks with at most max_flips bits set"""
+
+        if max_flips not in self._probe_masks:
+            masks = []
+            for flips in range(max_flips + 1):
+                for bits in combinations(range(self.CHUNK_BITS), flips):
+                    mask = 0
+                    for bit in bits:
+                        mask |= 1 << bit
+                    masks.append(mask)
+            self._probe_masks[max_flips] = masks
+        return self._probe_masks[max_flips]
+
+    @staticmethod
+    def is_reusable(vision_result: Dict[str, Any]) -> bool:
+        """Whether a vision result is good enough to stand in for a new vision call"""
+        return vision_result.get("confidence") != "low" and vision_result.get("vegetation_type") != "unknown"
+
+    def add(self, hash_hex: str, analysis_id: str, vision_result: Dict[str, Any]) -> bool:
+        """Add an analyzed image to the index (False if its result is not reusable)"""
+
+        if not self.is_reusable(vision_result):
+            self.stats["not_indexed_low_confidence"] += 1
+            return False
+
+        value = int(hash_hex, 16)
+        entry_index = len(self._hashes)
+
+        self._hashes.append(value)
+        self._analysis_ids.append(analysis_id)
+        self._vision_results.append(
+            {key: vision_result.get(key) for key in self.STORED_FIELDS}
+        )
+
+        for table, chunk in zip(self._tables, self._chunks(value)):
+            table.setdefault(chunk, []).append(entry_index)
+
+        self._unsaved += 1
+        if len(self._hashes) > self.max_entries:
+            self._evict_oldest()
+        return True
+
+    def _evict_oldest(self) -> None:
+        """Drop the oldest EVICT_FRACTION of entries and rebuild the chunk tables"""
+
+        drop = len(self._hashes) - self.max_entries + int(self.max_entries * self.EVICT_FRACTION)
+        self._hashes = self._hashes[drop:]
+        self._analysis_ids = self._analysis_ids[drop:]
+        self._vision_results = self._vision_results[drop:]
+        self.stats["evictions"] += drop
+
+        self._tables = [{} for _ in range(self.CHUNKS)]
+        for entry_index, value in enumerate(self._hashes):
+            for table, chunk in zip(self._tables, self._chunks(value)):
+                table.setdefault(chunk, []).append(entry_index)
+
+    def reuse(self, match: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Vision result of a match close enough to reuse outright, or None
+
+        Counted in stats["reused"].
+        """
+
+        if match is None or match["distance"] > self.REUSE_DISTANCE or not self.is_reusable(match["vision_result"]):
+            return None
+        self.stats["reused"] += 1
+        return match["vision_result"]
+
+    def find_nearest(
+        self,
+        hash_hex: str,
+        max_distance: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find the closest previously analyzed image within max_distance
+
+        Returns:
+            Dict with analysis_id, distance and stored vision result, or None
+        """
+
+        if max_distance is None:
+            max_distance = self.MATCH_DISTANCE
+
+        start = time.perf_counter()
+        self.stats["lookups"] += 1
+
+        query = int(hash_hex, 16)
+        masks = self._masks_within(max_distance // self.CHUNKS)
+
+        best_index, best_distance = None, max_distance + 1
+        seen = set()
+        for table, chunk in zip(self._tables, self._chunks(query)):
+            for mask in masks:
+                for entry_index in table.get(chunk ^ mask, ()):
+                    if entry_index in seen:
+                        continue
+                    seen.add(entry_index)
+                    distance = hamming_distance(query, self._hashes[entry_index])
+                    if distance < best_distance:
+                        best_index, best_distance = entry_index, distance
+
+        if best_index is None:
+            return None
+
+        self.stats["matches"] += 1
+        return {
+            "analysis_id": self._analysis_ids[best_index],
+            "distance": best_distance,
+            "vision_result": dict(self._vision_results[best_index]),
+            "lookup_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
+
+    def save_due(self) -> bool:
+        """Whether SAVE_EVERY entries were added since the last snapshot"""
+        return bool(self.persist_path) and self._unsaved >= self.SAVE_EVERY
+
+    def snapshot(self) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Current entries for save() (cheap: references only)
+
+        Taken on the event loop, so save() can then run in a worker thread
+        while new entries are added.
+        """
+
+        self._unsaved = 0
+        return list(zip(self._hashes, self._analysis_ids, self._vision_results))
+
+    def save(self, path: Optional[str] = None, entries: Optional[List[Tuple[int, str, Dict[str, Any]]]] = None) -> None:
+        """Persist the index (or a snapshot of it) to a JSON file (atomic replace)"""
+
+        path = path or self.persist_path
+        if not path:
+            return
+        if entries is None:
+            entries = self.snapshot()
+
+        data = {
+            "version": 1,
+            "hash_bits": self.HASH_BITS,
+            "entries": [
+                [f"{value:016x}", analysis_id, vision_result]
+                for value, analysis_id, vision_result in entries
+            ]
+        }
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> None:
+        """Load entries from a JSON file written by save()"""
+
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[SIMILARITY] Could not load index from {path}: {str(e)}")
+            return
+
+        for hash_hex, analysis_id, vision_result in data.get("entries", []):
+            self.add(hash_hex, analysis_id, vision_result)
+        self._unsaved = 0
+
+        print(f"[SIMILARITY] Loaded {len(self)} image hashes from {path}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size and lookup counters"""
+        return {"entries": len(self), "max_entries": self.max_entries, **self.stats}
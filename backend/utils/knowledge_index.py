@@ -0,0 +1,184 @@
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+class KnowledgeIndex:
+    """
+    BM25 retrieval over the bundled carbon-program knowledge base
+
+    The corpus is a directory of markdown files (data/knowledge_base);
+    each "## " section is one passage, indexed together with its document
+    title and heading. The inverted index is compiled into flat numpy
+    arrays (CSR layout): for term t, postings
+    doc_ids[offsets[t]:offsets[t + 1]] carry precomputed BM25 weights, so
+    a query is a handful of slice additions and an argpartition - well
+    under a millisecond for the few hundred passages bundled.
+
+    rebuild() re-reads the directory, so the corpus can be edited without
+    a code change. The new index is swapped in with a single assignment,
+    so a rebuild can run in a worker thread while queries are served.
+    """
+
+    DEFAULT_DIR = os.path.join(DATA_DIR, "knowledge_base")
+
+    K1 = 1.2
+    B = 0.75
+    TOP_K = 3
+    # Passages scoring below this are not relevant enough to quote
+    MIN_SCORE = 2.0
+    # A passage scoring this high answers the question without a web search
+    CONFIDENT_SCORE = 4.0
+
+    STOPWORDS = frozenset(
+        "a an and are as at be by can do does for from has have how i if in "
+        "into is it its me my of on or our so that the their there these this "
+        "to was we what whats when where which who why will with you your".split()
+    )
+
+    _TOKEN = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or self.DEFAULT_DIR)
+        self.stats = {"queries": 0, "answered": 0, "query_ms_total": 0.0}
+        self.rebuild()
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        """Lowercased terms without stopwords, plural "s" stripped"""
+
+        terms = []
+        for term in cls._TOKEN.findall(text.lower()):
+            if term in cls.STOPWORDS:
+                continue
+            if len(term) > 4 and term.endswith("s") and not term.endswith("ss"):
+                term = term[:-1]
+            terms.append(term)
+        return terms
+
+    @staticmethod
+    def _split_markdown(text: str, source: str) -> List[Dict[str, str]]:
+        """One passage per "## " section (text before the first one is its own passage)"""
+
+        title = source
+        passages = []
+        heading = ""
+        lines: List[str] = []
+
+        def flush():
+            body = "\n".join(lines).strip()
+            if body:
+                passages.append({"source": source, "title": title, "heading": heading, "text": body})
+
+        for line in text.splitlines():
+            if line.startswith("# "):
+                title = line[2:].strip()
+            elif line.startswith("## "):
+                flush()
+                heading = line[3:].strip()
+                lines = []
+            else:
+                lines.append(line)
+        flush()
+        return passages
+
+    def rebuild(self) -> Dict[str, Any]:
+        """(Re)build the index from every *.md file in the directory"""
+
+        started = time.perf_counter()
+        passages = []
+        for path in sorted(self.directory.glob("*.md")):
+            passages.extend(self._split_markdown(path.read_text(encoding="utf-8"), path.stem))
+
+        vocabulary: Dict[str, int] = {}
+        postings: List[Dict[int, int]] = []
+        lengths = np.zeros(len(passages), dtype=np.float32)
+
+        for doc_id, passage in enumerate(passages):
+            terms = self.tokenize(f"{passage['title']} {passage['heading']} {passage['text']}")
+            lengths[doc_id] = len(terms)
+            for term in terms:
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                if term_id == len(postings):
+                    postings.append({})
+                postings[term_id][doc_id] = postings[term_id].get(doc_id, 0) + 1
+
+        n_docs = len(passages)
+        avg_length = float(lengths.mean()) if n_docs else 0.0
+        offsets = np.zeros(len(postings) + 1, dtype=np.int32)
+        offsets[1:] = np.cumsum([len(p) for p in postings])
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        weights = np.empty(offsets[-1], dtype=np.float32)
+
+        for term_id, docs in enumerate(postings):
+            start, end = offsets[term_id], offsets[term_id + 1]
+            ids = np.fromiter(docs.keys(), dtype=np.int32, count=len(docs))
+            tf = np.fromiter(docs.values(), dtype=np.float32, count=len(docs))
+            idf = np.log(1.0 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.K1 * (1.0 - self.B + self.B * lengths[ids] / avg_length)
+            doc_ids[start:end] = ids
+            weights[start:end] = idf * tf * (self.K1 + 1.0) / (tf + norm)
+
+        self._index = (passages, vocabulary, offsets, doc_ids, weights)
+        self.build_ms = (time.perf_counter() - started) * 1000
+
+        print(f"[KNOWLEDGE] Indexed {n_docs} passages, {len(vocabulary)} terms from {self.directory} in {self.build_ms:.1f} ms")
+        return self.get_stats()
+
+    def search(self, query: str, top_k: int = TOP_K, min_score: float = MIN_SCORE) -> List[Dict[str, Any]]:
+        """Best passages for a query, highest score first"""
+
+        started = time.perf_counter()
+        self.stats["queries"] += 1
+        passages, vocabulary, offsets, doc_ids, weights = self._index
+
+        scores = np.zeros(len(passages), dtype=np.float32)
+        for term in set(self.tokenize(query)):
+            term_id = vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = offsets[term_id], offsets[term_id + 1]
+            scores[doc_ids[start:end]] += weights[start:end]
+
+        results = []
+        if len(scores):
+            k = min(top_k, len(scores))
+            best = np.argpartition(-scores, k - 1)[:k]
+            for doc_id in best[np.argsort(-scores[best])]:
+                if scores[doc_id] < min_score:
+                    break
+                results.append({**passages[doc_id], "score": round(float(scores[doc_id]), 3)})
+
+        if results:
+            self.stats["answered"] += 1
+        self.stats["query_ms_total"] += (time.perf_counter() - started) * 1000
+        return results
+
+    @staticmethod
+    def format_passages(passages: List[Dict[str, Any]]) -> str:
+        """Passages as prompt text, each labelled with its source"""
+
+        return "\n\n".join(
+            f"[{p['title']} - {p['heading']}]\n{p['text']}" if p["heading"] else f"[{p['title']}]\n{p['text']}"
+            for p in passages
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        queries = self.stats["queries"]
+        passages, vocabulary, offsets, doc_ids, weights = self._index
+        return {
+            "directory": str(self.directory),
+            "passages": len(passages),
+            "terms": len(vocabulary),
+            "postings": int(len(doc_ids)),
+            "index_bytes": int(offsets.nbytes + doc_ids.nbytes + weights.nbytes),
+            "build_ms": round(self.build_ms, 1),
+            "queries": queries,
+            "answered": self.stats["answered"],
+            "avg_query_ms": round(self.stats["query_ms_total"] / queries, 4) if queries else None
+        }
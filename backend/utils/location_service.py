@@ -1,11 +1,16 @@
 import os
 import httpx
-from typing import Dict, Any, Optional
+import numpy as np
+from typing import Dict, Any, Optional, Sequence
+from utils.rate_tables import CategoryTable
+from utils.ttl_cache import AsyncTTLCache
+from utils.climate_normals import ClimateNormals
+from utils.gazetteer import Gazetteer
 
 class LocationService:
     """
     Handle location-based carbon calculation adjustments
-    Uses OpenWeatherMap API for climate data
+    Uses bundled climate normals (default) or OpenWeatherMap live weather
     """
     
     # Indian states with baseline climate multipliers
@@ -58,18 +63,75 @@ class LocationService:
         "punjab": {"multiplier": 1.1, "zone": "subtropical_semiarid"}
     }
     
+    # Weather cache: current conditions change slowly relative to a field
+    # campaign, and failed lookups are retried after a short back-off
+    WEATHER_CACHE_TTL_SECONDS = 900
+    WEATHER_NEGATIVE_TTL_SECONDS = 60
+    WEATHER_CACHE_SIZE = 2048
+    
+    # Adjustments from long-term normals as (value, factor) breakpoints,
+    # linearly interpolated and held flat beyond the ends
+    NORMALS_TEMPERATURE_ADJ = ((5.0, 0.8), (15.0, 0.9), (20.0, 1.0), (28.0, 1.0), (32.0, 0.93))
+    NORMALS_HUMIDITY_ADJ = ((40.0, 0.95), (55.0, 1.0), (70.0, 1.03), (85.0, 1.05))
+    NORMALS_RAINFALL_ADJ = ((250.0, 0.9), (500.0, 0.95), (800.0, 1.0), (1500.0, 1.0), (2500.0, 1.05))
+    
     def __init__(self):
         self.api_key = os.getenv("OPENWEATHER_API_KEY")
         self.base_url = "http://api.openweathermap.org/data/2.5/weather"
+        # Live weather is opt-in; the multiplier uses climate normals otherwise
+        self.use_live_weather = os.getenv("LIVE_WEATHER", "false").lower() in ("1", "true", "yes")
+        self.climate_normals = ClimateNormals()
+        self.gazetteer = Gazetteer()
+        self.weather_cache = AsyncTTLCache(
+            max_entries=self.WEATHER_CACHE_SIZE,
+            ttl=float(os.getenv("WEATHER_CACHE_TTL_SECONDS", self.WEATHER_CACHE_TTL_SECONDS)),
+            negative_ttl=self.WEATHER_NEGATIVE_TTL_SECONDS
+        )
+        # Set by WeatherWarmer, which keeps busy locations' weather fresh
+        self.weather_warmer = None
+        
+        # Regional baselines compiled into code-indexed tables
+        self.baseline_table = CategoryTable(
+            {state: info["multiplier"] for state, info in self.REGIONAL_BASELINE.items()},
+            default_value=1.0
+        )
+        self.baseline_zones = [
+            self.REGIONAL_BASELINE[state]["zone"] if state in self.REGIONAL_BASELINE else "unknown"
+            for state in self.baseline_table.names
+        ]
+    
+    def resolve_location(self, city: str, state: str) -> Dict[str, Any]:
+        """
+        Canonical city/state names and approximate coordinates (offline)
+        
+        Accepts codes, former names and misspellings ("UP", "Orissa",
+        "Tamilnadu", "Bangalore"); see Gazetteer.resolve.
+        """
+        return self.gazetteer.resolve(city, state)
+    
+    def resolve_coordinates(self, city: str, state: str) -> Optional[Dict[str, Any]]:
+        """Approximate coordinates for a city/state (city first, then state)"""
+        return self.resolve_location(city, state)["coordinates"]
     
     def get_baseline_multiplier(self, state: str) -> Dict[str, Any]:
-        """Get baseline climate multiplier for a state"""
-        state_lower = state.lower().strip()
-        baseline = self.REGIONAL_BASELINE.get(state_lower, {
-            "multiplier": 1.0,
-            "zone": "unknown"
-        })
-        return baseline
+        """Get baseline climate multiplier for a state (name, code or alias)"""
+        resolved = self.gazetteer.resolve_state(state)
+        name = resolved["name"] if resolved else state
+        code = self.baseline_table.code(name.lower().strip())
+        return {
+            "state": name,
+            "multiplier": self.baseline_table.value_list[code],
+            "zone": self.baseline_zones[code]
+        }
+    
+    def baseline_multipliers(self, states: Sequence[str]) -> np.ndarray:
+        """Baseline climate multipliers for an array of (lowercase) state names or codes"""
+        return self.baseline_table.values[self.baseline_table.encode(states)]
+    
+    def normalize_location(self, city: str, state: str) -> tuple:
+        """Cache key for a city/state pair (canonical names, so aliases share an entry)"""
+        place = self.resolve_location(city, state)
+        return (place["city"].lower(), place["state"].lower())
     
     async def get_weather_data(self, city: str, state: str) -> Optional[Dict[str, Any]]:
         """
@@ -79,20 +141,38 @@ class LocationService:
         - Temperature
         - Humidity
         - Rainfall (if available)
+        
+        Results are cached per city/state; concurrent requests for the
+        same place share one API call. Busy places are refreshed in the
+        background before they expire (WeatherWarmer).
         """
         
         if not self.api_key:
             return None
         
-        # Construct location query (city, state, India)
-        location = f"{city},{state},IN"
+        place = self.resolve_location(city, state)
+        key = (place["city"].lower(), place["state"].lower())
+        if self.weather_warmer is not None:
+            self.weather_warmer.record(key, place)
+        return await self.weather_cache.get_or_load(key, lambda: self._fetch_weather_data(place))
+    
+    async def _fetch_weather_data(self, place: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Call OpenWeatherMap (None on any failure)"""
+        
+        # Query by gazetteer coordinates when the city is known, so the
+        # API does not have to geocode free-form text
+        coordinates = place["coordinates"]
+        if coordinates and coordinates["resolved_from"] == "city":
+            query = {"lat": coordinates["lat"], "lon": coordinates["lon"]}
+        else:
+            query = {"q": f"{place['city']},{place['state']},IN"}
         
         try:
             async with httpx.AsyncClient(timeout=10.0) as client:
                 response = await client.get(
                     self.base_url,
                     params={
-                        "q": location,
+                        **query,
                         "appid": self.api_key,
                         "units": "metric"  # Celsius
                     }
@@ -117,23 +197,32 @@ class LocationService:
             print(f"Weather API error: {str(e)}")
             return None
     
+    @staticmethod
+    def _interpolate_adjustment(value: float, breakpoints: tuple) -> float:
+        xs, ys = zip(*breakpoints)
+        return round(float(np.interp(value, xs, ys)), 3)
+    
     def calculate_climate_multiplier(
         self, 
         baseline_multiplier: float,
-        weather_data: Optional[Dict[str, Any]]
+        weather_data: Optional[Dict[str, Any]],
+        climate_normals: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Calculate final climate multiplier based on:
         1. Regional baseline
-        2. Real-time weather adjustments
+        2. Real-time weather adjustments (if live weather is enabled), or
+           long-term climate normals for the location
         
         Returns multiplier + explanation
         """
         
         final_multiplier = baseline_multiplier
         adjustments = []
+        source = "regional_baseline"
         
         if weather_data:
+            source = "live_weather"
             temp = weather_data.get("temperature", 25)
             humidity = weather_data.get("humidity", 60)
             
@@ -166,14 +255,31 @@ class LocationService:
             
             # Apply adjustments
             final_multiplier = baseline_multiplier * temp_adj * humidity_adj
+        
+        elif climate_normals:
+            source = "climate_normals"
+            temp = climate_normals["mean_temperature_c"]
+            humidity = climate_normals["mean_humidity_pct"]
+            rainfall = climate_normals["annual_rainfall_mm"]
+            
+            temp_adj = self._interpolate_adjustment(temp, self.NORMALS_TEMPERATURE_ADJ)
+            humidity_adj = self._interpolate_adjustment(humidity, self.NORMALS_HUMIDITY_ADJ)
+            rainfall_adj = self._interpolate_adjustment(rainfall, self.NORMALS_RAINFALL_ADJ)
+            
+            adjustments.append(f"Mean annual temperature {temp}°C (long-term normal): {temp_adj}x")
+            adjustments.append(f"Mean relative humidity {humidity}% (long-term normal): {humidity_adj}x")
+            adjustments.append(f"Annual rainfall {rainfall:.0f} mm (long-term normal): {rainfall_adj}x")
+            
+            final_multiplier = baseline_multiplier * temp_adj * humidity_adj * rainfall_adj
             
         else:
-            adjustments.append("Using regional baseline (weather data unavailable)")
+            adjustments.append("Using regional baseline (climate data unavailable for this location)")
         
         return {
             "multiplier": round(final_multiplier, 2),
             "baseline": baseline_multiplier,
             "adjustments": adjustments,
+            "source": source,
             "weather_data_used": weather_data is not None
         }
     
@@ -193,26 +299,42 @@ class LocationService:
             Complete location context + climate multiplier
         """
         
+        # Canonical names and coordinates (local gazetteer, no network)
+        place = self.resolve_location(city, state)
+        city, state = place["city"], place["state"]
+        coordinates = place["coordinates"]
+        
         # Get baseline
         baseline = self.get_baseline_multiplier(state)
         
-        # Get weather data
-        weather_data = await self.get_weather_data(city, state)
+        # Long-term normals for the location (local, no network)
+        climate_normals = None
+        if coordinates:
+            climate_normals = self.climate_normals.lookup(coordinates["lat"], coordinates["lon"])
+        
+        # Get weather data (optional)
+        weather_data = None
+        if self.use_live_weather:
+            weather_data = await self.get_weather_data(city, state)
         
         # Calculate final multiplier
         climate_result = self.calculate_climate_multiplier(
             baseline["multiplier"],
-            weather_data
+            weather_data,
+            climate_normals
         )
         
         return {
             "location": {
                 "city": city,
                 "state": state,
-                "climate_zone": baseline["zone"]
+                "climate_zone": baseline["zone"],
+                "coordinates": coordinates
             },
             "climate_multiplier": climate_result["multiplier"],
             "baseline_multiplier": baseline["multiplier"],
+            "climate_source": climate_result["source"],
+            "climate_normals": climate_normals,
             "weather_data": weather_data,
             "adjustments": climate_result["adjustments"],
             "explanation": self._generate_explanation(
@@ -0,0 +1,328 @@
+import json
+import math
+import time
+import numpy as np
+from typing import Dict, Any, Iterable, List, Optional
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with bounded relative error (DDSketch-style)
+
+    Values are counted in logarithmic buckets of width gamma, so any
+    quantile is returned within relative_accuracy of the true value while
+    memory depends only on the value range (~1,400 buckets from 0.001 to
+    1e9 at 1%), never on how many values were added.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add_many(self, values: np.ndarray) -> None:
+        """Add an array of non-negative values"""
+
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+
+        self.count += values.size
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        positive = values[values > 0]
+        self.zero_count += values.size - positive.size
+        if positive.size:
+            keys = np.ceil(np.log(positive) / self.log_gamma).astype(np.int64)
+            unique_keys, counts = np.unique(keys, return_counts=True)
+            for key, count in zip(unique_keys.tolist(), counts.tolist()):
+                self.buckets[key] = self.buckets.get(key, 0) + count
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Fold another sketch (same accuracy) into this one"""
+
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0-1), or None if the sketch is empty"""
+
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        cumulative = self.zero_count
+        for key in sorted(self.buckets):
+            cumulative += self.buckets[key]
+            if cumulative > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+
+class PortfolioAggregator:
+    """
+    Streaming portfolio totals over many carbon estimates
+
+    Accepts /analyze responses (or calculate_complete_analysis results) one
+    at a time, buffers a fixed-size chunk of the numbers it needs and folds
+    each chunk into running sums, per-group sums and quantile sketches with
+    NumPy. Memory stays constant however many parcels are streamed.
+    """
+
+    CHUNK_SIZE = 8192
+
+    # Group-by dimensions
+    DIMENSIONS = ("state", "vegetation_type", "confidence")
+
+    # Per-parcel distributions reported as percentiles
+    PERCENTILES = (10, 50, 90)
+
+    # Buffered numeric columns
+    COLUMNS = (
+        "tons", "area", "density_area",
+        "revenue_min", "revenue_mid", "revenue_max",
+        "revenue_p10", "revenue_p90"
+    )
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.parcels = 0
+        self.skipped = 0
+        self.totals = {column: 0.0 for column in self.COLUMNS}
+        self.uncertainty_parcels = 0
+
+        # Group name -> code per dimension, and running per-code sums
+        self.group_codes: Dict[str, Dict[str, int]] = {dim: {} for dim in self.DIMENSIONS}
+        self.group_sums: Dict[str, Dict[str, np.ndarray]] = {
+            dim: {key: np.zeros(0) for key in ("parcels", "tons", "area", "revenue_mid")}
+            for dim in self.DIMENSIONS
+        }
+
+        self.sketches = {
+            "annual_co2_tons": QuantileSketch(relative_accuracy),
+            "annual_revenue_mid_inr": QuantileSketch(relative_accuracy),
+            "tons_per_hectare": QuantileSketch(relative_accuracy)
+        }
+
+        self._buffer: Dict[str, List] = {}
+        self._reset_buffer()
+
+    def _reset_buffer(self) -> None:
+        self._buffer = {column: [] for column in self.COLUMNS + self.DIMENSIONS}
+
+    @staticmethod
+    def extract(analysis: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Pull the aggregated fields out of one analysis
+
+        Returns None if the record has no usable carbon estimate.
+        """
+
+        carbon_analysis = analysis.get("carbon_analysis", analysis)
+        if not isinstance(carbon_analysis, dict):
+            return None
+        carbon_est = carbon_analysis.get("carbon_estimate")
+        if not isinstance(carbon_est, dict):
+            return None
+
+        try:
+            tons = float(carbon_est["annual_sequestration_tons"])
+            area = float(carbon_est["estimated_land_area_hectares"])
+            revenue = carbon_est["potential_revenue_inr"]["1_year"]
+            revenue_bands = (float(revenue["min"]), float(revenue["mid"]), float(revenue["max"]))
+            vision = analysis.get("vision_analysis") or {}
+            details = carbon_est.get("calculation_details") or {}
+            density_pct = float(details.get("density_percentage", vision.get("density_percentage", 50.0)))
+
+            vegetation_type = (
+                vision.get("vegetation_type")
+                or (carbon_est.get("long_term_projection") or {}).get("vegetation_type")
+                or "unknown"
+            )
+
+            location = carbon_analysis.get("location_analysis") or analysis.get("location_data") or {}
+            location = location.get("location") if isinstance(location, dict) else None
+            if not isinstance(location, dict):
+                location = {}
+
+            uncertainty = (carbon_est.get("uncertainty") or {}).get("annual_revenue_inr")
+            revenue_p10_p90 = (float(uncertainty["p10"]), float(uncertainty["p90"])) if uncertainty else None
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+
+        return {
+            "tons": tons,
+            "area": area,
+            "density_percentage": density_pct,
+            "revenue": revenue_bands,
+            "revenue_p10_p90": revenue_p10_p90,
+            "state": location.get("state") or "Not provided",
+            "vegetation_type": vegetation_type,
+            "confidence": carbon_est.get("confidence_level", "unknown")
+        }
+
+    def add(self, analysis: Dict[str, Any]) -> bool:
+        """Add one analysis; returns False if it was skipped"""
+
+        record = self.extract(analysis)
+        if record is None:
+            self.skipped += 1
+            return False
+
+        buffer = self._buffer
+        buffer["tons"].append(record["tons"])
+        buffer["area"].append(record["area"])
+        buffer["density_area"].append(record["density_percentage"] * record["area"])
+        buffer["revenue_min"].append(record["revenue"][0])
+        buffer["revenue_mid"].append(record["revenue"][1])
+        buffer["revenue_max"].append(record["revenue"][2])
+
+        # Parcels without uncertainty bands contribute their mid value
+        p10_p90 = record["revenue_p10_p90"]
+        if p10_p90:
+            self.uncertainty_parcels += 1
+        else:
+            p10_p90 = (record["revenue"][1], record["revenue"][1])
+        buffer["revenue_p10"].append(p10_p90[0])
+        buffer["revenue_p90"].append(p10_p90[1])
+
+        for dim in self.DIMENSIONS:
+            codes = self.group_codes[dim]
+            buffer[dim].append(codes.setdefault(str(record[dim]), len(codes)))
+
+        self.parcels += 1
+        if len(buffer["tons"]) >= self.CHUNK_SIZE:
+            self._flush()
+        return True
+
+    def add_many(self, analyses: Iterable[Dict[str, Any]]) -> None:
+        for analysis in analyses:
+            self.add(analysis)
+
+    def add_json_line(self, line: bytes) -> bool:
+        """Add one NDJSON line; blank lines are ignored, bad ones skipped"""
+
+        line = line.strip()
+        if not line:
+            return False
+        try:
+            analysis = json.loads(line)
+        except ValueError:
+            self.skipped += 1
+            return False
+        if not isinstance(analysis, dict):
+            self.skipped += 1
+            return False
+        return self.add(analysis)
+
+    def _flush(self) -> None:
+        """Fold the buffered chunk into the running reductions"""
+
+        if not self._buffer["tons"]:
+            return
+
+        columns = {column: np.array(self._buffer[column], dtype=np.float64) for column in self.COLUMNS}
+        for column, values in columns.items():
+            self.totals[column] += float(values.sum())
+
+        for dim in self.DIMENSIONS:
+            codes = np.array(self._buffer[dim], dtype=np.intp)
+            size = len(self.group_codes[dim])
+            sums = self.group_sums[dim]
+            for key, weights in (("parcels", None), ("tons", columns["tons"]),
+                                 ("area", columns["area"]), ("revenue_mid", columns["revenue_mid"])):
+                chunk = np.bincount(codes, weights=weights, minlength=size).astype(np.float64)
+                running = sums[key]
+                if running.size < size:
+                    running = np.concatenate([running, np.zeros(size - running.size)])
+                sums[key] = running + chunk
+
+        self.sketches["annual_co2_tons"].add_many(columns["tons"])
+        self.sketches["annual_revenue_mid_inr"].add_many(columns["revenue_mid"])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            intensity = columns["tons"] / columns["area"]
+        self.sketches["tons_per_hectare"].add_many(intensity[np.isfinite(intensity)])
+
+        self._reset_buffer()
+
+    def _breakdown(self, dim: str) -> List[Dict[str, Any]]:
+        sums = self.group_sums[dim]
+        total_tons = self.totals["tons"]
+        rows = []
+        for name, code in self.group_codes[dim].items():
+            tons = float(sums["tons"][code])
+            rows.append({
+                dim: name,
+                "parcels": int(sums["parcels"][code]),
+                "annual_co2_tons": round(tons, 2),
+                "area_hectares": round(float(sums["area"][code]), 2),
+                "annual_revenue_mid_inr": round(float(sums["revenue_mid"][code]), 2),
+                "share_of_tons_percent": round(tons / total_tons * 100, 1) if total_tons > 0 else 0.0
+            })
+        return sorted(rows, key=lambda row: row["annual_co2_tons"], reverse=True)
+
+    def result(self) -> Dict[str, Any]:
+        """Current portfolio summary (can be called repeatedly while streaming)"""
+
+        self._flush()
+        totals = self.totals
+        area = totals["area"]
+
+        distributions = {}
+        for name, sketch in self.sketches.items():
+            bands = {}
+            for p in self.PERCENTILES:
+                value = sketch.quantile(p / 100)
+                bands[f"p{p}"] = round(value, 2) if value is not None else None
+            distributions[name] = bands
+
+        return {
+            "parcels": self.parcels,
+            "skipped_records": self.skipped,
+            "totals": {
+                "annual_co2_tons": round(totals["tons"], 2),
+                "area_hectares": round(area, 2),
+                "annual_credits": round(totals["tons"], 2),
+                "annual_revenue_inr": {
+                    "min": round(totals["revenue_min"], 2),
+                    "mid": round(totals["revenue_mid"], 2),
+                    "max": round(totals["revenue_max"], 2)
+                },
+                "annual_revenue_p10_p90_sum_inr": {
+                    "p10": round(totals["revenue_p10"], 2),
+                    "p90": round(totals["revenue_p90"], 2),
+                    "parcels_with_bands": self.uncertainty_parcels,
+                    "note": "Sum of parcel bands - a wide bound that assumes parcel errors move together"
+                }
+            },
+            "weighted_means": {
+                "tons_per_hectare": round(totals["tons"] / area, 3) if area > 0 else None,
+                "density_percentage": round(totals["density_area"] / area, 1) if area > 0 else None
+            },
+            "per_parcel_distribution": distributions,
+            "breakdowns": {dim: self._breakdown(dim) for dim in self.DIMENSIONS}
+        }
+
+
+def aggregate_portfolio(analyses: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """One-shot helper: aggregate an iterable of analyses"""
+
+    start = time.perf_counter()
+    aggregator = PortfolioAggregator()
+    aggregator.add_many(analyses)
+    result = aggregator.result()
+    result["compute_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
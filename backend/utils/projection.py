@@ -0,0 +1,131 @@
+import time
+import numpy as np
+from typing import Dict, Any, Optional
+
+
+class ProjectionEngine:
+    """
+    Year-by-year projection of sequestration and credit revenue
+
+    Replaces "1-year figure x N" with:
+    - Vegetation-specific growth curves (trees mature, soil carbon saturates)
+    - Price paths per scenario (starting price + annual escalation)
+    - Discounting to a net present value
+
+    Everything is computed as a (scenarios x years) array in one pass.
+    """
+
+    MAX_HORIZON_YEARS = 40
+    DEFAULT_HORIZON_YEARS = 30
+
+    # Real discount rate for farm income in India
+    DEFAULT_DISCOUNT_RATE = 0.08
+
+    # Annual sequestration relative to the year-1 estimate:
+    #   ramp(t)       = max - (max - 1) * exp(-growth_rate * (t - 1))
+    #   saturation(t) = exp(-decline_rate * (t - saturation_year)) after saturation_year
+    # Soil carbon in cropland/grassland approaches a new equilibrium in
+    # ~20 years (IPCC default), while trees keep adding biomass for decades.
+    GROWTH_CURVES = {
+        "forest": {"max_multiplier": 1.3, "growth_rate": 0.08, "saturation_year": 30, "decline_rate": 0.03},
+        "mixed": {"max_multiplier": 1.6, "growth_rate": 0.15, "saturation_year": 25, "decline_rate": 0.05},
+        "grassland": {"max_multiplier": 1.1, "growth_rate": 0.2, "saturation_year": 20, "decline_rate": 0.15},
+        "cropland": {"max_multiplier": 1.0, "growth_rate": 0.0, "saturation_year": 20, "decline_rate": 0.15},
+        "barren": {"max_multiplier": 1.0, "growth_rate": 0.0, "saturation_year": 20, "decline_rate": 0.15},
+        "unknown": {"max_multiplier": 1.0, "growth_rate": 0.0, "saturation_year": 20, "decline_rate": 0.15},
+    }
+
+    # Annual credit price escalation per revenue band
+    PRICE_ESCALATION = {"min": 0.0, "mid": 0.03, "max": 0.05}
+
+    def __init__(self, credit_price_range: Dict[str, float]):
+        # Price paths start from today's min/mid/max credit prices
+        self.price_scenarios = {
+            band: {
+                "start_price": price,
+                "annual_escalation": self.PRICE_ESCALATION.get(band, 0.0)
+            }
+            for band, price in credit_price_range.items()
+        }
+
+    def growth_curve(self, vegetation_type: str, years: np.ndarray) -> np.ndarray:
+        """Sequestration multiplier per year relative to year 1"""
+
+        curve = self.GROWTH_CURVES.get(vegetation_type, self.GROWTH_CURVES["unknown"])
+
+        ramp = curve["max_multiplier"] - (curve["max_multiplier"] - 1.0) * np.exp(
+            -curve["growth_rate"] * (years - 1)
+        )
+        years_past_saturation = np.maximum(0.0, years - curve["saturation_year"])
+        saturation = np.exp(-curve["decline_rate"] * years_past_saturation)
+
+        return ramp * saturation
+
+    def project(
+        self,
+        annual_tons: float,
+        vegetation_type: str,
+        horizon_years: int = DEFAULT_HORIZON_YEARS,
+        discount_rate: float = DEFAULT_DISCOUNT_RATE,
+        price_scenarios: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Project sequestration, revenue and NPV over a horizon
+
+        Args:
+            annual_tons: Year-1 sequestration estimate (tons CO2)
+            vegetation_type: Selects the growth curve
+            horizon_years: Number of years (1-40)
+            discount_rate: Annual discount rate for NPV
+            price_scenarios: Optional override of the default price paths
+
+        Returns:
+            Annual series, cumulative totals and NPV per price scenario
+        """
+
+        if not 1 <= horizon_years <= self.MAX_HORIZON_YEARS:
+            raise ValueError(f"horizon_years must be between 1 and {self.MAX_HORIZON_YEARS}")
+        if not 0 <= discount_rate < 1:
+            raise ValueError("discount_rate must be between 0 and 1")
+
+        start = time.perf_counter()
+        scenarios = price_scenarios or self.price_scenarios
+        names = list(scenarios)
+
+        years = np.arange(1, horizon_years + 1, dtype=np.float64)
+        sequestration = annual_tons * self.growth_curve(vegetation_type, years)
+
+        # (scenarios x years)
+        start_prices = np.array([scenarios[n]["start_price"] for n in names], dtype=np.float64)[:, None]
+        escalation = np.array([scenarios[n]["annual_escalation"] for n in names], dtype=np.float64)[:, None]
+        prices = start_prices * (1.0 + escalation) ** (years - 1)
+        revenue = prices * sequestration
+        cumulative_revenue = np.cumsum(revenue, axis=1)
+
+        discount_factors = (1.0 + discount_rate) ** -years
+        npv = revenue @ discount_factors
+
+        scenario_results = {
+            name: {
+                "start_price_inr": float(start_prices[i, 0]),
+                "annual_escalation": float(escalation[i, 0]),
+                "price_path_inr": np.round(prices[i], 2).tolist(),
+                "annual_revenue_inr": np.round(revenue[i], 2).tolist(),
+                "cumulative_revenue_inr": np.round(cumulative_revenue[i], 2).tolist(),
+                "total_revenue_inr": round(float(cumulative_revenue[i, -1]), 2),
+                "npv_inr": round(float(npv[i]), 2)
+            }
+            for i, name in enumerate(names)
+        }
+
+        return {
+            "horizon_years": horizon_years,
+            "discount_rate": discount_rate,
+            "vegetation_type": vegetation_type,
+            "growth_curve": self.GROWTH_CURVES.get(vegetation_type, self.GROWTH_CURVES["unknown"]),
+            "annual_sequestration_tons": np.round(sequestration, 2).tolist(),
+            "cumulative_sequestration_tons": np.round(np.cumsum(sequestration), 2).tolist(),
+            "total_sequestration_tons": round(float(sequestration.sum()), 2),
+            "scenarios": scenario_results,
+            "compute_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
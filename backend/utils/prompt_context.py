@@ -0,0 +1,85 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional
+
+
+class PromptContextCache:
+    """
+    Render each analysis into prompt blocks once and reuse them
+
+    The chatbot's system prompt and the report generator's analysis
+    context are pure functions of the analysis dict, but used to be
+    rebuilt (nested lookups, currency formatting, a multi-kilobyte string)
+    on every chat turn and every report call. Blocks are cached per
+    (analysis fingerprint, block name) with least-recently-used eviction.
+
+    The fingerprint is a hash of the analysis content (canonical JSON,
+    blake2b), so an analysis is cached whether or not it carries an
+    analysis_id (the web client sends its own mapped view without one),
+    and one that changes in any field gets fresh blocks, never a stale one.
+    Hashing costs more than rendering, so callers that see the same
+    analysis on every turn (chat sessions, the analysis store) compute the
+    fingerprint once and pass it in.
+    """
+
+    DEFAULT_MAX_ENTRIES = 1024
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._blocks: "OrderedDict[tuple, str]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "uncached": 0}
+        self.render_ms_total = 0.0
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    @staticmethod
+    def fingerprint(analysis: Dict[str, Any]) -> str:
+        """Content hash of an analysis"""
+
+        canonical = json.dumps(analysis, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+    def render(
+        self,
+        analysis: Optional[Dict[str, Any]],
+        block: str,
+        renderer: Callable[[Dict[str, Any]], str],
+        fingerprint: Optional[str] = None
+    ) -> str:
+        """Cached renderer(analysis) for a named block"""
+
+        if not analysis:
+            self.stats["uncached"] += 1
+            return renderer(analysis)
+
+        fingerprint = fingerprint or self.fingerprint(analysis)
+        key = (fingerprint, block)
+        text = self._blocks.get(key)
+        if text is not None:
+            self._blocks.move_to_end(key)
+            self.stats["hits"] += 1
+            return text
+
+        started = time.perf_counter()
+        text = renderer(analysis)
+        self.render_ms_total += (time.perf_counter() - started) * 1000
+        self.stats["misses"] += 1
+
+        self._blocks[key] = text
+        while len(self._blocks) > self.max_entries:
+            self._blocks.popitem(last=False)
+            self.stats["evictions"] += 1
+        return text
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._blocks),
+            "max_entries": self.max_entries,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None,
+            "render_ms_total": round(self.render_ms_total, 2)
+        }
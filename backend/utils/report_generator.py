@@ -1,20 +1,22 @@
 import os
 from openai import AsyncOpenAI
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
+from utils.prompt_context import PromptContextCache
 
 class ReportGenerator:
     """
     Generate professional carbon credit analysis reports using GPT-4o
     """
     
-    def __init__(self):
+    def __init__(self, prompt_cache: Optional[PromptContextCache] = None):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
         self.client = AsyncOpenAI(api_key=api_key)
         self.model = "gpt-4o"
+        self.prompt_cache = prompt_cache if prompt_cache is not None else PromptContextCache()
     
     def _format_currency(self, amount: float) -> str:
         """Format INR currency with Indian numbering system"""
@@ -25,10 +27,25 @@ class ReportGenerator:
         else:
             return f"₹{amount:,.0f}"
     
-    def _prepare_analysis_context(self, analysis_data: Dict[str, Any]) -> str:
+    def _prepare_analysis_context(
+        self,
+        analysis_data: Dict[str, Any],
+        analysis_fingerprint: Optional[str] = None
+    ) -> str:
         """
         Prepare structured context for GPT-4o
+        
+        Cached when the analysis fingerprint is known; otherwise rendered
+        directly, as hashing the analysis costs more than rendering it.
         """
+        if not analysis_fingerprint:
+            return self._render_analysis_context(analysis_data)
+        return self.prompt_cache.render(
+            analysis_data, "report_context", self._render_analysis_context, fingerprint=analysis_fingerprint
+        )
+    
+    def _render_analysis_context(self, analysis_data: Dict[str, Any]) -> str:
+        """Structured analysis summary (uncached)"""
         
         vision = analysis_data.get("vision_analysis", {})
         carbon = analysis_data.get("carbon_analysis", {}).get("carbon_estimate", {})
@@ -82,12 +99,16 @@ class ReportGenerator:
 """
         return context
     
-    async def generate_executive_summary(self, analysis_data: Dict[str, Any]) -> str:
+    async def generate_executive_summary(
+        self,
+        analysis_data: Dict[str, Any],
+        analysis_fingerprint: Optional[str] = None
+    ) -> str:
         """
         Generate a brief executive summary (2-3 paragraphs)
         """
         
-        context = self._prepare_analysis_context(analysis_data)
+        context = self._prepare_analysis_context(analysis_data, analysis_fingerprint)
         
         system_prompt = """You are an expert carbon credit consultant writing executive summaries for farmers in India.
 
@@ -122,12 +143,16 @@ Write a compelling but honest summary that helps the farmer understand their lan
         except Exception as e:
             return f"Executive summary generation failed: {str(e)}"
     
-    async def generate_full_report(self, analysis_data: Dict[str, Any]) -> str:
+    async def generate_full_report(
+        self,
+        analysis_data: Dict[str, Any],
+        analysis_fingerprint: Optional[str] = None
+    ) -> str:
         """
         Generate complete professional report in Markdown format
         """
         
-        context = self._prepare_analysis_context(analysis_data)
+        context = self._prepare_analysis_context(analysis_data, analysis_fingerprint)
         analysis_id = analysis_data.get("analysis_id", "N/A")
         timestamp = analysis_data.get("timestamp", datetime.now().isoformat())
         
@@ -0,0 +1,211 @@
+import time
+import numpy as np
+from typing import Dict, Any, List
+
+from utils.carbon_calculator import round_like_python
+
+
+class ScenarioSweep:
+    """
+    What-if sweep over land-management interventions for a completed analysis
+
+    Takes the inputs behind an existing estimate as the baseline, expands a
+    grid of interventions (every combination of the given values) and runs
+    all scenarios through CarbonCalculator.calculate_batch in one pass.
+    No vision or LLM calls - only the calculator's own tables.
+    """
+
+    # Intervention dimensions, in grid order
+    CATEGORICAL = ("vegetation_type", "vegetation_density", "land_condition")
+    NUMERIC = ("density_percentage", "area_hectares", "credit_price_inr")
+
+    MAX_SCENARIOS = 20000
+    DEFAULT_TOP_N = 20
+    MAX_TOP_N = 500
+
+    RANK_KEYS = {"revenue": "uplift_revenue_inr", "tons": "uplift_tons"}
+
+    def __init__(self, calculator):
+        self.calculator = calculator
+        tables = calculator.rate_tables
+        self.tables = {
+            "vegetation_type": tables.vegetation,
+            "vegetation_density": tables.density,
+            "land_condition": tables.condition
+        }
+
+    def baseline(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Model inputs of a completed /analyze response
+
+        Uses the values the calculator actually applied (e.g. the pixel
+        density when it overrode the vision model).
+        """
+
+        vision = analysis.get("vision_analysis") or {}
+        carbon_est = (analysis.get("carbon_analysis") or {}).get("carbon_estimate")
+        if not carbon_est:
+            raise ValueError("Analysis has no carbon estimate")
+
+        details = carbon_est.get("calculation_details", {})
+
+        density = vision.get("vegetation_density", "moderate")
+        if details.get("density_source") == "pixel_analysis" and vision.get("vegetation_indices"):
+            density = vision["vegetation_indices"]["vegetation_density"]
+
+        return {
+            "vegetation_type": vision.get("vegetation_type", "unknown"),
+            "vegetation_density": density,
+            "land_condition": vision.get("land_condition", "average"),
+            "density_percentage": float(details.get("density_percentage", vision.get("density_percentage", 50.0))),
+            "area_hectares": float(carbon_est["estimated_land_area_hectares"]),
+            "credit_price_inr": float(self.calculator.CREDIT_PRICE_RANGE["mid"]),
+            "climate_multiplier": float(details.get("climate_multiplier", 1.0))
+        }
+
+    def _validate(self, interventions: Dict[str, List]) -> Dict[str, list]:
+        """Check intervention values and drop duplicates (order kept)"""
+
+        unknown = set(interventions) - set(self.CATEGORICAL) - set(self.NUMERIC)
+        if unknown:
+            raise ValueError(
+                f"Unknown interventions: {', '.join(sorted(unknown))}. "
+                f"Supported: {', '.join(self.CATEGORICAL + self.NUMERIC)}"
+            )
+
+        grid = {}
+        for name, values in interventions.items():
+            if values is None:
+                continue
+            if not isinstance(values, list):
+                values = [values]
+            if not values:
+                raise ValueError(f"{name} needs at least one value")
+
+            if name in self.CATEGORICAL:
+                valid = [key for key in self.tables[name].codes]
+                invalid = [v for v in values if v not in self.tables[name].codes]
+                if invalid:
+                    raise ValueError(f"Invalid {name}: {invalid}. Valid values: {valid}")
+            else:
+                try:
+                    values = [float(v) for v in values]
+                except (TypeError, ValueError):
+                    raise ValueError(f"{name} values must be numbers")
+                if name == "density_percentage" and not all(0 <= v <= 100 for v in values):
+                    raise ValueError("density_percentage must be between 0 and 100")
+                if name == "area_hectares" and not all(v > 0 for v in values):
+                    raise ValueError("area_hectares must be positive")
+                if name == "credit_price_inr" and not all(v >= 0 for v in values):
+                    raise ValueError("credit_price_inr must not be negative")
+
+            grid[name] = list(dict.fromkeys(values))
+
+        return grid
+
+    def sweep(
+        self,
+        analysis: Dict[str, Any],
+        interventions: Dict[str, List],
+        rank_by: str = "revenue",
+        top_n: int = DEFAULT_TOP_N
+    ) -> Dict[str, Any]:
+        """
+        Evaluate every combination of interventions against the baseline
+
+        Args:
+            analysis: Completed /analyze response
+            interventions: Dimension -> list of values to try; dimensions
+                left out stay at the baseline value
+            rank_by: "revenue" (INR uplift) or "tons" (CO2 uplift)
+            top_n: Number of ranked scenarios to return
+
+        Returns:
+            Baseline, ranked scenario table and sweep statistics
+        """
+
+        if rank_by not in self.RANK_KEYS:
+            raise ValueError(f"rank_by must be one of: {', '.join(self.RANK_KEYS)}")
+        if not 1 <= top_n <= self.MAX_TOP_N:
+            raise ValueError(f"top_n must be between 1 and {self.MAX_TOP_N}")
+
+        start = time.perf_counter()
+        base = self.baseline(analysis)
+        grid = self._validate(interventions)
+
+        dimensions = self.CATEGORICAL + self.NUMERIC
+        axes = [grid.get(name, [base[name]]) for name in dimensions]
+        shape = tuple(len(axis) for axis in axes)
+        total = int(np.prod(shape))
+        if total > self.MAX_SCENARIOS:
+            raise ValueError(f"{total} scenarios requested - the limit is {self.MAX_SCENARIOS}")
+
+        # Flattened cartesian product: one index column per dimension
+        index = np.indices(shape).reshape(len(shape), -1)
+        columns = {}
+        for row, name in enumerate(dimensions):
+            if name in self.CATEGORICAL:
+                axis_values = np.array([self.tables[name].code(v) for v in axes[row]], dtype=np.intp)
+            else:
+                axis_values = np.array(axes[row], dtype=np.float64)
+            columns[name] = axis_values[index[row]]
+
+        # Baseline in row 0 so it goes through exactly the same arithmetic
+        def with_baseline(name):
+            if name in self.CATEGORICAL:
+                first = np.array([self.tables[name].code(base[name])], dtype=np.intp)
+            else:
+                first = np.array([base[name]], dtype=np.float64)
+            return np.concatenate([first, columns[name]])
+
+        batch = self.calculator.calculate_batch(
+            with_baseline("vegetation_type"),
+            with_baseline("vegetation_density"),
+            with_baseline("land_condition"),
+            with_baseline("density_percentage"),
+            with_baseline("area_hectares"),
+            np.full(total + 1, base["climate_multiplier"])
+        )
+
+        prices = with_baseline("credit_price_inr")
+        tons = batch["annual_co2_tons"]
+        revenue = round_like_python(tons * prices, 2)
+
+        base_tons, base_revenue = float(tons[0]), float(revenue[0])
+        tons, revenue = tons[1:], revenue[1:]
+        uplift = {
+            "uplift_tons": round_like_python(tons - base_tons, 2),
+            "uplift_revenue_inr": round_like_python(revenue - base_revenue, 2)
+        }
+
+        ranking_key = uplift[self.RANK_KEYS[rank_by]]
+        order = np.argsort(-ranking_key, kind="stable")[:top_n]
+
+        scenarios = []
+        for rank, i in enumerate(order.tolist(), start=1):
+            inputs = {name: axes[row][index[row, i]] for row, name in enumerate(dimensions)}
+            scenarios.append({
+                "rank": rank,
+                **inputs,
+                "changes": [name for name in dimensions if inputs[name] != base[name]],
+                "annual_co2_tons": float(tons[i]),
+                "annual_revenue_inr": float(revenue[i]),
+                "uplift_tons": float(uplift["uplift_tons"][i]),
+                "uplift_revenue_inr": float(uplift["uplift_revenue_inr"][i]),
+                "uplift_percent": round(float(revenue[i]) / base_revenue * 100 - 100, 1) if base_revenue > 0 else None
+            })
+
+        return {
+            "baseline": {
+                **base,
+                "annual_co2_tons": base_tons,
+                "annual_revenue_inr": base_revenue
+            },
+            "grid": {name: axes[row] for row, name in enumerate(dimensions)},
+            "rank_by": rank_by,
+            "scenarios_evaluated": total,
+            "improving_scenarios": int((ranking_key > 0).sum()),
+            "scenarios": scenarios,
+            "note": "Annual figures at a single credit price; long-term growth and price paths are covered by /projection",
+            "compute_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
@@ -0,0 +1,334 @@
+import re
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class TokenCounter:
+    """
+    Prompt token counts for the chat model, cached per message text
+
+    Counts follow the Mixtral SentencePiece tokenizer (32k vocabulary,
+    byte fallback) without loading it: every digit is its own token, a
+    word costs one token per ~4 letters (its leading space is merged in),
+    punctuation and newlines cost one each and non-ASCII characters
+    (₹, Devanagari) fall back to bytes. Within a few percent of the real
+    tokenizer on English chat text, and never wildly low on numbers or
+    Hindi the way len(text) // 3 is.
+
+    If a tokenizer.json is configured and the `tokenizers` package is
+    installed, exact counts are used instead.
+
+    Messages repeat across turns (system prompt, history), so counts are
+    cached by text with least-recently-used eviction.
+    """
+
+    MAX_CACHED = 4096
+    CHARS_PER_WORD_TOKEN = 4
+
+    _PIECES = re.compile(r"(\d)|([A-Za-z]+)|([^\x00-\x7f])|(\n)|([ \t]+)|([^\sA-Za-z\d])")
+
+    def __init__(self, tokenizer_path: Optional[str] = None, max_cached: int = MAX_CACHED):
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+        self._tokenizer = None
+        self.backend = "heuristic"
+
+        if tokenizer_path:
+            try:
+                from tokenizers import Tokenizer
+                self._tokenizer = Tokenizer.from_file(tokenizer_path)
+                self.backend = "tokenizers"
+            except Exception as e:
+                print(f"[TOKENS] Could not load tokenizer {tokenizer_path}: {e}; using estimates")
+
+    def count(self, text: Optional[str]) -> int:
+        """Tokens in text"""
+
+        if not text:
+            return 0
+
+        tokens = self._cache.get(text)
+        if tokens is not None:
+            self._cache.move_to_end(text)
+            self.stats["hits"] += 1
+            return tokens
+
+        self.stats["misses"] += 1
+        tokens = self._count(text)
+        self._cache[text] = tokens
+        if len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return tokens
+
+    def _count(self, text: str) -> int:
+        if self._tokenizer is not None:
+            return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+        tokens = 0
+        for match in self._PIECES.finditer(text):
+            group = match.lastindex
+            piece = match.group()
+            if group == 2:
+                tokens += -(-len(piece) // self.CHARS_PER_WORD_TOKEN)
+            elif group == 3:
+                tokens += len(piece.encode("utf-8"))
+            elif group == 5:
+                # A single space is merged into the following word
+                tokens += len(piece) // self.CHARS_PER_WORD_TOKEN
+            else:
+                tokens += 1
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int, marker: str = " …[truncated]") -> str:
+        """Longest prefix of text (plus marker) within max_tokens"""
+
+        if self.count(text) <= max_tokens:
+            return text
+
+        budget = max_tokens - self.count(marker)
+        if budget <= 0:
+            return ""
+
+        # Binary search on the prefix length; prefixes are not cached
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self._count(text[:mid]) <= budget:
+                low = mid
+            else:
+                high = mid - 1
+        return text[:low].rstrip() + marker
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "backend": self.backend,
+            "cached_texts": len(self._cache),
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None
+        }
+
+
+class ContextWindowManager:
+    """
+    Fit a chat turn into a token budget
+
+    What the model sees, from most to least important:
+    1. the new user message (truncated to MAX_MESSAGE_SHARE of the budget)
+    2. the system prompt with the user's analysis (truncated only if it
+       would not fit next to the message)
+    3. the last exchange (RECENT_MESSAGES most recent history messages)
+    4. the rolling summary of the conversation before the history
+    5. knowledge base passages, then web search results (each trimmed to
+       what is left; dropped below MIN_REFERENCE_TOKENS)
+    6. older history, newest first, up to max_history messages
+
+    Anything that does not fit is dropped in the reverse order, oldest
+    history first. Every message also costs MESSAGE_OVERHEAD tokens for
+    the chat template.
+
+    build() does it in one go; plan() and finish() split it around the
+    web search so everything else is counted while the search runs.
+    """
+
+    MESSAGE_OVERHEAD = 4
+    MAX_MESSAGE_SHARE = 0.25
+    RECENT_MESSAGES = 2
+    MIN_REFERENCE_TOKENS = 100
+
+    SEARCH_TEMPLATE = (
+        "Current Web Search Results:\n{results}\n\n"
+        "Use this up-to-date information to answer the user's question along with your base knowledge."
+    )
+    TRUNCATION_NOTICE = "[Earlier conversation history truncated. Showing last {kept} messages.]"
+    SUMMARY_TEMPLATE = "Summary of the earlier conversation:\n{summary}"
+    SEARCH_PENDING_NOTICE = (
+        "A live web search for this question did not finish in time. If the question needs "
+        "current news or prices, say that your information may not be up to date."
+    )
+    KNOWLEDGE_TEMPLATE = (
+        "Reference passages from the carbon program knowledge base:\n{results}\n\n"
+        "Base facts about programs, costs and rules on these passages when they are relevant."
+    )
+
+    def __init__(self, counter: TokenCounter, budget: int, max_history: int):
+        self.counter = counter
+        self.budget = budget
+        self.max_history = max_history
+
+    def _cost(self, content: str) -> int:
+        return self.counter.count(content) + self.MESSAGE_OVERHEAD
+
+    def build(
+        self,
+        system_prompt: str,
+        history: Optional[List[Dict[str, str]]],
+        user_message: str,
+        search_results: Optional[str] = None,
+        summary: Optional[str] = None,
+        knowledge: Optional[str] = None
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        Messages for the model and a report of the budget use
+
+        The report has token counts per part, what was kept and what was
+        dropped or truncated.
+        """
+
+        return self.finish(self.plan(system_prompt, history, user_message, summary, knowledge), search_results)
+
+    def plan(
+        self,
+        system_prompt: str,
+        history: Optional[List[Dict[str, str]]],
+        user_message: str,
+        summary: Optional[str] = None,
+        knowledge: Optional[str] = None
+    ) -> "ContextPlan":
+        """
+        Everything but the web search results fitted to the budget
+
+        All token counting except for the search results happens here, so
+        it can run while a search is in flight; finish() then adds the
+        results and fills the rest with older history.
+        """
+
+        counter = self.counter
+        overhead = self.MESSAGE_OVERHEAD
+        plan = ContextPlan()
+        plan.user_message = user_message
+        plan.system_prompt = system_prompt
+
+        plan.message = counter.truncate(user_message, int(self.budget * self.MAX_MESSAGE_SHARE) - overhead)
+        plan.message_tokens = self._cost(plan.message)
+
+        plan.system = counter.truncate(system_prompt, self.budget - plan.message_tokens - overhead)
+        plan.system_tokens = self._cost(plan.system)
+        plan.remaining = self.budget - plan.message_tokens - plan.system_tokens
+
+        history = [m for m in (history or []) if m.get("content")]
+        plan.offered = len(history)
+        plan.history = history[-self.max_history:]
+        plan.history_costs = [self._cost(m["content"]) for m in plan.history]
+        plan.kept = []
+        plan.history_tokens = 0
+
+        self._keep_newest(plan, self.RECENT_MESSAGES)
+
+        # Reserve room for the truncation notice should older history be dropped
+        if plan.offered > len(plan.kept):
+            plan.remaining -= self._cost(self.TRUNCATION_NOTICE.format(kept=plan.offered))
+
+        plan.summary_text = None
+        plan.summary_tokens = 0
+        if summary:
+            room = plan.remaining - self._cost(self.SUMMARY_TEMPLATE.format(summary=""))
+            if room > 0:
+                plan.summary_text = self.SUMMARY_TEMPLATE.format(summary=counter.truncate(summary, room))
+                plan.summary_tokens = self._cost(plan.summary_text)
+                plan.remaining -= plan.summary_tokens
+
+        plan.knowledge_text, plan.knowledge_tokens, _ = self._reference(plan, self.KNOWLEDGE_TEMPLATE, knowledge)
+        return plan
+
+    def finish(
+        self,
+        plan: "ContextPlan",
+        search_results: Optional[str] = None,
+        search_pending: bool = False
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        Messages and budget report for a plan, with the search results
+
+        search_pending adds SEARCH_PENDING_NOTICE instead (a search was
+        needed but did not finish in time). A plan is finished once.
+        """
+
+        if search_pending:
+            search = self.SEARCH_PENDING_NOTICE
+            search_tokens = self._cost(search)
+            plan.remaining -= search_tokens
+            search_truncated = False
+        else:
+            search, search_tokens, search_truncated = self._reference(plan, self.SEARCH_TEMPLATE, search_results)
+
+        self._keep_newest(plan, self.max_history)
+
+        kept = plan.kept
+        dropped = plan.offered - len(kept)
+        messages = [{"role": "system", "content": plan.system}]
+        if plan.summary_text:
+            messages.append({"role": "system", "content": plan.summary_text})
+        notice_tokens = 0
+        if dropped:
+            notice = self.TRUNCATION_NOTICE.format(kept=len(kept))
+            notice_tokens = self._cost(notice)
+            messages.append({"role": "system", "content": notice})
+        messages.extend(kept)
+        if plan.knowledge_text:
+            messages.append({"role": "system", "content": plan.knowledge_text})
+        if search:
+            messages.append({"role": "system", "content": search})
+        messages.append({"role": "user", "content": plan.message})
+
+        used = (
+            plan.message_tokens + plan.system_tokens + plan.summary_tokens + plan.history_tokens
+            + notice_tokens + plan.knowledge_tokens + search_tokens
+        )
+        report = {
+            "budget": self.budget,
+            "used": used,
+            "system_tokens": plan.system_tokens,
+            "summary_tokens": plan.summary_tokens,
+            "history_tokens": plan.history_tokens + notice_tokens,
+            "knowledge_tokens": plan.knowledge_tokens,
+            "search_tokens": search_tokens,
+            "message_tokens": plan.message_tokens,
+            "history_messages_used": len(kept),
+            "history_messages_dropped": dropped,
+            "system_truncated": plan.system != plan.system_prompt,
+            "message_truncated": plan.message != plan.user_message,
+            "search_truncated": search_truncated,
+            "search_dropped": bool(search_results) and search is None
+        }
+        return messages, report
+
+    def _keep_newest(self, plan: "ContextPlan", limit: int) -> None:
+        """Move history into the plan, newest first, while it fits"""
+
+        while plan.history and len(plan.kept) < limit:
+            cost = plan.history_costs[-1]
+            if cost > plan.remaining:
+                plan.history.clear()
+                plan.history_costs.clear()
+                return
+            plan.kept.insert(0, plan.history.pop())
+            plan.history_costs.pop()
+            plan.remaining -= cost
+            plan.history_tokens += cost
+
+    def _reference(self, plan: "ContextPlan", template: str, results: Optional[str]):
+        """Block text, tokens and whether results were trimmed (None if no room)"""
+
+        if not results:
+            return None, 0, False
+        room = plan.remaining - self._cost(template.format(results=""))
+        if room < self.MIN_REFERENCE_TOKENS:
+            return None, 0, False
+        trimmed = self.counter.truncate(results, room)
+        text = template.format(results=trimmed)
+        tokens = self._cost(text)
+        plan.remaining -= tokens
+        return text, tokens, trimmed != results
+
+
+class ContextPlan:
+    """A chat turn fitted to the budget, waiting for web search results"""
+
+    __slots__ = (
+        "user_message", "message", "message_tokens",
+        "system_prompt", "system", "system_tokens",
+        "remaining", "offered", "history", "history_costs", "kept", "history_tokens",
+        "summary_text", "summary_tokens", "knowledge_text", "knowledge_tokens"
+    )
@@ -0,0 +1,150 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class AsyncTTLCache:
+    """
+    Bounded async cache with expiry and single-flight loading
+
+    - Entries expire after ttl seconds; "negative" results (e.g. None from
+      a failed upstream call) use the shorter negative_ttl
+    - Concurrent misses for the same key share one in-flight load
+    - Least recently used entries are evicted beyond max_entries
+    - Hit/miss/coalesce counters for /metrics
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 900.0,
+        negative_ttl: float = 60.0,
+        is_negative: Callable[[Any], bool] = lambda value: value is None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.is_negative = is_negative
+        self.clock = clock
+
+        # key -> (value, expires_at)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+        self.stats = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "loads": 0,
+            "load_errors": 0,
+            "expirations": 0,
+            "evictions": 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable):
+        """(found, value) for a live entry; drops it if expired"""
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.stats["expirations"] += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value without loading (default if missing or expired)"""
+
+        found, value = self._lookup(key)
+        return value if found else default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value (ttl defaults to the positive/negative ttl)"""
+
+        if ttl is None:
+            ttl = self.negative_ttl if self.is_negative(value) else self.ttl
+        self._entries[key] = (value, self.clock() + ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def ttl_remaining(self, key: Hashable) -> Optional[float]:
+        """Seconds until the entry expires, or None if not cached"""
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return max(0.0, entry[1] - self.clock())
+
+    def is_loading(self, key: Hashable) -> bool:
+        """Whether a load for the key is in flight"""
+        return key in self._inflight
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats["loads"] += 1
+        try:
+            value = await loader()
+        except Exception:
+            self.stats["load_errors"] += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self.set(key, value)
+        return value
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value, or the result of loader() shared by all concurrent callers
+
+        Exceptions from loader() reach every waiting caller and are not cached.
+        A caller that is cancelled does not cancel the shared load.
+        """
+
+        found, value = self._lookup(key)
+        if found:
+            self.stats["negative_hits" if self.is_negative(value) else "hits"] += 1
+            return value
+
+        return await asyncio.shield(self.load(key, loader))
+
+    def load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """
+        The in-flight load for the key, started with loader() if there is none
+
+        Synchronous, so a caller that starts work in loader() itself knows
+        no other load for the key began in the meantime.
+        """
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = task
+        return task
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters plus hit rate (coalesced waits count as hits)"""
+
+        requests = self.stats["hits"] + self.stats["negative_hits"] + self.stats["misses"] + self.stats["coalesced"]
+        served_without_load = requests - self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "in_flight": len(self._inflight),
+            "requests": requests,
+            "hit_rate": round(served_without_load / requests, 4) if requests else None
+        }
@@ -0,0 +1,169 @@
+import time
+import numpy as np
+from typing import Dict, Any, Optional
+
+
+class MonteCarloEstimator:
+    """
+    Monte Carlo uncertainty bands for sequestration and revenue
+
+    Every input to the carbon model is a guess (area especially, which can
+    be off by several times), so instead of multiplying point estimates we
+    sample each input from a distribution around its point value and report
+    percentile bands. All draws are computed in one NumPy batch with a
+    seeded generator, so identical inputs always give identical bands.
+    """
+
+    DEFAULT_DRAWS = 20000
+    DEFAULT_SEED = 42
+    PERCENTILES = (10, 50, 90)
+
+    # Input distributions around the point estimate
+    # - lognormal: multiplicative, median = point value, sigma in log space
+    # - normal:    sd absolute (or relative to the point value if "relative")
+    # - triangular: low/mode/high, or +/- "spread" fraction around the point value
+    DEFAULT_DISTRIBUTIONS = {
+        # Area from a single photo: P10-P90 roughly 0.4x-2.5x of the estimate
+        "area": {"distribution": "lognormal", "sigma": 0.7},
+        # Vision density guess varies run to run
+        "density_percentage": {"distribution": "normal", "sd": 15.0, "min": 0.0, "max": 100.0},
+        "density_multiplier": {"distribution": "triangular", "spread": 0.15},
+        "condition_multiplier": {"distribution": "triangular", "spread": 0.1},
+        # Regional baseline and weather adjustment
+        "climate_multiplier": {"distribution": "normal", "sd": 0.05, "relative": True, "min": 0.0},
+        # Defaults to the calculator's min/mid/max credit prices
+        "credit_price": {"distribution": "triangular"},
+    }
+
+    def __init__(
+        self,
+        draws: int = DEFAULT_DRAWS,
+        seed: int = DEFAULT_SEED,
+        distributions: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        self.draws = draws
+        self.seed = seed
+        self.distributions = {
+            name: dict(spec) for name, spec in self.DEFAULT_DISTRIBUTIONS.items()
+        }
+        for name, spec in (distributions or {}).items():
+            self.distributions.setdefault(name, {}).update(spec)
+
+    @staticmethod
+    def _sample(rng: np.random.Generator, spec: Dict[str, Any], center: float, n: int) -> np.ndarray:
+        """Draw n samples for one input around its point value"""
+
+        kind = spec.get("distribution", "fixed")
+
+        if kind == "lognormal":
+            samples = center * np.exp(rng.normal(0.0, spec["sigma"], n))
+        elif kind == "normal":
+            sd = spec["sd"] * abs(center) if spec.get("relative") else spec["sd"]
+            samples = rng.normal(center, sd, n)
+        elif kind == "triangular":
+            spread = spec.get("spread", 0.0)
+            low = spec.get("low", center * (1.0 - spread))
+            high = spec.get("high", center * (1.0 + spread))
+            mode = spec.get("mode", center)
+            if high <= low:
+                return np.full(n, center)
+            samples = rng.triangular(low, min(max(mode, low), high), high, n)
+        elif kind == "uniform":
+            samples = rng.uniform(spec["low"], spec["high"], n)
+        else:
+            return np.full(n, center)
+
+        if "min" in spec or "max" in spec:
+            samples = np.clip(samples, spec.get("min", -np.inf), spec.get("max", np.inf))
+        return samples
+
+    def sample_inputs(
+        self,
+        point: Dict[str, float],
+        price_range: Dict[str, float],
+        draws: Optional[int] = None,
+        seed: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Sample every model input around its point value
+
+        Args:
+            point: base_rate, density_multiplier, condition_multiplier,
+                density_percentage, area, climate_multiplier
+            price_range: Credit prices with min/mid/max keys (INR)
+
+        Returns:
+            Dict of input name -> array of draws
+        """
+
+        n = draws or self.draws
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+
+        price_spec = {
+            "low": price_range["min"],
+            "mode": price_range["mid"],
+            "high": price_range["max"],
+            **self.distributions["credit_price"]
+        }
+
+        return {
+            "base_rate": np.full(n, float(point["base_rate"])),
+            "density_multiplier": self._sample(rng, self.distributions["density_multiplier"], point["density_multiplier"], n),
+            "condition_multiplier": self._sample(rng, self.distributions["condition_multiplier"], point["condition_multiplier"], n),
+            "density_percentage": self._sample(rng, self.distributions["density_percentage"], point["density_percentage"], n),
+            "area": self._sample(rng, self.distributions["area"], point["area"], n),
+            "climate_multiplier": self._sample(rng, self.distributions["climate_multiplier"], point["climate_multiplier"], n),
+            "credit_price": self._sample(rng, price_spec, price_range["mid"], n),
+        }
+
+    @staticmethod
+    def evaluate(samples: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Apply the sequestration and revenue model to arrays of inputs"""
+
+        density_pct_mult = 0.5 + samples["density_percentage"] / 100.0
+        effective_rate = (
+            samples["base_rate"]
+            * samples["density_multiplier"]
+            * samples["condition_multiplier"]
+            * density_pct_mult
+            * samples["climate_multiplier"]
+        )
+        tons = effective_rate * samples["area"]
+        return {"tons": tons, "revenue": tons * samples["credit_price"]}
+
+    def _bands(self, values: np.ndarray, ndigits: int) -> Dict[str, float]:
+        p10, p50, p90 = np.percentile(values, self.PERCENTILES)
+        return {
+            "p10": round(float(p10), ndigits),
+            "p50": round(float(p50), ndigits),
+            "p90": round(float(p90), ndigits),
+            "mean": round(float(values.mean()), ndigits)
+        }
+
+    def simulate(
+        self,
+        point: Dict[str, float],
+        price_range: Dict[str, float],
+        draws: Optional[int] = None,
+        seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the Monte Carlo simulation for one parcel
+
+        Returns:
+            P10/P50/P90 (and mean) bands for annual tonnes and INR revenue
+        """
+
+        start = time.perf_counter()
+
+        samples = self.sample_inputs(point, price_range, draws, seed)
+        outputs = self.evaluate(samples)
+
+        return {
+            "annual_co2_tons": self._bands(outputs["tons"], 2),
+            "annual_revenue_inr": self._bands(outputs["revenue"], 0),
+            "draws": len(outputs["tons"]),
+            "seed": self.seed if seed is None else seed,
+            "note": "P10-P90 covers 80% of simulated outcomes given uncertainty in area, density, condition, climate and credit price",
+            "compute_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
@@ -0,0 +1,113 @@
+import time
+import numpy as np
+from typing import Dict, Any
+
+
+class VegetationIndexAnalyzer:
+    """
+    Compute RGB vegetation indices directly from image pixels
+
+    Gives a fast, deterministic local estimate of vegetation cover that
+    can be used to cross-check (or replace) the vision model's guess.
+
+    Indices:
+    - ExG  (Excess Green):              2g - r - b on chromatic coordinates
+    - VARI (Visible Atmospherically
+            Resistant Index):           (G - R) / (G + R - B)
+    - GLI  (Green Leaf Index):          (2G - R - B) / (2G + R + B)
+    """
+
+    # Pixels with ExG above this are counted as canopy/vegetation
+    EXG_THRESHOLD = 0.05
+
+    # Very dark pixels (shadows, night shots) give unstable chromatic ratios
+    MIN_BRIGHTNESS = 30.0
+
+    # Guard against division by ~0 in ratio indices
+    EPSILON = 1e-6
+
+    # Cover percentage thresholds, matching VegetationDensity in schemas
+    DENSITY_THRESHOLDS = (
+        (60.0, "dense"),
+        (30.0, "moderate"),
+        (5.0, "sparse"),
+    )
+
+    @staticmethod
+    def classify_density(cover_percentage: float) -> str:
+        """Map a canopy-cover percentage to a vegetation density class"""
+
+        for threshold, label in VegetationIndexAnalyzer.DENSITY_THRESHOLDS:
+            if cover_percentage >= threshold:
+                return label
+        return "none"
+
+    @staticmethod
+    def analyze(pixels: np.ndarray) -> Dict[str, Any]:
+        """
+        Compute vegetation indices and canopy cover for an RGB image
+
+        Args:
+            pixels: Array of shape (height, width, 3) with values 0-255
+
+        Returns:
+            Dict with mean indices, canopy cover percentage and density class.
+            If no pixel is bright enough to measure, cover and density class
+            are None (no evidence either way, rather than 0% cover).
+        """
+
+        start = time.perf_counter()
+        eps = VegetationIndexAnalyzer.EPSILON
+
+        rgb = np.asarray(pixels, dtype=np.float32).reshape(-1, 3)
+        red, green, blue = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+
+        # Chromatic coordinates (normalise out illumination)
+        total = red + green + blue
+        valid = total / 3.0 >= VegetationIndexAnalyzer.MIN_BRIGHTNESS
+        safe_total = np.where(total > 0, total, 1.0)
+        r = red / safe_total
+        g = green / safe_total
+        b = blue / safe_total
+
+        exg = 2.0 * g - r - b
+
+        vari_denominator = green + red - blue
+        vari_valid = valid & (np.abs(vari_denominator) > eps)
+        vari = np.zeros_like(green)
+        np.divide(green - red, vari_denominator, out=vari, where=vari_valid)
+        # VARI is unbounded when the denominator is small; clip to its usual range
+        np.clip(vari, -1.0, 1.0, out=vari)
+
+        gli = (2.0 * green - red - blue) / (2.0 * green + red + blue + eps)
+
+        valid_count = int(valid.sum())
+        if valid_count:
+            canopy = valid & (exg > VegetationIndexAnalyzer.EXG_THRESHOLD)
+            cover_percentage = 100.0 * float(canopy.sum()) / valid_count
+            mean_exg = float(exg[valid].mean())
+            mean_gli = float(gli[valid].mean())
+        else:
+            cover_percentage = None
+            mean_exg = 0.0
+            mean_gli = 0.0
+
+        vari_count = int(vari_valid.sum())
+        mean_vari = float(vari[vari_valid].mean()) if vari_count else 0.0
+
+        if cover_percentage is not None:
+            cover_percentage = round(cover_percentage, 1)
+
+        return {
+            "exg_mean": round(mean_exg, 4),
+            "vari_mean": round(mean_vari, 4),
+            "gli_mean": round(mean_gli, 4),
+            "canopy_cover_percentage": cover_percentage,
+            "vegetation_density": (
+                VegetationIndexAnalyzer.classify_density(cover_percentage) if cover_percentage is not None else None
+            ),
+            "pixels_analyzed": int(rgb.shape[0]),
+            "usable_pixel_fraction": round(valid_count / max(rgb.shape[0], 1), 3),
+            "exg_threshold": VegetationIndexAnalyzer.EXG_THRESHOLD,
+            "compute_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
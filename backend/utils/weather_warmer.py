@@ -0,0 +1,211 @@
+import asyncio
+import random
+import time
+from typing import Dict, Any, Callable, Hashable, List, Optional
+
+
+class WeatherWarmer:
+    """
+    Keep weather for the busiest locations fresh in the background
+
+    LocationService reports every weather request here. A background loop
+    (started from the app lifespan) keeps decayed request counts, picks
+    the most-requested city/state pairs, and refetches their weather
+    shortly before the cached entry expires, so user-facing requests for
+    those places are served from a warm cache.
+
+    - Fan-out is batched and rate limited (BATCH_SIZE calls, then a
+      jittered pause), keeping well inside the OpenWeather free tier
+    - Refresh thresholds are jittered per entry so entries cached together
+      are not all refetched in the same cycle
+    - A failed refresh keeps the existing entry until it expires
+    """
+
+    # Locations kept warm, and candidates tracked (lowest counts pruned)
+    WARM_LOCATIONS = 64
+    MAX_TRACKED = 1024
+    # Requests (decayed) before a location is worth warming
+    MIN_REQUESTS = 2.0
+
+    # Refresh when less than this much TTL is left (minus jitter)
+    REFRESH_MARGIN_SECONDS = 180.0
+    REFRESH_JITTER = 0.3
+
+    # Scheduler cadence and request-count half-life
+    CHECK_INTERVAL_SECONDS = 30.0
+    HALF_LIFE_SECONDS = 6 * 3600.0
+
+    # Rate limit: BATCH_SIZE calls per BATCH_INTERVAL_SECONDS (~50/min)
+    BATCH_SIZE = 5
+    BATCH_INTERVAL_SECONDS = 6.0
+
+    def __init__(
+        self,
+        location_service,
+        warm_locations: int = WARM_LOCATIONS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.location_service = location_service
+        self.cache = location_service.weather_cache
+        self.warm_locations = warm_locations
+        self.clock = clock
+
+        # key -> place (LocationService.resolve_location result)
+        self.places: Dict[Hashable, Dict[str, Any]] = {}
+        # key -> decayed request count
+        self.counts: Dict[Hashable, float] = {}
+        self._last_decay = clock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "requests": 0,
+            "warm_hits": 0,
+            "cycles": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "expired_before_refresh": 0
+        }
+        self._lag_total = 0.0
+        self._lag_count = 0
+        self._lag_max = 0.0
+        self._lag_last = None
+
+        location_service.weather_warmer = self
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.location_service.use_live_weather and self.location_service.api_key)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def record(self, key: Hashable, place: Dict[str, Any]) -> None:
+        """Count a weather request (call before the cache lookup)"""
+
+        remaining = self.cache.ttl_remaining(key)
+        self.stats["requests"] += 1
+        if remaining:
+            self.stats["warm_hits"] += 1
+
+        self.places[key] = place
+        self.counts[key] = self.counts.get(key, 0.0) + 1.0
+        if len(self.counts) > self.MAX_TRACKED:
+            self._prune()
+
+    def _prune(self) -> None:
+        keep = sorted(self.counts, key=self.counts.get, reverse=True)[:self.MAX_TRACKED // 2]
+        self.counts = {key: self.counts[key] for key in keep}
+        self.places = {key: self.places[key] for key in keep}
+
+    def _decay(self) -> None:
+        now = self.clock()
+        factor = 0.5 ** ((now - self._last_decay) / self.HALF_LIFE_SECONDS)
+        self._last_decay = now
+        for key in list(self.counts):
+            self.counts[key] *= factor
+            if self.counts[key] < 0.1:
+                del self.counts[key]
+                del self.places[key]
+
+    def hot_locations(self) -> List[Hashable]:
+        """Most-requested keys worth keeping warm, busiest first"""
+
+        ranked = sorted(self.counts, key=self.counts.get, reverse=True)[:self.warm_locations]
+        return [key for key in ranked if self.counts[key] >= self.MIN_REQUESTS]
+
+    def due(self) -> List[Hashable]:
+        """Hot keys whose cached weather is missing or close to expiry"""
+
+        due = []
+        for key in self.hot_locations():
+            if self.cache.is_loading(key):
+                continue
+            remaining = self.cache.ttl_remaining(key)
+            margin = self.REFRESH_MARGIN_SECONDS * (1.0 - self.REFRESH_JITTER * random.random())
+            if remaining is None or remaining < margin:
+                due.append(key)
+        return due
+
+    async def _refresh(self, key: Hashable) -> None:
+        remaining = self.cache.ttl_remaining(key)
+        try:
+            value = await self.location_service._fetch_weather_data(self.places[key])
+        except Exception as e:
+            value = None
+            print(f"[WEATHER] Refresh failed for {key}: {e}")
+
+        if value is None:
+            self.stats["refresh_errors"] += 1
+            return
+
+        self.cache.set(key, value)
+        self.stats["refreshes"] += 1
+
+        # Lag: how long past the refresh point the entry was when refreshed
+        if remaining is None or remaining <= 0:
+            self.stats["expired_before_refresh"] += 1
+        else:
+            lag = max(0.0, self.REFRESH_MARGIN_SECONDS - remaining)
+            self._lag_total += lag
+            self._lag_count += 1
+            self._lag_max = max(self._lag_max, lag)
+            self._lag_last = lag
+
+    async def refresh_due(self) -> int:
+        """One scheduler cycle: refresh every due key in rate-limited batches"""
+
+        self._decay()
+        due = self.due()
+        for start in range(0, len(due), self.BATCH_SIZE):
+            if start:
+                await asyncio.sleep(self.BATCH_INTERVAL_SECONDS * (1.0 + self.REFRESH_JITTER * random.random()))
+            await asyncio.gather(*(self._refresh(key) for key in due[start:start + self.BATCH_SIZE]))
+        self.stats["cycles"] += 1
+        return len(due)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                refreshed = await self.refresh_due()
+                if refreshed:
+                    print(f"[WEATHER] Warmed {refreshed} location(s)")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[WEATHER] Warmer cycle failed: {e}")
+            await asyncio.sleep(self.CHECK_INTERVAL_SECONDS * (1.0 + self.REFRESH_JITTER * random.random()))
+
+    def start(self) -> bool:
+        """Start the background loop (no-op unless live weather is on)"""
+
+        if not self.enabled or self.running:
+            return False
+        self._task = asyncio.create_task(self.run())
+        return True
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "running": self.running,
+            "tracked": len(self.counts),
+            "warm_locations": len(self.hot_locations()),
+            "warm_hit_ratio": round(self.stats["warm_hits"] / requests, 4) if requests else None,
+            "refresh_lag_seconds": {
+                "last": round(self._lag_last, 1) if self._lag_last is not None else None,
+                "mean": round(self._lag_total / self._lag_count, 1) if self._lag_count else None,
+                "max": round(self._lag_max, 1)
+            }
+        }
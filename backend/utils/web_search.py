@@ -0,0 +1,184 @@
+import asyncio
+import os
+import re
+import time
+from typing import Awaitable, Dict, Any, Optional, Set
+from serpapi import GoogleSearch
+from utils.ttl_cache import AsyncTTLCache
+
+
+class WebSearchService:
+    """
+    SerpApi search for the chatbot, off the event loop and cached
+
+    - The SerpApi client is synchronous, so each search runs in a worker
+      thread with a timeout instead of blocking every other request for
+      the length of a Google search
+    - Results are cached per normalized query (lowercased, punctuation and
+      filler words dropped, word order ignored), so "Latest carbon credit
+      prices?" and "carbon credit prices latest" share one upstream call;
+      failed searches are cached briefly
+    - Queries asked at least REFRESH_MIN_HITS times are refreshed in the
+      background when they are about to expire, so popular questions
+      never wait for SerpApi
+    """
+
+    CACHE_SIZE = 512
+    CACHE_TTL_SECONDS = 3600
+    NEGATIVE_TTL_SECONDS = 60
+    TIMEOUT_SECONDS = 8.0
+    REFRESH_MIN_HITS = 3
+    REFRESH_MARGIN = 0.2  # fraction of the TTL left when a refresh starts
+    RESULTS = 3
+
+    STOPWORDS = frozenset(
+        "a an and are about can do does for from how i in is it me my of on or "
+        "please tell the to what whats which with".split()
+    )
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self.timeout = float(os.getenv("WEB_SEARCH_TIMEOUT_SECONDS", self.TIMEOUT_SECONDS))
+        self.cache = AsyncTTLCache(
+            max_entries=self.CACHE_SIZE,
+            ttl=float(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS", self.CACHE_TTL_SECONDS)),
+            negative_ttl=self.NEGATIVE_TTL_SECONDS
+        )
+
+        # normalized query -> lookups since it was cached
+        self._hits: Dict[str, int] = {}
+        self._refreshing: Set[asyncio.Task] = set()
+        self.stats = {"searches": 0, "upstream_calls": 0, "timeouts": 0, "errors": 0, "refreshes": 0}
+        # Time SerpApi calls spent in worker threads instead of blocking the loop
+        self.offloaded_ms_total = 0.0
+
+    @classmethod
+    def normalize_query(cls, query: str) -> str:
+        words = re.findall(r"[a-z0-9]+", query.lower())
+        return " ".join(sorted({w for w in words if w not in cls.STOPWORDS}))
+
+    async def search(self, query: str) -> str:
+        """Top results as text (or a short note if search is unavailable)"""
+        text, _ = await self.start(query)
+        return text
+
+    def start(self, query: str) -> asyncio.Future:
+        """
+        Start a search; the future gives (text, time.perf_counter() when ready)
+
+        On a cache miss the SerpApi call is handed to a worker thread before
+        this returns, so whatever the caller does next runs alongside it.
+        The ready time is taken in that thread, so it stays accurate when
+        the event loop only picks the result up later.
+        """
+
+        loop = asyncio.get_running_loop()
+        if not self.api_key:
+            future = loop.create_future()
+            future.set_result(("Web search unavailable (API key not configured)", time.perf_counter()))
+            return future
+
+        self.stats["searches"] += 1
+        key = self.normalize_query(query) or query
+        if len(self._hits) > 2 * self.CACHE_SIZE:
+            self._hits = {k: n for k, n in self._hits.items() if self.cache.ttl_remaining(k) is not None}
+        self._hits[key] = self._hits.get(key, 0) + 1
+        self._maybe_refresh(key, query)
+
+        ready: Dict[str, float] = {}
+        if self.cache.ttl_remaining(key):
+            ready["at"] = time.perf_counter()
+            pending = self.cache.get_or_load(key, lambda: self._fetch(query))
+        elif self.cache.is_loading(key):
+            pending = self.cache.get_or_load(key, lambda: self._fetch(query))
+        else:
+            def run() -> str:
+                try:
+                    return self._search_sync(query)
+                finally:
+                    ready["at"] = time.perf_counter()
+
+            work = loop.run_in_executor(None, run)
+            pending = asyncio.shield(self.cache.load(key, lambda: self._fetch(query, work)))
+        return asyncio.ensure_future(self._text(pending, ready))
+
+    @staticmethod
+    async def _text(pending: Awaitable[Optional[str]], ready: Dict[str, float]) -> tuple:
+        result = await pending
+        text = result if result is not None else "Web search is temporarily unavailable"
+        return text, ready.get("at", time.perf_counter())
+
+    def _maybe_refresh(self, key: str, query: str) -> None:
+        remaining = self.cache.ttl_remaining(key)
+        if (
+            remaining is None
+            or remaining > self.cache.ttl * self.REFRESH_MARGIN
+            or self._hits[key] < self.REFRESH_MIN_HITS
+            or self.cache.is_loading(key)
+            or any(task.get_name() == key for task in self._refreshing)
+        ):
+            return
+
+        task = asyncio.get_running_loop().create_task(self._refresh(key, query), name=key)
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def _refresh(self, key: str, query: str) -> None:
+        result = await self._fetch(query)
+        # Keep serving the current results if the refresh failed
+        if result is not None:
+            self.cache.set(key, result)
+            self._hits[key] = 0
+            self.stats["refreshes"] += 1
+
+    async def _fetch(self, query: str, work: Optional[Awaitable[str]] = None) -> Optional[str]:
+        """Results of _search_sync in a worker thread (work: one already started)"""
+
+        self.stats["upstream_calls"] += 1
+        started = time.perf_counter()
+        try:
+            if work is None:
+                work = asyncio.to_thread(self._search_sync, query)
+            return await asyncio.wait_for(work, self.timeout)
+        except asyncio.TimeoutError:
+            # The worker thread finishes on its own; its result is discarded
+            self.stats["timeouts"] += 1
+            print(f"[SEARCH] Timed out after {self.timeout}s: {query[:80]}")
+            return None
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[SEARCH] Error: {e}")
+            return None
+        finally:
+            self.offloaded_ms_total += (time.perf_counter() - started) * 1000
+
+    def _search_sync(self, query: str) -> str:
+        search = GoogleSearch({
+            "q": query,
+            "api_key": self.api_key,
+            "num": self.RESULTS,
+            "gl": "in",  # India
+            "hl": "en"
+        })
+
+        results = search.get_dict()
+
+        if "organic_results" not in results:
+            return "No search results found"
+
+        search_summary = []
+        for idx, result in enumerate(results["organic_results"][:self.RESULTS], 1):
+            title = result.get("title", "")
+            snippet = result.get("snippet", "")
+            link = result.get("link", "")
+            search_summary.append(f"{idx}. {title}\n   {snippet}\n   Source: {link}")
+
+        return "\n\n".join(search_summary)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "cache": self.cache.get_stats(),
+            "loop_blocking_ms_avoided": round(self.offloaded_ms_total, 1),
+            "refreshes_in_flight": len(self._refreshing)
+        }
@@ -7,6 +7,7 @@ import { ScrollArea } from '@/components/ui/scroll-area';
 import { ChatMessages } from '@/components/chat/chat-messages';
 import { ChatInput } from '@/components/chat/chat-input';
 import { getChatResponse } from '@/lib/actions';
+import { streamChatResponse } from '@/lib/chat-stream';
 import { useAppStore } from '@/lib/store';
 import type { ChatMessage } from '@/lib/types';
 import { X } from 'lucide-react';
@@ -20,7 +21,18 @@ export function ChatPanel({ isOpen, onOpenChange }: ChatPanelProps) {
   const { analysisResult } = useAppStore();
   const [messages, setMessages] = useState<ChatMessage[]>([]);
   const [isBotTyping, setIsBotTyping] = useState(false);
+  const [isStreaming, setIsStreaming] = useState(false);
   const scrollAreaRef = useRef<HTMLDivElement>(null);
+  const abortRef = useRef<AbortController | null>(null);
+  // Server-side conversation; reset when a new analysis is loaded
+  const sessionIdRef = useRef<string | null>(null);
+
+  useEffect(() => {
+    sessionIdRef.current = null;
+  }, [analysisResult]);
+
+  // Stop any in-flight answer when the panel unmounts
+  useEffect(() => () => abortRef.current?.abort(), []);
 
   useEffect(() => {
     if (messages.length > 0 && scrollAreaRef.current) {
@@ -45,30 +57,65 @@ export function ChatPanel({ isOpen, onOpenChange }: ChatPanelProps) {
 
     setMessages((prev) => [...prev, userMessage]);
     setIsBotTyping(true);
+    setIsStreaming(true);
+
+    const controller = new AbortController();
+    abortRef.current = controller;
+    const timestamp = new Date().toLocaleTimeString();
+    let started = false;
+
+    // Show the answer as it is generated: the first token replaces the
+    // typing indicator, later tokens extend the same message
+    const appendToken = (text: string) => {
+      if (!started) {
+        started = true;
+        setIsBotTyping(false);
+        setMessages((prev) => [...prev, { role: 'bot', content: text, timestamp }]);
+        return;
+      }
+      setMessages((prev) => {
+        const next = [...prev];
+        const last = next[next.length - 1];
+        next[next.length - 1] = { ...last, content: last.content + text };
+        return next;
+      });
+    };
 
     try {
-      const botResponse = await getChatResponse(message, analysisResult);
-      const botMessage: ChatMessage = {
-        role: 'bot',
-        content: botResponse,
-        timestamp: new Date().toLocaleTimeString(),
-      };
-      setMessages((prev) => [...prev, botMessage]);
+      const result = await streamChatResponse(
+        message,
+        analysisResult,
+        sessionIdRef.current,
+        appendToken,
+        controller.signal
+      );
+      sessionIdRef.current = result.session_id;
     } catch (error) {
-        console.error("Failed to get chat response:", error);
-        const errorMessage: ChatMessage = {
-            role: 'bot',
-            content: error instanceof Error ? error.message : 'Sorry, something went wrong.',
-            timestamp: new Date().toLocaleTimeString(),
-        };
-        setMessages((prev) => [...prev, errorMessage]);
+        if (controller.signal.aborted) return;
+        console.error("Failed to stream chat response:", error);
+        // The session may have expired on the server - start a new one next time
+        sessionIdRef.current = null;
+        if (!started) {
+            // Streaming unavailable - fall back to the regular endpoint
+            const botResponse = await getChatResponse(message, analysisResult);
+            setMessages((prev) => [...prev, { role: 'bot', content: botResponse, timestamp }]);
+        } else {
+            appendToken('\n\n_The response was interrupted. Please try again._');
+        }
     } finally {
+        if (abortRef.current === controller) abortRef.current = null;
         setIsBotTyping(false);
+        setIsStreaming(false);
     }
   };
 
+  const handleOpenChange = (open: boolean) => {
+    if (!open) abortRef.current?.abort();
+    onOpenChange(open);
+  };
+
   return (
-    <Sheet open={isOpen} onOpenChange={onOpenChange}>
+    <Sheet open={isOpen} onOpenChange={handleOpenChange}>
       <SheetContent className="w-full sm:w-[540px] flex flex-col p-0">
         <SheetHeader className="p-6">
           <SheetTitle>Chat with Expert</SheetTitle>
@@ -80,7 +127,7 @@ export function ChatPanel({ isOpen, onOpenChange }: ChatPanelProps) {
         </ScrollArea>
         <SheetFooter className="p-6 pt-2 bg-background border-t">
           <div className="w-full space-y-2">
-            <ChatInput onSendMessage={handleSendMessage} disabled={isBotTyping} />
+            <ChatInput onSendMessage={handleSendMessage} disabled={isBotTyping || isStreaming} />
             <p className="text-center text-xs text-muted-foreground">
               AI can make mistakes. Please double-check responses.
             </p>
@@ -89,7 +136,7 @@ export function ChatPanel({ isOpen, onOpenChange }: ChatPanelProps) {
         <Button 
             variant="ghost" 
             size="icon"
-            onClick={() => onOpenChange(false)}
+            onClick={() => handleOpenChange(false)}
             className="absolute top-4 right-4"
         >
             <X className="h-5 w-5" />
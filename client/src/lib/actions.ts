@@ -1,6 +1,7 @@
 'use server';
 
 import type { AnalysisResult } from '@/lib/types';
+import { API_BASE_URL } from '@/lib/constants';
 
 // This function maps the raw API response to the frontend's AnalysisResult type.
 function mapApiToAnalysisResult(data: any): AnalysisResult {
@@ -13,6 +14,7 @@ function mapApiToAnalysisResult(data: any): AnalysisResult {
   const reports = data.reports || {};
   
   return {
+    analysisId: data.analysis_id,
     summary: {
       vegetation: {
         type: visionAnalysis.vegetation_type || 'N/A',
@@ -90,8 +92,6 @@ function mapApiToAnalysisResult(data: any): AnalysisResult {
 }
 
 
-const API_BASE_URL = "https://carboncreditsanalyzer-production.up.railway.app";
-
 if (!API_BASE_URL) {
   // In a real app, you'd want to handle this more gracefully.
   // For this project, we'll throw an error during the build if it's not set.
@@ -165,6 +165,7 @@ export async function getChatResponse(
       },
       body: JSON.stringify({
         message,
+        analysis_id: analysisData?.analysisId,
         user_analysis: analysisData,
       }),
     });
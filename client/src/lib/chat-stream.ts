@@ -0,0 +1,92 @@
+import type { AnalysisResult } from '@/lib/types';
+import { API_BASE_URL } from '@/lib/constants';
+
+export type ChatStreamResult = {
+  session_id: string;
+  response: string;
+  tokens: {
+    prompt_tokens: number;
+    completion_tokens: number;
+    total_tokens: number;
+    estimated: boolean;
+  };
+  model: string;
+  search_performed: boolean;
+  context_info: Record<string, unknown>;
+  timing: {
+    time_to_first_token_ms: number | null;
+    total_ms: number;
+  };
+};
+
+// Streams a chat answer from /chat/stream (Server-Sent Events), calling
+// onToken for each piece of text as it arrives. Resolves with the final
+// "done" event; aborting the signal closes the connection, which stops
+// generation on the backend.
+//
+// The conversation is kept on the server: pass the session_id from the
+// previous answer to continue it. The analysis is only sent when a new
+// session starts: its analysis_id, so the backend uses its stored copy,
+// plus the analysis itself in case the backend no longer has it.
+export async function streamChatResponse(
+  message: string,
+  analysisData: AnalysisResult | null,
+  sessionId: string | null,
+  onToken: (text: string) => void,
+  signal?: AbortSignal
+): Promise<ChatStreamResult> {
+  const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+    },
+    body: JSON.stringify(
+      sessionId
+        ? { message, session_id: sessionId }
+        : { message, analysis_id: analysisData?.analysisId, user_analysis: analysisData }
+    ),
+    signal,
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error(`Chat stream failed (Status: ${response.status}).`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = 'message';
+      let data = '';
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === 'token') {
+        onToken(payload.text);
+      } else if (event === 'done') {
+        return payload as ChatStreamResult;
+      } else if (event === 'error') {
+        throw new Error(payload.response || 'The chat service returned an error.');
+      }
+    }
+  }
+
+  throw new Error('The chat stream ended unexpectedly.');
+}
@@ -1,3 +1,5 @@
+export const API_BASE_URL = "https://carboncreditsanalyzer-production.up.railway.app";
+
 export const INDIAN_STATES = [
   "Andaman and Nicobar Islands",
   "Andhra Pradesh",
@@ -1,4 +1,6 @@
 export interface AnalysisResult {
+  // Set by /analyze: lets chat use the analysis stored on the server
+  analysisId?: string;
   summary: {
     vegetation: {
       type: string;